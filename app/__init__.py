@@ -1,19 +1,21 @@
 from flask import Flask, jsonify, send_from_directory
 from flask_migrate import Migrate
-from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from app.config.settings import Config
 from app.config.database import db
+from app.utils.auth import RequestScopedJWTManager
+from app.utils.json_provider import FastJSONProvider
 import logging
 from logging.handlers import RotatingFileHandler
 import os
 
 # Initialize extensions
 migrate = Migrate()
-jwt = JWTManager()
+jwt = RequestScopedJWTManager()
 
 def create_app(config_name='default'):
     app = Flask(__name__, static_folder='../frontend', static_url_path='')
+    app.json = FastJSONProvider(app)
     
     # Load configuration
     from app.config.settings import config
@@ -33,6 +35,10 @@ def create_app(config_name='default'):
     migrate.init_app(app, db)
     jwt.init_app(app)
     
+    # Nothing else imports the dispatcher before a consumer subscribes, and
+    # importing it is what registers the commit hooks that dispatch events
+    from app.services import outbox_dispatcher  # noqa: F401
+    
     # Configure logging
     configure_logging(app)
 
@@ -41,11 +47,15 @@ def create_app(config_name='default'):
     from app.routes.student_routes import student_bp
     from app.routes.report_routes import report_bp
     from app.routes.admin_routes import admin_bp
+    from app.routes.batch_routes import batch_bp
+    from app.routes.event_routes import events_bp
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(student_bp, url_prefix='/api/students')
     app.register_blueprint(report_bp, url_prefix='/api/reports')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(batch_bp, url_prefix='/api/batch')
+    app.register_blueprint(events_bp, url_prefix='/api/events')
     
     # Register error handlers
     register_error_handlers(app)
@@ -74,7 +84,9 @@ def create_app(config_name='default'):
                 'auth': '/api/auth',
                 'students': '/api/students',
                 'reports': '/api/reports',
-                'admin': '/api/admin'
+                'admin': '/api/admin',
+                'batch': '/api/batch',
+                'events': '/api/events'
             }
         }), 200
 
@@ -134,6 +146,13 @@ def register_error_handlers(app):
             'message': 'Resource not found'
         }), 404
     
+    @app.errorhandler(413)
+    def request_too_large(error):
+        return jsonify({
+            'status': 'error',
+            'message': f"File too large; the limit is {app.config['MAX_CONTENT_LENGTH']} bytes"
+        }), 413
+    
     @app.errorhandler(500)
     def internal_error(error):
         db.session.rollback()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -19,7 +20,60 @@ class Config:
     
     # File Uploads
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    # 16MB max file size by default
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
+    # Roster imports commit this many rows at a time and list at most this many row errors
+    IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', 500))
+    IMPORT_MAX_ERRORS = int(os.getenv('IMPORT_MAX_ERRORS', 1000))
+    
+    # Pagination
+    STUDENTS_PAGE_SIZE = int(os.getenv('STUDENTS_PAGE_SIZE', 100))
+    STUDENTS_MAX_PAGE_SIZE = int(os.getenv('STUDENTS_MAX_PAGE_SIZE', 1000))
+    STUDENTS_STREAM_BATCH_SIZE = int(os.getenv('STUDENTS_STREAM_BATCH_SIZE', 500))
+    # Let SQLite/PostgreSQL build list pages as JSON instead of Python
+    STUDENTS_DB_JSON = os.getenv('STUDENTS_DB_JSON', 'true').lower() == 'true'
+    STUDENTS_MAX_IDS = int(os.getenv('STUDENTS_MAX_IDS', 5000))
+    STUDENTS_BULK_MAX_ROWS = int(os.getenv('STUDENTS_BULK_MAX_ROWS', 10000))
+    # Threads hashing passwords for bulk creation; defaults to one per CPU
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 0))
+    
+    # Batch requests
+    BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 20))
+    BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', 4))
+    
+    # Server-Sent Events
+    EVENTS_SOCKET_DIR = os.getenv(
+        'EVENTS_SOCKET_DIR', os.path.join(tempfile.gettempdir(), 'student-management-events')
+    )
+    EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', 100))
+    EVENTS_HEARTBEAT_SECONDS = int(os.getenv('EVENTS_HEARTBEAT_SECONDS', 15))
+    
+    # Outbox dispatch; with a poll interval, consumers also see other workers' writes
+    OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 500))
+    OUTBOX_POLL_SECONDS = float(os.getenv('OUTBOX_POLL_SECONDS', 0))
+    
+    # Where caches live: memory (per worker), sqlite:///path (per host) or redis://host:port/db
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+    
+    # Read-through cache for user and student detail lookups; 0 entries disables it
+    ENTITY_CACHE_SIZE = int(os.getenv('ENTITY_CACHE_SIZE', 1000))
+    ENTITY_CACHE_TTL = float(os.getenv('ENTITY_CACHE_TTL', 60))
+    
+    # Results of repeated list and search queries, dropped on writes to their tables
+    QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', 500))
+    QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', 300))
+    
+    # Roles are held in memory; reloaded on role writes and at least this often (seconds)
+    ROLE_REGISTRY_TTL = float(os.getenv('ROLE_REGISTRY_TTL', 300))
+    
+    # Seconds a read waits for an identical one already running before running its own
+    SINGLE_FLIGHT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_TIMEOUT', 30))
+    
+    # Typeahead
+    SUGGEST_RESULTS = 10
+    SUGGEST_MAX_RESULTS = 20
+    # Seconds before a worker reloads its index, in case it missed a write
+    SUGGEST_INDEX_TTL = float(os.getenv('SUGGEST_INDEX_TTL', 300))
     
     # Reports
     REPORTS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'reports')
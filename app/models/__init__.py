@@ -5,6 +5,8 @@
 from .role import Role
 from .user import User
 from .student import Student
+from .outbox import OutboxEvent
+from .student_directory import StudentDirectory
 
 # Export models
 def init_app(app):
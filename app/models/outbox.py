@@ -0,0 +1,38 @@
+from datetime import datetime
+from app.config.database import db
+
+class OutboxEvent(db.Model):
+    """
+    One row per create, update or delete of a student, user or role,
+    inserted in the same transaction as the write itself. `seq` increases
+    with every event and is the cursor consumers tail the outbox by.
+    """
+    __tablename__ = 'outbox'
+    __table_args__ = (
+        db.Index('ix_outbox_entity_seq', 'entity', 'seq'),
+    )
+    
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    
+    seq = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(10), nullable=False)
+    # Names of the changed fields for updates, null for creates and deletes
+    changes = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<OutboxEvent {self.seq} {self.operation} {self.entity} {self.entity_id}>'
+    
+    def to_dict(self):
+        return {
+            'seq': self.seq,
+            'entity': self.entity,
+            'entity_id': self.entity_id,
+            'operation': self.operation,
+            'changes': self.changes,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
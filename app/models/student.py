@@ -4,13 +4,17 @@ from app.config.database import db
 class Student(db.Model):
     __tablename__ = 'students'
     
+    # Fields clients may request with `fields=`
+    FIELDS = ('id', 'student_id', 'date_of_birth', 'gender', 'address', 'phone',
+              'admission_date', 'created_at', 'updated_at')
+    
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.String(20), unique=True, nullable=False)
     date_of_birth = db.Column(db.Date, nullable=False)
-    gender = db.Column(db.String(10))
+    gender = db.Column(db.String(10), index=True)
     address = db.Column(db.String(255))
     phone = db.Column(db.String(20))
-    admission_date = db.Column(db.Date, default=datetime.utcnow)
+    admission_date = db.Column(db.Date, default=datetime.utcnow, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -47,10 +51,13 @@ class Student(db.Model):
         if not admission_year:
             admission_year = datetime.utcnow().year % 100  # Last two digits of current year
             
-        # Find the highest student ID for the given year
+        # Find the highest student ID for the given year. IDs are the year plus
+        # a fixed-width number, so a range on the unique index finds it.
+        prefix = str(admission_year)
         last_student = cls.query.filter(
-            cls.student_id.like(f'{admission_year}%')
-        ).order_by(cls.id.desc()).first()
+            cls.student_id >= prefix,
+            cls.student_id < prefix + ':'  # ':' sorts right after '9'
+        ).order_by(cls.student_id.desc()).first()
         
         if last_student:
             last_number = int(last_student.student_id[-4:])
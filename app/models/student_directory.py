@@ -0,0 +1,58 @@
+from app.config.database import db
+
+class StudentDirectory(db.Model):
+    """
+    Read model: one flat row per student with its user and role columns and
+    normalized search keys, so list, search and report reads need no joins.
+    Maintained from the write tables by app.repositories.directory; never
+    write to it directly.
+    """
+    __tablename__ = 'student_directory'
+    __table_args__ = (
+        # Keyset pagination orders for list endpoints (StudentRepository SORT_ORDERS);
+        # sort=student_id uses the unique index on student_id
+        db.Index('ix_student_directory_name', 'last_name', 'first_name', 'id'),
+        db.Index('ix_student_directory_admission',
+                 'admission_date', 'last_name', 'first_name', 'id'),
+        db.Index('ix_student_directory_birth', 'date_of_birth', 'last_name', 'first_name', 'id'),
+        db.Index('ix_student_directory_created', 'created_at', 'id'),
+    )
+    
+    # Student
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    student_id = db.Column(db.String(20), unique=True, nullable=False)
+    date_of_birth = db.Column(db.Date)
+    gender = db.Column(db.String(10))
+    address = db.Column(db.String(255))
+    phone = db.Column(db.String(20))
+    admission_date = db.Column(db.Date)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    
+    # User
+    user_id = db.Column(db.Integer, unique=True, nullable=False)
+    username = db.Column(db.String(80))
+    email = db.Column(db.String(120))
+    first_name = db.Column(db.String(50))
+    last_name = db.Column(db.String(50))
+    is_active = db.Column(db.Boolean)
+    last_login = db.Column(db.DateTime)
+    user_created_at = db.Column(db.DateTime)
+    user_updated_at = db.Column(db.DateTime)
+    
+    # Role
+    role_id = db.Column(db.Integer)
+    role_name = db.Column(db.String(50))
+    role_description = db.Column(db.String(255))
+    role_created_at = db.Column(db.DateTime)
+    role_updated_at = db.Column(db.DateTime)
+    
+    # Normalized keys: lowercased for case-insensitive equality and substring search
+    gender_key = db.Column(db.String(10), index=True)
+    role_name_key = db.Column(db.String(50), index=True)
+    first_name_phonetic = db.Column(db.String(20), index=True)
+    last_name_phonetic = db.Column(db.String(20), index=True)
+    search_text = db.Column(db.Text)
+    
+    def __repr__(self):
+        return f'<StudentDirectory {self.student_id}>'
@@ -1,27 +1,45 @@
 from datetime import datetime
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
 from app.config.database import db
+from app.utils.fuzzy import metaphone
+from app.utils.fieldsets import partial_dict
 
 class User(db.Model):
     __tablename__ = 'users'
     
+    # Fields clients may request with `fields=`
+    FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active',
+              'last_login', 'created_at', 'updated_at', 'role')
+    # Kept out of cached snapshots (see entity_cache.snapshot); loaded when read
+    UNCACHED_FIELDS = ('password_hash',)
+    
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     first_name = db.Column(db.String(50))
     last_name = db.Column(db.String(50))
-    is_active = db.Column(db.Boolean, default=True)
+    first_name_phonetic = db.Column(db.String(20), index=True)
+    last_name_phonetic = db.Column(db.String(20), index=True)
+    is_active = db.Column(db.Boolean, default=True, index=True)
     last_login = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Foreign Keys
-    role_id = db.Column(db.Integer, db.ForeignKey('roles.id'), nullable=False)
+    role_id = db.Column(db.Integer, db.ForeignKey('roles.id'), nullable=False, index=True)
     
     # Relationships
     role = db.relationship('Role', back_populates='users')
-    student = db.relationship('Student', back_populates='user', uselist=False)
+    student = db.relationship('Student', back_populates='user', uselist=False,
+                              cascade='all, delete-orphan')
+    
+    @validates('first_name', 'last_name')
+    def _update_phonetic_key(self, key, value):
+        # Keep the Metaphone key next to the name for fuzzy lookups
+        setattr(self, f'{key}_phonetic', metaphone(value) or None)
+        return value
     
     @property
     def password(self):
@@ -37,7 +55,13 @@ class User(db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
     
-    def to_dict(self, include_role=False):
+    def to_dict(self, include_role=False, fields=None):
+        if fields is not None:
+            user_dict = partial_dict(self, [f for f in fields if f != 'role'])
+            if 'role' in fields:
+                user_dict['role'] = self._role_dict()
+            return user_dict
+        
         user_dict = {
             'id': self.id,
             'username': self.username,
@@ -50,7 +74,15 @@ class User(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
         
-        if include_role and self.role:
-            user_dict['role'] = self.role.to_dict()
+        if include_role and self.role_id is not None:
+            user_dict['role'] = self._role_dict()
         
         return user_dict
+    
+    def _role_dict(self):
+        """Serialized role, from the role registry when an app is running"""
+        from flask import has_app_context
+        if not has_app_context():
+            return self.role.to_dict() if self.role else None
+        from app.repositories.role_registry import get_role_registry
+        return get_role_registry().to_dict(self.role_id)
@@ -1,5 +1,6 @@
-from typing import TypeVar, Type, List, Dict, Any, Optional
+from typing import TypeVar, Type, List, Dict, Any, Optional, Hashable, Tuple
 from app.config.database import db
+from .entity_cache import get_entity_cache
 
 T = TypeVar('T', bound=db.Model)
 
@@ -19,20 +20,37 @@ class BaseRepository:
         db.session.commit()
         return instance
     
+    def get_for_update(self, id: int) -> Optional[T]:
+        """Load an instance to modify, fresh from the database rather than any cache"""
+        return db.session.get(self.model, id, populate_existing=True)
+    
+    def cache_keys(self, instance: T) -> List[Tuple[str, Hashable]]:
+        """Entity cache entries (cache name, key) that a write to `instance` makes stale"""
+        return []
+    
+    def evict(self, keys: List[Tuple[str, Hashable]]) -> None:
+        """Drop entity cache entries; call after the write has been committed"""
+        if keys:
+            get_entity_cache().evict(keys)
+    
     def update(self, id: int, **kwargs) -> Optional[T]:
-        instance = self.get_by_id(id)
+        instance = self.get_for_update(id)
         if instance:
+            keys = self.cache_keys(instance)
             for key, value in kwargs.items():
                 if hasattr(instance, key):
                     setattr(instance, key, value)
             db.session.commit()
+            self.evict(keys)
         return instance
     
     def delete(self, id: int) -> bool:
-        instance = self.get_by_id(id)
+        instance = self.get_for_update(id)
         if instance:
+            keys = self.cache_keys(instance)
             db.session.delete(instance)
             db.session.commit()
+            self.evict(keys)
             return True
         return False
     
@@ -0,0 +1,152 @@
+"""
+Maintenance of the student_directory read model
+
+Rows are rebuilt from students, users and roles with one INSERT ... SELECT
+per flush, inside the flush's transaction, whenever a write touches a
+student, its user or its role. Writes through StudentRepository and
+UserRepository, admin routes and cascades are all covered, because the hook
+sits on the session rather than on individual repository methods.
+"""
+from typing import Iterable, Set, Tuple
+
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from app.config.database import db
+from app.models.role import Role
+from app.models.student import Student
+from app.models.student_directory import StudentDirectory
+from app.models.user import User
+from .flush_changes import students_of_users
+
+# Directory columns that are copied from the write tables
+_SOURCE_COLUMNS = {
+    'id': Student.id,
+    'student_id': Student.student_id,
+    'date_of_birth': Student.date_of_birth,
+    'gender': Student.gender,
+    'address': Student.address,
+    'phone': Student.phone,
+    'admission_date': Student.admission_date,
+    'created_at': Student.created_at,
+    'updated_at': Student.updated_at,
+    'user_id': User.id,
+    'username': User.username,
+    'email': User.email,
+    'first_name': User.first_name,
+    'last_name': User.last_name,
+    'is_active': User.is_active,
+    'last_login': User.last_login,
+    'user_created_at': User.created_at,
+    'user_updated_at': User.updated_at,
+    'role_id': Role.id,
+    'role_name': Role.name,
+    'role_description': Role.description,
+    'role_created_at': Role.created_at,
+    'role_updated_at': Role.updated_at,
+    'first_name_phonetic': User.first_name_phonetic,
+    'last_name_phonetic': User.last_name_phonetic,
+}
+
+
+def _search_text():
+    """Lowercased 'student_id first last email' for substring search"""
+    text = func.coalesce(Student.student_id, '')
+    for column in (User.first_name, User.last_name, User.email):
+        text = text + ' ' + func.coalesce(column, '')
+    return func.lower(text)
+
+
+def source_select():
+    """Directory rows computed from the write tables, in insert column order"""
+    columns = [column.label(name) for name, column in _SOURCE_COLUMNS.items()]
+    columns += [
+        func.lower(Student.gender).label('gender_key'),
+        func.lower(Role.name).label('role_name_key'),
+        _search_text().label('search_text'),
+    ]
+    return select(*columns) \
+        .select_from(Student) \
+        .join(User, User.id == Student.user_id) \
+        .outerjoin(Role, Role.id == User.role_id)
+
+
+def _insert_from(statement):
+    names = list(_SOURCE_COLUMNS) + ['gender_key', 'role_name_key', 'search_text']
+    return insert(StudentDirectory).from_select(names, statement)
+
+
+def refresh(connection, student_ids: Iterable[int]) -> None:
+    """Replace the directory rows of these students with current data"""
+    ids = sorted(set(student_ids))
+    if not ids:
+        return
+    connection.execute(delete(StudentDirectory).where(StudentDirectory.id.in_(ids)))
+    connection.execute(_insert_from(source_select().where(Student.id.in_(ids))))
+
+
+def remove(connection, student_ids: Iterable[int]) -> None:
+    ids = sorted(set(student_ids))
+    if ids:
+        connection.execute(delete(StudentDirectory).where(StudentDirectory.id.in_(ids)))
+
+
+def rebuild(connection) -> int:
+    """Recompute the whole directory; returns the number of rows"""
+    connection.execute(delete(StudentDirectory))
+    connection.execute(_insert_from(source_select()))
+    return connection.execute(select(func.count()).select_from(StudentDirectory)).scalar()
+
+
+def _has_changes(instance) -> bool:
+    state = inspect(instance)
+    return any(attr.history.has_changes() for attr in state.attrs
+               if attr.key in state.mapper.column_attrs)
+
+
+def affected_student_ids(session, flush_context) -> Tuple[Set[int], Set[int]]:
+    """Students to refresh and to remove for the flush in progress"""
+    connection = session.connection()
+    refresh_ids, remove_ids = set(), set()
+    user_ids, role_ids = set(), set()
+
+    for instance in list(session.new) + list(session.dirty):
+        if isinstance(instance, Student) and (instance in session.new or _has_changes(instance)):
+            refresh_ids.add(instance.id)
+        elif isinstance(instance, User) and instance not in session.new and _has_changes(instance):
+            user_ids.add(instance.id)
+        elif isinstance(instance, Role) and instance not in session.new and _has_changes(instance):
+            role_ids.add(instance.id)
+
+    refresh_ids.update(students_of_users(session, flush_context, user_ids))
+    if role_ids:
+        refresh_ids.update(connection.execute(
+            select(Student.id)
+            .join(User, User.id == Student.user_id)
+            .where(User.role_id.in_(role_ids))
+        ).scalars())
+
+    for instance in session.deleted:
+        if isinstance(instance, Student):
+            remove_ids.add(instance.id)
+
+    refresh_ids.discard(None)
+    return refresh_ids - remove_ids, remove_ids
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _populate_student_directory(target, connection, tables=(), **kw):
+    # Backfill students that existed before the table did; runs after
+    # create_all() has created the source tables too
+    if StudentDirectory.__table__ in tables:
+        rebuild(connection)
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_student_directory(session, flush_context):
+    # new/dirty/deleted still describe the flush here, and new rows have ids
+    refresh_ids, remove_ids = affected_student_ids(session, flush_context)
+    if refresh_ids or remove_ids:
+        connection = session.connection()
+        remove(connection, remove_ids)
+        refresh(connection, refresh_ids)
@@ -0,0 +1,131 @@
+"""
+Read-through cache for user and student detail lookups
+
+Users are cached as column snapshots, not as ORM instances, and re-attached
+to the current session on a hit without a query, so lazy relationships work
+as usual. Snapshots leave out the password hash, which is read from the
+database when a login or password change needs it. Students are cached as
+StudentRecords, which are read-only. Writes load a fresh instance through
+BaseRepository.get_for_update() and evict the entries they make stale after
+committing. Evictions are also sent to the
+other workers over the event bus, which evict the same keys from their own
+in-process caches. A shared backend needs no such message: the writer's
+eviction already bumped the key's generation in the store, so a lookup
+racing the write in any worker does not store what it read. Entries whose
+eviction message is lost still expire after the TTL.
+"""
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.config.database import db
+from app.utils.cache import LRUCache
+from app.utils.cache_backends import SharedCache, create_cache
+from app.utils.event_bus import get_event_bus
+
+EXTENSION_KEY = 'entity_cache'
+EVICTED_EVENT = 'cache.evicted'
+CLEARED_EVENT = 'cache.cleared'
+
+
+def snapshot(instance) -> Dict[str, Any]:
+    """
+    Column values of a loaded ORM instance, except the model's
+    UNCACHED_FIELDS: caches may be shared stores, and secrets such as
+    password hashes must not be copied into them
+    """
+    model = type(instance)
+    uncached = getattr(model, 'UNCACHED_FIELDS', ())
+    return {attr.key: getattr(instance, attr.key) for attr in inspect(model).column_attrs
+            if attr.key not in uncached}
+
+
+def restore(model, values: Dict[str, Any]):
+    """
+    An instance of `model` in the current session, built from a snapshot
+    without a query. Columns missing from the snapshot are loaded with one
+    query on first access. An instance the session already holds is
+    returned as it is, so its unflushed changes are kept.
+    """
+    mapper = inspect(model)
+    key = mapper.identity_key_from_primary_key(
+        [values[column.key] for column in mapper.primary_key]
+    )
+    existing = db.session.identity_map.get(key)
+    if existing is not None:
+        return existing
+
+    instance = mapper.class_manager.new_instance()
+    for key, value in values.items():
+        set_committed_value(instance, key, value)
+    make_transient_to_detached(instance)
+    return db.session.merge(instance, load=False)
+
+
+class EntityCache:
+    def __init__(self, max_size: int, ttl: float, backend: str = 'memory',
+                 notify: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.users = create_cache(backend, 'users', max_size, ttl)
+        # username -> user id, checked against the user entry on every hit
+        self.usernames = create_cache(backend, 'usernames', max_size, ttl)
+        self.students = create_cache(backend, 'students', max_size, ttl)
+        # Sends an event to the other workers, e.g. EventBus.notify
+        self._notify = notify
+
+    def caches(self) -> Dict[str, LRUCache]:
+        return {'users': self.users, 'usernames': self.usernames, 'students': self.students}
+
+    def evict(self, keys: Iterable[Tuple[str, Hashable]]) -> None:
+        """
+        Drop (cache name, key) entries, e.g. those from a repository's
+        cache_keys(), in every worker
+        """
+        keys = [[name, key] for name, key in keys]
+        self._evicted({'keys': keys})
+        if self._notify and keys:
+            self._notify(EVICTED_EVENT, {'keys': keys})
+
+    def clear(self) -> None:
+        self._cleared({})
+        if self._notify:
+            self._notify(CLEARED_EVENT, {})
+
+    def _evicted(self, data: Dict[str, Any], shared: bool = True) -> None:
+        caches = self.caches()
+        for name, key in data['keys']:
+            if shared or not isinstance(caches[name], SharedCache):
+                caches[name].delete(key)
+
+    def _cleared(self, data: Dict[str, Any], shared: bool = True) -> None:
+        for cache in self.caches().values():
+            if shared or not isinstance(cache, SharedCache):
+                cache.clear()
+
+    def listen(self, bus) -> None:
+        """Apply evictions sent by other workers over `bus` to in-process caches"""
+        bus.on(EVICTED_EVENT, partial(self._evicted, shared=False))
+        bus.on(CLEARED_EVENT, partial(self._cleared, shared=False))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: cache.stats() for name, cache in self.caches().items()}
+
+
+def get_entity_cache() -> EntityCache:
+    """The current app's EntityCache, created on first use"""
+    cache = current_app.extensions.get(EXTENSION_KEY)
+    if cache is None:
+        bus = get_event_bus()
+        cache = EntityCache(
+            max_size=current_app.config.get('ENTITY_CACHE_SIZE', 1000),
+            ttl=current_app.config.get('ENTITY_CACHE_TTL', 60),
+            backend=current_app.config.get('CACHE_BACKEND', 'memory'),
+            notify=bus.notify
+        )
+        if current_app.extensions.setdefault(EXTENSION_KEY, cache) is cache:
+            cache.listen(bus)
+        cache = current_app.extensions[EXTENSION_KEY]
+    return cache
@@ -0,0 +1,45 @@
+"""
+Lookups shared by the session hooks that maintain derived data
+
+The full-text search, typeahead and student_directory hooks all need the
+students of the users a flush changed. students_of_users() answers that with
+one IN query per flush and remembers the answer until the flush ends, so the
+hooks share a single lookup instead of each running their own.
+"""
+from typing import Any, Dict, Iterable, Set
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.models.student import Student
+
+
+def flush_memo(session, flush_context) -> Dict[str, Any]:
+    """Scratch space shared by the hooks of one flush"""
+    memo = session.info.get('flush_memo')
+    # before_flush can run for a flush that then finds nothing to write and
+    # never reaches after_flush_postexec, so check which flush the memo is for
+    if memo is None or memo['context'] is not flush_context:
+        memo = session.info['flush_memo'] = {'context': flush_context}
+    return memo
+
+
+def students_of_users(session, flush_context, user_ids: Iterable[int]) -> Set[int]:
+    """Primary keys of the students belonging to these users"""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    known = flush_memo(session, flush_context).setdefault('students_by_user', {})
+    missing = sorted(user_ids - known.keys())
+    if missing:
+        for user_id in missing:
+            known[user_id] = []
+        rows = session.connection().execute(
+            select(Student.id, Student.user_id).where(Student.user_id.in_(missing))
+        )
+        for student_id, user_id in rows:
+            known[user_id].append(student_id)
+    return {student_id for user_id in user_ids for student_id in known[user_id]}
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _clear_flush_memo(session, flush_context):
+    session.info.pop('flush_memo', None)
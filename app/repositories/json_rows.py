@@ -0,0 +1,71 @@
+"""
+Database-side JSON assembly
+
+Builds a whole JSON array of row objects in SQL, with json_group_array and
+json_object on SQLite or json_agg and json_build_object on PostgreSQL, so a
+list response can be passed through as text without creating a Python
+object per row. Objects follow the same layouts as the compiled serializers
+in app.utils.serializers, so both paths return identical documents.
+"""
+from typing import Any, Collection, List, Mapping, Tuple
+
+from sqlalchemy import Text, case, cast, func, literal, null
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+SUPPORTED_DIALECTS = ('sqlite', 'postgresql')
+
+
+def supports_json_assembly(dialect_name: str) -> bool:
+    return dialect_name in SUPPORTED_DIALECTS
+
+
+def _scalar(dialect_name: str, column, is_date: bool, is_bool: bool):
+    if dialect_name != 'sqlite':
+        # json_build_object already writes ISO timestamps and real booleans
+        return column
+    if is_date:
+        # SQLite stores 'YYYY-MM-DD HH:MM:SS.ffffff'; match datetime.isoformat()
+        return func.replace(func.replace(column, ' ', 'T'), '.000000', '')
+    if is_bool:
+        return func.json(case((column.is_(None), null()), (column, 'true'), else_='false'))
+    return column
+
+
+def json_object_expr(dialect_name: str, layout: List[Tuple[str, Any]], columns: Mapping[str, Any],
+                     dates: Collection[str] = (), booleans: Collection[str] = ()):
+    """
+    SQL expression building one JSON object per row from a serializer layout
+    of (key, attribute) pairs or (key, (guard_attribute, layout)) nested
+    objects, reading attributes from `columns`
+    """
+    build = func.json_object if dialect_name == 'sqlite' else func.json_build_object
+    arguments = []
+    for key, attr in layout:
+        if isinstance(attr, tuple):
+            guard, nested = attr
+            value = json_object_expr(dialect_name, nested, columns, dates, booleans)
+            if guard is not None:
+                value = case((columns[guard].is_(None), null()), else_=value)
+                if dialect_name == 'sqlite':
+                    # CASE drops SQLite's JSON subtype; json() restores it
+                    value = func.json(value)
+        else:
+            value = _scalar(dialect_name, columns[attr], attr in dates, attr in booleans)
+        arguments.extend((literal(key), value))
+    return build(*arguments)
+
+
+def json_array_agg(dialect_name: str, element, order_by=None, where=None):
+    """
+    Aggregate JSON `element`s into one JSON array as text, '[]' for no rows.
+    SQLite keeps the order rows arrive in, so order the source subquery there.
+    """
+    if dialect_name == 'sqlite':
+        aggregate = func.json_group_array(element)
+    else:
+        if order_by is not None:
+            element = aggregate_order_by(element, order_by)
+        aggregate = func.json_agg(element)
+    if where is not None:
+        aggregate = aggregate.filter(where)
+    return func.coalesce(cast(aggregate, Text), '[]')
@@ -0,0 +1,100 @@
+"""
+Per-worker BK-tree of distinct first and last names
+
+Fuzzy search expands each query word to the known names within a few edits
+and matches their Metaphone keys against the indexed phonetic columns on
+users, so a misspelled query costs one indexed lookup. Loading the tree reads
+every user's names once per worker; gunicorn workers do it when they start
+(see gunicorn.conf.py). After that it only grows: names added by committed
+writes are inserted, and sent to the other workers over the event bus, while
+names that disappear stay as harmless extra candidates until the worker
+restarts.
+"""
+import threading
+from functools import partial
+from typing import Set
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+from app.config.database import db
+from app.utils.event_bus import get_event_bus
+from app.utils.fuzzy import BKTree, max_typos, metaphone
+
+EXTENSION_KEY = 'name_bktree'
+ADDED_EVENT = 'names.added'
+# Names per bus notice, keeping each datagram well under its size limit
+NOTICE_BATCH = 1000
+
+_load_lock = threading.Lock()
+
+
+def get_name_tree(load: bool = True):
+    tree = current_app.extensions.get(EXTENSION_KEY)
+    if tree is None and load:
+        with _load_lock:
+            tree = current_app.extensions.get(EXTENSION_KEY)
+            if tree is None:
+                tree = BKTree()
+                get_event_bus().on(ADDED_EVENT, partial(_add_names, tree))
+                rows = db.session.execute(text(
+                    "SELECT first_name FROM users UNION SELECT last_name FROM users"
+                ))
+                _add_names(tree, {'names': [name.lower() for (name,) in rows if name]})
+                current_app.extensions[EXTENSION_KEY] = tree
+    return tree
+
+
+def _add_names(tree: BKTree, data) -> None:
+    for name in data.get('names', ()):
+        tree.add(name)
+
+
+def phonetic_candidates(word: str) -> Set[str]:
+    """Metaphone keys of the word and of every known name close to it"""
+    word = word.lower()
+    keys = {metaphone(word)}
+    for _, name in get_name_tree().search(word, max_typos(word)):
+        keys.add(metaphone(name))
+    keys.discard('')
+    return keys
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_names(session, flush_context, instances):
+    # Collected even without a local tree: other workers need the names
+    if not has_app_context():
+        return
+    from app.models.user import User
+    names = session.info.setdefault('pending_names', set())
+    for instance in session.new:
+        if isinstance(instance, User):
+            names.update(n.lower() for n in (instance.first_name, instance.last_name) if n)
+    # Logins and other edits of a user leave the names alone
+    for instance in session.dirty:
+        if isinstance(instance, User):
+            attrs = inspect(instance).attrs
+            for attr in (attrs.first_name, attrs.last_name):
+                names.update(n.lower() for n in attr.history.added if n)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_names(session):
+    names = session.info.pop('pending_names', None)
+    if not names or not has_app_context():
+        return
+    names = sorted(names)
+    tree = get_name_tree(load=False)
+    if tree is not None:
+        _add_names(tree, {'names': names})
+    try:
+        for start in range(0, len(names), NOTICE_BATCH):
+            get_event_bus().notify(ADDED_EVENT, {'names': names[start:start + NOTICE_BATCH]})
+    except Exception as e:
+        current_app.logger.error(f"Error announcing new names: {str(e)}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_names(session):
+    session.info.pop('pending_names', None)
@@ -0,0 +1,159 @@
+"""
+Transactional outbox of student, user and role writes
+
+An after_flush hook inserts one outbox row per written entity on the flush's
+own connection, so the events commit or roll back together with the write.
+This covers BaseRepository.create/update/delete, the specialized repository
+methods, admin routes and cascades alike, since they all flush the session.
+
+Readers tail the outbox by `seq`, so sequence numbers must become visible
+in order: a reader that has seen seq 11 must never later find a seq 10 that
+committed after it. Transactions that write tracked entities therefore run
+one at a time from their first flush until they end. PostgreSQL takes a
+transaction-level advisory lock for this; SQLite's database write lock
+already has the same effect.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from sqlalchemy import event, func, inspect, insert, select, text
+from sqlalchemy.orm import Session
+from app.models.outbox import OutboxEvent
+from app.models.role import Role
+from app.models.student import Student
+from app.models.user import User
+from .base_repo import BaseRepository
+from app import db
+
+TRACKED_ENTITIES = {Student: 'student', User: 'user', Role: 'role'}
+
+# Maintained by the database or derived from other columns, plus last_login
+# so that logging in is not a write to users: it neither takes the outbox lock
+# nor retires cached reads. The directory keeps last_login current through its
+# own hooks; cached user and student lists may show it up to QUERY_CACHE_TTL old.
+IGNORED_FIELDS = ('updated_at', 'first_name_phonetic', 'last_name_phonetic', 'last_login')
+
+# User columns that appear in student payloads; a change to one is also a
+# student update
+USER_TRACKED_FIELDS = ('username', 'email', 'first_name', 'last_name', 'is_active', 'role_id')
+
+# Advisory lock that serializes outbox writers on PostgreSQL ('outbox' in ASCII)
+OUTBOX_LOCK_KEY = 0x6f7574626f78
+
+EVENT_COLUMNS = (OutboxEvent.seq, OutboxEvent.entity, OutboxEvent.entity_id,
+                 OutboxEvent.operation, OutboxEvent.changes, OutboxEvent.created_at)
+
+
+class OutboxRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(OutboxEvent)
+
+    def head(self, entity: Optional[str] = None) -> int:
+        """Sequence number of the latest event (for `entity`), 0 if none"""
+        return head(db.session, entity)
+
+    def events_since(self, entity: str, after: int, limit: int) -> Tuple[List[OutboxEvent], bool]:
+        """Up to `limit` events for `entity` with a sequence number above `after`, oldest first"""
+        events = OutboxEvent.query \
+            .filter(OutboxEvent.entity == entity, OutboxEvent.seq > after) \
+            .order_by(OutboxEvent.seq) \
+            .limit(limit + 1) \
+            .all()
+        return events[:limit], len(events) > limit
+
+
+def head(connection, entity: Optional[str] = None) -> int:
+    statement = select(func.coalesce(func.max(OutboxEvent.seq), 0))
+    if entity is not None:
+        statement = statement.where(OutboxEvent.entity == entity)
+    return connection.execute(statement).scalar()
+
+
+def read_events(connection, after: int, limit: int,
+                entities: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """Up to `limit` events after `after` as plain dicts, oldest first"""
+    statement = select(*EVENT_COLUMNS).where(OutboxEvent.seq > after)
+    if entities is not None:
+        statement = statement.where(OutboxEvent.entity.in_(list(entities)))
+    statement = statement.order_by(OutboxEvent.seq).limit(limit)
+    return [dict(row._mapping) for row in connection.execute(statement)]
+
+
+def _changed_fields(instance) -> List[str]:
+    state = inspect(instance)
+    return sorted(
+        attr.key for attr in state.attrs
+        if attr.key in state.mapper.column_attrs
+        and attr.key not in IGNORED_FIELDS
+        and attr.history.has_changes()
+    )
+
+
+def pending_events(session) -> List[Dict[str, Any]]:
+    """Outbox rows for the flush in progress, ordered by entity and id"""
+    events = {}
+
+    for instance in session.dirty:
+        entity = TRACKED_ENTITIES.get(type(instance))
+        if entity is None or instance in session.new:
+            continue
+        changed = _changed_fields(instance)
+        if not changed:
+            continue
+        events[(entity, instance.id)] = (OutboxEvent.UPDATE, changed)
+
+        user_changes = [name for name in changed if name in USER_TRACKED_FIELDS]
+        if isinstance(instance, User) and user_changes and instance.student is not None:
+            key = ('student', instance.student.id)
+            student_changes = events.get(key, (None, []))[1]
+            events[key] = (OutboxEvent.UPDATE,
+                           sorted(student_changes + [f'user.{name}' for name in user_changes]))
+
+    for instance in session.new:
+        entity = TRACKED_ENTITIES.get(type(instance))
+        if entity is not None:
+            events[(entity, instance.id)] = (OutboxEvent.CREATE, None)
+
+    for instance in session.deleted:
+        entity = TRACKED_ENTITIES.get(type(instance))
+        if entity is not None:
+            events[(entity, instance.id)] = (OutboxEvent.DELETE, None)
+
+    now = datetime.utcnow()
+    return [
+        {'entity': entity, 'entity_id': pk, 'operation': operation,
+         'changes': changes, 'created_at': now}
+        for (entity, pk), (operation, changes) in sorted(events.items())
+        if pk is not None
+    ]
+
+
+@event.listens_for(Session, 'before_flush')
+def _lock_outbox(session, flush_context, instances):
+    # Locking before the flush, rather than at the outbox insert, means the
+    # lock is taken before the row locks of this flush's own writes
+    if session.info.get('outbox_locked') or not (
+        any(type(instance) in TRACKED_ENTITIES for instance in (*session.new, *session.deleted))
+        or any(type(instance) in TRACKED_ENTITIES and _changed_fields(instance)
+               for instance in session.dirty)
+    ):
+        return
+    connection = session.connection()
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {'key': OUTBOX_LOCK_KEY})
+    session.info['outbox_locked'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _unlock_outbox(session):
+    # The advisory lock is released with the transaction
+    session.info.pop('outbox_locked', None)
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_outbox_events(session, flush_context):
+    # new/dirty/deleted still describe the flush here, and new rows have ids
+    rows = pending_events(session)
+    if rows:
+        session.connection().execute(insert(OutboxEvent), rows)
+        session.info['outbox_written'] = True
@@ -0,0 +1,77 @@
+"""
+Result cache for repeated list and search queries
+
+Results are keyed by the query's normalized parameters plus a version per
+table it reads. A table's version is the outbox head for its entity, so any
+committed write to that table, from any worker, moves lookups on to a new key
+and the old entries simply age out of the LRU. Checking the versions costs
+one indexed lookup per table instead of re-running the query, and since no
+entry is ever invalidated in place, a shared backend needs no broadcasts.
+"""
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from flask import current_app
+
+from app.config.database import db
+from app.utils.cache import MISSING
+from app.utils.cache_backends import create_cache
+from . import outbox_repo
+
+EXTENSION_KEY = 'query_cache'
+
+
+def normalize_term(search_term: Optional[str]) -> Optional[str]:
+    """Search terms match case-insensitively, so 'Adams' and 'adams' share an entry"""
+    return search_term.lower() if search_term else None
+
+
+def normalize_filters(filters: Dict[str, Any], lower: bool = False) -> Tuple[Tuple[str, Any], ...]:
+    """Hashable, order-independent form of keyword filters, without unset ones"""
+    return tuple(sorted(
+        (key, value.lower() if lower and isinstance(value, str) else value)
+        for key, value in filters.items() if value is not None
+    ))
+
+
+class QueryCache:
+    def __init__(self, max_size: int, ttl: float, backend: str = 'memory'):
+        self.results = create_cache(backend, 'queries', max_size, ttl)
+
+    def versions(self, entities: Iterable[str]) -> Tuple[int, ...]:
+        """Current version of each entity's table"""
+        connection = db.session.connection()
+        return tuple(outbox_repo.head(connection, entity) for entity in entities)
+
+    def get_or_load(self, entities: Tuple[str, ...], key: Hashable, load: Callable[[], Any]) -> Any:
+        """
+        Cached result of `load` for `key`, valid while none of `entities` has
+        been written. `load` must return a value that callers do not mutate.
+        """
+        # A version read inside an uncommitted write may be rolled back and reused
+        if self.results.max_size <= 0 or db.session.info.get('outbox_written'):
+            return load()
+
+        versioned_key = (key, self.versions(entities))
+        result = self.results.get(versioned_key, MISSING)
+        if result is MISSING:
+            result = load()
+            self.results.set(versioned_key, result)
+        return result
+
+    def clear(self) -> None:
+        self.results.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.results.stats()
+
+
+def get_query_cache() -> QueryCache:
+    """The current app's QueryCache, created on first use"""
+    cache = current_app.extensions.get(EXTENSION_KEY)
+    if cache is None:
+        cache = current_app.extensions.setdefault(EXTENSION_KEY, QueryCache(
+            max_size=current_app.config.get('QUERY_CACHE_SIZE', 500),
+            ttl=current_app.config.get('QUERY_CACHE_TTL', 300),
+            backend=current_app.config.get('CACHE_BACKEND', 'memory')
+        ))
+    return cache
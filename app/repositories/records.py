@@ -0,0 +1,94 @@
+"""
+Lightweight read-only records for list and report queries
+
+These are filled straight from Core `select()` rows of the student_directory
+read model, skipping joins, ORM identity-map bookkeeping and attribute
+instrumentation. Use them for read paths that only serialize or print rows;
+load the ORM models for anything that writes.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.models.student import Student
+from app.models.student_directory import StudentDirectory
+from app.utils.serializers import fieldset_key, student_record_serializer
+
+# Record attribute -> student_directory column, in the order the full record selects them
+STUDENT_RECORD_COLUMNS = {
+    name: getattr(StudentDirectory, name) for name in (
+        'id', 'student_id', 'date_of_birth', 'gender', 'address', 'phone',
+        'admission_date', 'created_at', 'updated_at',
+        'user_id', 'username', 'email', 'first_name', 'last_name', 'is_active',
+        'last_login', 'user_created_at', 'user_updated_at',
+        'role_id', 'role_name', 'role_description', 'role_created_at', 'role_updated_at',
+    )
+}
+
+# Fieldset names (see Student.FIELDS / User.FIELDS) -> record attributes
+STUDENT_FIELD_ATTRS = {field: field for field in Student.FIELDS}
+USER_FIELD_ATTRS = {
+    'id': 'user_id',
+    'username': 'username',
+    'email': 'email',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'is_active': 'is_active',
+    'last_login': 'last_login',
+    'created_at': 'user_created_at',
+    'updated_at': 'user_updated_at',
+}
+ROLE_LAYOUT = [
+    ('id', 'role_id'),
+    ('name', 'role_name'),
+    ('description', 'role_description'),
+    ('created_at', 'role_created_at'),
+    ('updated_at', 'role_updated_at'),
+]
+DATE_ATTRS = frozenset((
+    'date_of_birth', 'admission_date', 'created_at', 'updated_at', 'last_login',
+    'user_created_at', 'user_updated_at', 'role_created_at', 'role_updated_at'
+))
+
+
+class StudentRecord:
+    """A student joined with its user and role, as plain slotted attributes"""
+
+    __slots__ = tuple(STUDENT_RECORD_COLUMNS)
+
+    @classmethod
+    def from_row(cls, names: Sequence[str], row) -> 'StudentRecord':
+        record = cls.__new__(cls)
+        for name, value in zip(names, row):
+            setattr(record, name, value)
+        return record
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.first_name or ''} {self.last_name or ''}".strip()
+
+    def to_dict(self, fieldset: Optional[Dict[str, List[str]]] = None,
+                iso: bool = True) -> Dict[str, Any]:
+        """
+        Same shape as Student.to_dict() with a nested user and role, or only the
+        fields in `fieldset`. With iso=False dates stay date objects.
+        """
+        return student_record_serializer(fieldset_key(fieldset), iso)(self)
+
+
+def record_columns(fieldset: Optional[Dict[str, List[str]]] = None,
+                   always: Sequence[str] = ('id', 'first_name', 'last_name')) -> List[str]:
+    """
+    Record attributes to select for a fieldset: everything when None, otherwise
+    the requested fields plus `always` (the keyset pagination key)
+    """
+    if fieldset is None:
+        return list(STUDENT_RECORD_COLUMNS)
+
+    names = set(always)
+    names.update(STUDENT_FIELD_ATTRS[f] for f in fieldset.get('', []))
+    for field in fieldset.get('user', []):
+        if field == 'role':
+            names.update(attr for _, attr in ROLE_LAYOUT)
+        else:
+            names.add(USER_FIELD_ATTRS[field])
+    return [name for name in STUDENT_RECORD_COLUMNS if name in names]
+
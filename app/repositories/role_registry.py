@@ -0,0 +1,111 @@
+"""
+In-process registry of roles
+
+Roles are reference data: a handful of rows that almost never change. The
+registry loads them all in one query on first use and then resolves role
+names, ids and serialized roles from memory. A commit that writes a role
+reloads it in the writing worker and sends a notice over the event bus so
+the other workers reload too; ROLE_REGISTRY_TTL bounds how long a worker
+that missed the notice keeps an old copy.
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config.database import db
+from app.models.role import Role
+from app.utils.event_bus import get_event_bus
+
+EXTENSION_KEY = 'role_registry'
+CHANGED_EVENT = 'roles.changed'
+
+
+class RoleRegistry:
+    def __init__(self, ttl: float = 300, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._ids: Dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+        self.loads = 0
+
+    def _roles(self) -> Dict[int, Dict[str, Any]]:
+        if self._loaded_at is None or self._loaded_at + self.ttl <= self._clock():
+            with self._lock:
+                if self._loaded_at is None or self._loaded_at + self.ttl <= self._clock():
+                    self._load()
+        return self._by_id
+
+    def _load(self) -> None:
+        with db.session.no_autoflush:
+            roles = {role.id: role.to_dict() for role in Role.query.order_by(Role.id)}
+        self._ids = {values['name']: pk for pk, values in roles.items()}
+        self._by_id = roles
+        self._loaded_at = self._clock()
+        self.loads += 1
+
+    def invalidate(self) -> None:
+        """Reload on next use"""
+        self._loaded_at = None
+
+    def id_for(self, name: str) -> Optional[int]:
+        """Id of the role called `name`, or None"""
+        self._roles()
+        return self._ids.get(name)
+
+    def name_for(self, role_id: Optional[int]) -> Optional[str]:
+        role = self._roles().get(role_id)
+        return role['name'] if role else None
+
+    def to_dict(self, role_id: Optional[int]) -> Optional[Dict[str, Any]]:
+        """Same as Role.to_dict() for the role with this id, or None"""
+        role = self._roles().get(role_id)
+        return dict(role) if role else None
+
+    def all(self) -> List[Dict[str, Any]]:
+        return [dict(role) for role in self._roles().values()]
+
+
+def get_role_registry() -> RoleRegistry:
+    """The current app's RoleRegistry, created on first use"""
+    registry = current_app.extensions.get(EXTENSION_KEY)
+    if registry is None:
+        registry = RoleRegistry(ttl=current_app.config.get('ROLE_REGISTRY_TTL', 300))
+        if current_app.extensions.setdefault(EXTENSION_KEY, registry) is registry:
+            get_event_bus().on(CHANGED_EVENT, lambda data: registry.invalidate())
+        registry = current_app.extensions[EXTENSION_KEY]
+    return registry
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_role_changes(session, flush_context):
+    if any(isinstance(instance, Role)
+           for instance in (*session.new, *session.dirty, *session.deleted)):
+        session.info['roles_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _reload_after_commit(session):
+    if not session.info.pop('roles_changed', False) or not has_app_context():
+        return
+    registry = current_app.extensions.get(EXTENSION_KEY)
+    if registry is not None:
+        registry.invalidate()
+    try:
+        get_event_bus().notify(CHANGED_EVENT, {})
+    except Exception as e:
+        current_app.logger.error(f"Error announcing role changes: {str(e)}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _reload_after_rollback(session):
+    # The registry may have been loaded from the rolled-back writes
+    if session.info.pop('roles_changed', False) and has_app_context():
+        registry = current_app.extensions.get(EXTENSION_KEY)
+        if registry is not None:
+            registry.invalidate()
@@ -0,0 +1,315 @@
+"""
+Full-text search indexes for students and users
+
+SQLite uses an FTS5 virtual table, PostgreSQL a tsvector column with a GIN
+index. Index rows are keyed on the primary key of the row they describe and
+are rewritten from an after_flush hook, so they are always updated in the same
+transaction as the write that changed them. On any other database, or when
+SQLite was built without FTS5, `available()` is False and callers fall back to
+ILIKE matching.
+"""
+import re
+import weakref
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import Float, Integer, bindparam, event, inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.config.database import db
+from .flush_changes import flush_memo, students_of_users
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(search_term: str) -> List[str]:
+    """Split a search term into lower-cased word tokens"""
+    return [token.lower() for token in _TOKEN_RE.findall(search_term or '')]
+
+
+class FullTextIndex:
+    """
+    A full-text index over rows of one source table
+
+    `columns` are the indexed text expressions (aliases of `source_sql`),
+    `source_sql` selects `pk` plus those columns and must end with a WHERE
+    clause that the index appends an id filter to. `watch` maps model classes
+    to the attributes that affect the indexed text and a function that turns
+    a list of changed instances into the primary keys they affect.
+    """
+
+    def __init__(self, name: str, columns: List[str], source_sql: str, watch):
+        self.name = name
+        self.columns = columns
+        self.source_sql = source_sql
+        self.watch = watch
+        self._available = weakref.WeakKeyDictionary()
+
+    # DDL
+
+    def create(self, connection) -> bool:
+        """Create the index table if needed; returns True when it was created"""
+        dialect = connection.dialect.name
+        if self._exists(connection):
+            return False
+
+        if dialect == 'sqlite':
+            try:
+                connection.execute(text(
+                    f"CREATE VIRTUAL TABLE {self.name} USING fts5("
+                    f"{', '.join(self.columns)}, tokenize='unicode61')"
+                ))
+            except OperationalError:
+                # SQLite built without FTS5
+                return False
+        elif dialect == 'postgresql':
+            connection.execute(text(
+                f"CREATE TABLE {self.name} (pk INTEGER PRIMARY KEY, document TSVECTOR NOT NULL)"
+            ))
+            connection.execute(text(
+                f"CREATE INDEX ix_{self.name}_document ON {self.name} USING GIN (document)"
+            ))
+        else:
+            return False
+
+        self._available.pop(connection.engine, None)
+        return True
+
+    def drop(self, connection):
+        if connection.dialect.name in ('sqlite', 'postgresql'):
+            connection.execute(text(f"DROP TABLE IF EXISTS {self.name}"))
+        self._available.pop(connection.engine, None)
+
+    def _exists(self, connection) -> bool:
+        return inspect(connection).has_table(self.name)
+
+    def available(self, connection=None) -> bool:
+        """Whether the index table exists on the current database"""
+        connection = connection or db.session.connection()
+        engine = connection.engine
+        if engine not in self._available:
+            self._available[engine] = (
+                connection.dialect.name in ('sqlite', 'postgresql') and self._exists(connection)
+            )
+        return self._available[engine]
+
+    # Maintenance
+
+    def reindex(self, connection, ids: Iterable[int]):
+        """Rewrite the index rows for the given primary keys from the source table"""
+        ids = list(ids)
+        if not ids:
+            return
+        params = {'ids': ids}
+        dialect = connection.dialect.name
+
+        if dialect == 'sqlite':
+            delete = text(f"DELETE FROM {self.name} WHERE rowid IN :ids")
+            insert = text(
+                f"INSERT INTO {self.name} (rowid, {', '.join(self.columns)}) "
+                f"SELECT pk, {', '.join(self.columns)} FROM ({self.source_sql} AND pk IN :ids)"
+            )
+        else:
+            document = " || ' ' || ".join(
+                f"coalesce(translate({column}, '@.', '  '), '')" for column in self.columns
+            )
+            delete = text(f"DELETE FROM {self.name} WHERE pk IN :ids")
+            insert = text(
+                f"INSERT INTO {self.name} (pk, document) "
+                f"SELECT pk, to_tsvector('simple', {document}) "
+                f"FROM ({self.source_sql} AND pk IN :ids) AS source"
+            )
+
+        delete = delete.bindparams(bindparam('ids', expanding=True))
+        insert = insert.bindparams(bindparam('ids', expanding=True))
+        connection.execute(delete, params)
+        connection.execute(insert, params)
+
+    def remove(self, connection, ids: Iterable[int]):
+        ids = list(ids)
+        if not ids:
+            return
+        key = 'rowid' if connection.dialect.name == 'sqlite' else 'pk'
+        statement = text(f"DELETE FROM {self.name} WHERE {key} IN :ids").bindparams(
+            bindparam('ids', expanding=True)
+        )
+        connection.execute(statement, {'ids': ids})
+
+    def rebuild(self, connection) -> int:
+        """Drop, recreate and repopulate the index; returns the number of rows indexed"""
+        self.drop(connection)
+        if not self.create(connection):
+            return 0
+        return self.populate(connection)
+
+    def populate(self, connection, batch_size: int = 1000) -> int:
+        """Index every row of the source table"""
+        ids = [row[0] for row in connection.execute(text(f"SELECT pk FROM ({self.source_sql})"))]
+        for start in range(0, len(ids), batch_size):
+            self.reindex(connection, ids[start:start + batch_size])
+        return len(ids)
+
+    # Queries
+
+    def match_clause(self, search_term: str):
+        """
+        Textual select of matching primary keys (column `pk`) and their
+        `rank`, lower for better matches, or None when the term has no
+        searchable tokens. Every token must match as a word prefix. Join
+        against `.subquery()` of it rather than binding the keys as
+        parameters, and order by its rank.
+        """
+        tokens = tokenize(search_term)
+        if not tokens:
+            return None
+
+        if db.session.connection().dialect.name == 'sqlite':
+            query = ' '.join('"' + token.replace('"', '""') + '"*' for token in tokens)
+            # FTS5's rank is bm25(), which is lower for better matches
+            statement = text(
+                f"SELECT rowid AS pk, rank AS rank FROM {self.name} "
+                f"WHERE {self.name} MATCH :query"
+            )
+        else:
+            query = ' & '.join(token + ':*' for token in tokens)
+            statement = text(
+                f"SELECT pk, -ts_rank(document, to_tsquery('simple', :query)) AS rank "
+                f"FROM {self.name} WHERE document @@ to_tsquery('simple', :query)"
+            )
+        return statement.bindparams(query=query).columns(pk=Integer, rank=Float)
+
+    # Change tracking
+
+    def resolve(self, session, flush_context, instances: Iterable[Any]) -> Set[int]:
+        """Primary keys of the index rows that these watched instances affect"""
+        by_model = {}
+        for instance in instances:
+            by_model.setdefault(type(instance), []).append(instance)
+        pks = set()
+        for model, group in by_model.items():
+            pks.update(self.watch[model][1](session, flush_context, group))
+        return pks
+
+    def affected_ids(self, session, flush_context) -> Tuple[Set[int], Set[int]]:
+        """Primary keys to reindex and to remove for the pending flush"""
+        affected = flush_memo(session, flush_context).setdefault('search_index_affected', {})
+        if self.name not in affected:
+            changed = []
+            for instance in list(session.new) + list(session.dirty):
+                spec = self.watch.get(type(instance))
+                if not spec:
+                    continue
+                state = inspect(instance)
+                if instance in session.new or any(
+                    state.attrs[name].history.has_changes() for name in spec[0]
+                ):
+                    changed.append(instance)
+            deleted = [instance for instance in session.deleted if type(instance) in self.watch]
+
+            to_remove = self.resolve(session, flush_context, deleted)
+            to_reindex = self.resolve(session, flush_context, changed) - to_remove
+            affected[self.name] = (to_reindex, to_remove)
+        to_reindex, to_remove = affected[self.name]
+        return set(to_reindex), set(to_remove)
+
+
+def _student_pks(session, flush_context, students):
+    return {student.id for student in students if student.id is not None}
+
+
+def _students_of_users(session, flush_context, users):
+    return students_of_users(session, flush_context, [user.id for user in users])
+
+
+def _user_pks(session, flush_context, users):
+    return {user.id for user in users if user.id is not None}
+
+
+def _build_indexes() -> Dict[str, FullTextIndex]:
+    from app.models.student import Student
+    from app.models.user import User
+
+    name_fields = ['first_name', 'last_name', 'email']
+
+    return {
+        'students': FullTextIndex(
+            name='student_search',
+            columns=['student_id', 'first_name', 'last_name', 'email'],
+            source_sql=(
+                "SELECT students.id AS pk, students.student_id AS student_id, "
+                "users.first_name AS first_name, users.last_name AS last_name, "
+                "users.email AS email "
+                "FROM students JOIN users ON users.id = students.user_id WHERE 1 = 1"
+            ),
+            watch={
+                Student: (['student_id', 'user_id'], _student_pks),
+                User: (name_fields, _students_of_users),
+            },
+        ),
+        'users': FullTextIndex(
+            name='user_search',
+            columns=['username', 'email', 'first_name', 'last_name'],
+            source_sql=(
+                "SELECT users.id AS pk, users.username AS username, users.email AS email, "
+                "users.first_name AS first_name, users.last_name AS last_name "
+                "FROM users WHERE 1 = 1"
+            ),
+            watch={
+                User: (['username'] + name_fields, _user_pks),
+            },
+        ),
+    }
+
+
+indexes = _build_indexes()
+student_search_index = indexes['students']
+user_search_index = indexes['users']
+# Every model class some index watches
+_WATCHED = frozenset(model for index in indexes.values() for model in index.watch)
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_indexes(target, connection, **kw):
+    for index in indexes.values():
+        if index.create(connection):
+            # Backfill rows that existed before the index did
+            index.populate(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_search_indexes(target, connection, **kw):
+    for index in indexes.values():
+        index.drop(connection)
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_search_changes(session, flush_context, instances):
+    # Most flushes write nothing an index watches; skip them before touching
+    # the connection
+    if not any(type(instance) in _WATCHED
+               for instance in (*session.new, *session.dirty, *session.deleted)):
+        return
+    connection = session.connection()
+    pending = session.info.setdefault('search_index_pending', {})
+    for key, index in indexes.items():
+        if not index.available(connection):
+            continue
+        reindex, remove = index.affected_ids(session, flush_context)
+        entry = pending.setdefault(key, {'reindex': set(), 'remove': set(), 'new': []})
+        entry['reindex'].update(reindex)
+        entry['remove'].update(remove)
+        # New rows have no primary key until the flush has run
+        entry['new'].extend(i for i in session.new if type(i) in index.watch)
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_search_changes(session, flush_context):
+    pending = session.info.pop('search_index_pending', None)
+    if not pending:
+        return
+    connection = session.connection()
+    for key, entry in pending.items():
+        index = indexes[key]
+        reindex = entry['reindex'] | index.resolve(session, flush_context, entry['new'])
+        index.remove(connection, entry['remove'])
+        index.reindex(connection, reindex - entry['remove'])
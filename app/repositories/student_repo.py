@@ -1,10 +1,41 @@
-from typing import Optional, List, Dict, Any
-from datetime import date
+from typing import Optional, List, Dict, Any, Tuple, Iterator, Hashable
+from datetime import date, datetime
+from sqlalchemy import and_, case, func, or_, select, tuple_
+from sqlalchemy.orm import joinedload
 from app.models.student import Student
+from app.models.student_directory import StudentDirectory
 from app.models.user import User
 from .base_repo import BaseRepository
+from . import directory
+from .entity_cache import get_entity_cache, restore, snapshot
+from .query_cache import get_query_cache, normalize_filters, normalize_term
+from .json_rows import json_array_agg, json_object_expr, supports_json_assembly
+from .records import DATE_ATTRS, STUDENT_RECORD_COLUMNS, StudentRecord, record_columns
+from .search_index import student_search_index, tokenize
+from .name_index import phonetic_candidates
+from app.utils.fuzzy import levenshtein
+from app.utils.serializers import fieldset_key, student_record_layout, student_record_serializer
+from app.utils.single_flight import coalesce
 from app import db
 
+# Sort orders offered by the list endpoints (`sort=`). Each ends in a unique
+# column so it can key a cursor, and each matches an index on
+# student_directory that the database walks forwards or backwards.
+SORT_ORDERS = {
+    'name': ('last_name', 'first_name', 'id'),
+    'student_id': ('student_id',),
+    'admission_date': ('admission_date', 'last_name', 'first_name', 'id'),
+    'date_of_birth': ('date_of_birth', 'last_name', 'first_name', 'id'),
+    'created_at': ('created_at', 'id'),
+}
+DEFAULT_SORT = 'name'
+
+# Outbox entities whose writes change what student reads return. Directory
+# rows copy user and role columns; edits of the user columns they show are
+# also recorded as student updates (see outbox_repo.USER_TRACKED_FIELDS), but role edits
+# are not, and other user writes such as logins leave student reads alone.
+STUDENT_READ_ENTITIES = ('student', 'role')
+
 class StudentRepository(BaseRepository):
     def __init__(self):
         super().__init__(Student)
@@ -26,24 +57,89 @@ class StudentRepository(BaseRepository):
         db.session.commit()
         return student
     
+    def bulk_create_students(
+        self, rows: List[Tuple[Dict[str, Any], Dict[str, Any]]]
+    ) -> List[Student]:
+        """
+        Create users and their students from (user fields, student fields)
+        pairs in one flush and one commit. User fields carry a password_hash
+        rather than a password. The unit of work batches the INSERTs, and the
+        flush hooks update the directory, search indexes and outbox once for
+        the whole batch.
+        """
+        students = self.add_students(rows)
+        db.session.commit()
+        return students
+    
+    def add_students(self, rows: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[Student]:
+        """
+        Add users and their students to the session; the caller commits.
+        Students without a student_id continue this year's sequence,
+        skipping any IDs given explicitly in the same batch.
+        """
+        admission_year = date.today().year
+        next_number = int(Student.generate_student_id(admission_year)[len(str(admission_year)):])
+        explicit = {student_fields['student_id'] for _, student_fields in rows
+                    if student_fields.get('student_id')}
+        
+        students = []
+        for user_fields, student_fields in rows:
+            student_fields = dict(student_fields)
+            if not student_fields.get('student_id'):
+                while f"{admission_year}{next_number:04d}" in explicit:
+                    next_number += 1
+                student_fields['student_id'] = f"{admission_year}{next_number:04d}"
+                next_number += 1
+            students.append(Student(user=User(**user_fields), **student_fields))
+        
+        db.session.add_all(students)
+        return students
+    
+    def get_by_student_ids(self, student_ids: List[str]) -> Dict[str, Student]:
+        """Students with these student IDs and their users, fresh from the database"""
+        if not student_ids:
+            return {}
+        students = Student.query.options(joinedload(Student.user)).filter(
+            Student.student_id.in_(set(student_ids))
+        ).populate_existing()
+        return {student.student_id: student for student in students}
+    
+    def rebuild_directory(self) -> int:
+        """Recompute the student_directory read model; the caller commits"""
+        return directory.rebuild(db.session.connection())
+    
     def get_by_user_id(self, user_id: int) -> Optional[Student]:
         return self.first(user_id=user_id)
     
     def get_by_student_id(self, student_id: str) -> Optional[Student]:
         return self.first(student_id=student_id)
     
-    def search_students(self, search_term: str = None, **filters) -> List[Student]:
-        query = Student.query.join(User)
-        
-        if search_term:
-            search = f"%{search_term}%"
-            query = query.filter(
-                (Student.student_id.ilike(search)) |
-                (User.first_name.ilike(search)) |
-                (User.last_name.ilike(search)) |
-                (User.email.ilike(search)) |
-                (User.phone.ilike(search) if hasattr(User, 'phone') else False)
-            )
+    def search_students(self, search_term: str = None, fuzzy: bool = False,
+                        sort: str = DEFAULT_SORT, descending: bool = False,
+                        **filters) -> List[Student]:
+        """
+        Search students by student ID, name or email. Results are ranked by the
+        full-text index when one is available, otherwise ordered by `sort`. With
+        fuzzy=True, names are matched by sound and small typos instead, closest
+        spelling first. Results are cached until the next write to students, users or roles.
+        """
+        key = ('students', 'search', normalize_term(search_term), bool(search_term) and fuzzy,
+               sort, descending, normalize_filters(filters))
+        rows = get_query_cache().get_or_load(STUDENT_READ_ENTITIES, key, lambda: [
+            (snapshot(student), snapshot(student.user))
+            for student in self._search(search_term, fuzzy, sort, descending, **filters)
+        ])
+        students = []
+        for student_values, user_values in rows:
+            # Restore the user first so that student.user needs no query
+            restore(User, user_values)
+            students.append(restore(Student, student_values))
+        return students
+    
+    def _search(self, search_term: Optional[str], fuzzy: bool, sort: str,
+                descending: bool, **filters) -> List[Student]:
+        query = Student.query.join(User) \
+            .join(StudentDirectory, StudentDirectory.id == Student.id)
         
         # Apply additional filters
         for key, value in filters.items():
@@ -52,12 +148,285 @@ class StudentRepository(BaseRepository):
             elif hasattr(User, key):
                 query = query.filter(getattr(User, key) == value)
         
-        return query.order_by(User.last_name, User.first_name).all()
+        if search_term and fuzzy:
+            words = tokenize(search_term)
+            students = query.filter(self._fuzzy_filter(search_term)).all()
+            
+            def distance(student):
+                names = [n.lower() for n in (student.user.first_name, student.user.last_name) if n]
+                return sum(min((levenshtein(w, n) for n in names), default=len(w)) for w in words)
+            
+            return sorted(students, key=distance)
+        
+        if search_term and student_search_index.available():
+            matches = student_search_index.match_clause(search_term)
+            if matches is None:
+                return []
+            matches = matches.subquery()
+            return query.join(matches, matches.c.pk == Student.id) \
+                .order_by(matches.c.rank, Student.id).all()
+        
+        if search_term:
+            query = query.filter(self._search_filter(search_term))
+        
+        return query.order_by(*self.sort_columns(sort, descending)).all()
+    
+    def _fuzzy_filter(self, search_term: str):
+        """Every word must sound like, or be a near-miss of, the first or last name"""
+        clauses = []
+        for word in tokenize(search_term):
+            keys = phonetic_candidates(word)
+            clauses.append(or_(
+                StudentDirectory.first_name_phonetic.in_(keys),
+                StudentDirectory.last_name_phonetic.in_(keys)
+            ))
+        if not clauses:
+            return StudentDirectory.id.is_(None)
+        return and_(*clauses)
+    
+    def _search_filter(self, search_term: str):
+        """Filter clause matching students against a search term"""
+        if student_search_index.available():
+            clause = student_search_index.match_clause(search_term)
+            if clause is None:
+                return StudentDirectory.id.is_(None)
+            return StudentDirectory.id.in_(select(clause.subquery().c.pk))
+        
+        # search_text is already lowercased: student ID, names and email
+        return StudentDirectory.search_text.contains(search_term.lower(), autoescape=True)
+    
+    @staticmethod
+    def sort_columns(sort: str = DEFAULT_SORT, descending: bool = False) -> List[Any]:
+        """ORDER BY clauses for a named sort order"""
+        columns = [getattr(StudentDirectory, name) for name in SORT_ORDERS[sort]]
+        return [column.desc() for column in columns] if descending else columns
+    
+    @staticmethod
+    def parse_page_key(sort: str, values: List[Any]) -> List[Any]:
+        """
+        Turn a decoded cursor back into column values for `sort`, parsing
+        ISO dates. Raises ValueError if the values do not fit the sort order.
+        """
+        names = SORT_ORDERS[sort]
+        if len(values) != len(names):
+            raise ValueError('Invalid cursor')
+        key = []
+        for name, value in zip(names, values):
+            column_type = getattr(StudentDirectory, name).type
+            try:
+                if value is None:
+                    key.append(None)
+                elif isinstance(column_type, db.DateTime):
+                    key.append(datetime.fromisoformat(value))
+                elif isinstance(column_type, db.Date):
+                    key.append(date.fromisoformat(value))
+                elif isinstance(column_type, db.Integer) and isinstance(value, int):
+                    key.append(value)
+                elif isinstance(column_type, db.String) and isinstance(value, str):
+                    key.append(value)
+                else:
+                    raise ValueError
+            except (TypeError, ValueError):
+                raise ValueError('Invalid cursor')
+        return key
+    
+    @staticmethod
+    def _page_key(values: List[Any]) -> List[Any]:
+        """A page key as cursor-safe values, with dates as ISO strings"""
+        return [value.isoformat() if isinstance(value, (date, datetime)) else value
+                for value in values]
+    
+    def _list_conditions(self, search_term: str = None, fuzzy: bool = False,
+                         **filters) -> List[Any]:
+        """WHERE clauses shared by the list endpoints"""
+        conditions = []
+        
+        if search_term and fuzzy:
+            conditions.append(self._fuzzy_filter(search_term))
+        elif search_term:
+            conditions.append(self._search_filter(search_term))
+        
+        for key, value in filters.items():
+            if value is None or not hasattr(StudentDirectory, key):
+                continue
+            column = getattr(StudentDirectory, key)
+            normalized = getattr(StudentDirectory, f'{key}_key', None)
+            if isinstance(value, str) and normalized is not None:
+                conditions.append(normalized == value.lower())
+            elif isinstance(value, str):
+                conditions.append(func.lower(column) == value.lower())
+            else:
+                conditions.append(column == value)
+        
+        return conditions
+    
+    def _records_select(self, names: List[str], conditions: List[Any]):
+        """Core select of the named record columns from the student_directory read model"""
+        return select(*[STUDENT_RECORD_COLUMNS[name] for name in names]).where(*conditions)
+    
+    def select_student_records(self, search_term: str = None, fuzzy: bool = False,
+                               fieldset: Optional[Dict[str, List[str]]] = None,
+                               batch_size: Optional[int] = None,
+                               sort: str = DEFAULT_SORT, descending: bool = False,
+                               **filters) -> Iterator[StudentRecord]:
+        """
+        Matching students as StudentRecords in `sort` order, read with a Core
+        select instead of ORM entities. With `batch_size`, rows are fetched
+        from a server-side cursor in batches of that size.
+        """
+        names = record_columns(fieldset)
+        conditions = self._list_conditions(search_term, fuzzy, **filters)
+        statement = self._records_select(names, conditions)
+        statement = statement.order_by(*self.sort_columns(sort, descending))
+        if batch_size:
+            statement = statement.execution_options(yield_per=batch_size)
+        
+        for row in db.session.execute(statement):
+            yield StudentRecord.from_row(names, row)
+    
+    def list_students_page(self, search_term: str = None, limit: int = 100,
+                           after: Optional[List[Any]] = None, fuzzy: bool = False,
+                           fieldset: Optional[Dict[str, List[str]]] = None,
+                           sort: str = DEFAULT_SORT, descending: bool = False,
+                           **filters) -> Tuple[List[Dict[str, Any]], Optional[List[Any]]]:
+        """
+        Get one page of students with user details, filtered and ordered in SQL.
+        Pages are keyed on the columns of SORT_ORDERS[sort]; `after` is the key
+        of the last row of the previous page (see parse_page_key). Returns the
+        rows and the key to continue from, or None when this is the last page.
+        A `fieldset` from parse_fields limits both the columns selected and the
+        keys returned. Results are cached until the next write to students,
+        users or roles.
+        """
+        key = self._page_cache_key('page', search_term, limit, after, fuzzy, fieldset,
+                                   sort, descending, filters)
+        return get_query_cache().get_or_load(STUDENT_READ_ENTITIES, key, lambda: self._load_page(
+            search_term, limit, after, fuzzy, fieldset, sort, descending, **filters
+        ))
+    
+    @staticmethod
+    def _page_cache_key(kind: str, search_term: Optional[str], limit: int,
+                        after: Optional[List[Any]], fuzzy: bool,
+                        fieldset: Optional[Dict[str, List[str]]], sort: str,
+                        descending: bool, filters: Dict[str, Any]) -> Tuple[Any, ...]:
+        # Filter values are compared case-insensitively, like search terms
+        return ('students', kind, normalize_term(search_term), limit,
+                tuple(after) if after else None, bool(search_term) and fuzzy,
+                fieldset_key(fieldset), sort, descending, normalize_filters(filters, lower=True))
+    
+    def _load_page(self, search_term: Optional[str], limit: int, after: Optional[List[Any]],
+                   fuzzy: bool, fieldset: Optional[Dict[str, List[str]]], sort: str,
+                   descending: bool, **filters) -> Tuple[List[Dict[str, Any]], Optional[List[Any]]]:
+        names = self._page_columns(fieldset, sort)
+        statement = self._page_select(names, search_term, limit, after, fuzzy, sort, descending,
+                                      **filters)
+        records = [StudentRecord.from_row(names, row) for row in db.session.execute(statement)]
+        
+        next_key = None
+        if len(records) > limit:
+            records = records[:limit]
+            last = records[-1]
+            next_key = self._page_key([getattr(last, name) for name in SORT_ORDERS[sort]])
+        
+        # Dates stay date objects; the app's JSON provider writes them as ISO strings
+        serialize = student_record_serializer(fieldset_key(fieldset), iso=False)
+        return [serialize(record) for record in records], next_key
+    
+    @staticmethod
+    def _page_columns(fieldset: Optional[Dict[str, List[str]]], sort: str) -> List[str]:
+        always = ('id', 'first_name', 'last_name') + SORT_ORDERS[sort]
+        return record_columns(fieldset, always=always)
+    
+    def _page_select(self, names: List[str], search_term: str, limit: int,
+                     after: Optional[List[Any]], fuzzy: bool, sort: str = DEFAULT_SORT,
+                     descending: bool = False, **filters):
+        """Select one keyset page plus one extra row, showing whether more follow"""
+        conditions = self._list_conditions(search_term, fuzzy, **filters)
+        if after:
+            key = tuple_(*[getattr(StudentDirectory, name) for name in SORT_ORDERS[sort]])
+            conditions.append(key < tuple_(*after) if descending else key > tuple_(*after))
+        
+        return self._records_select(names, conditions) \
+            .order_by(*self.sort_columns(sort, descending)) \
+            .limit(limit + 1)
+    
+    def supports_json_pages(self) -> bool:
+        """Whether the database can assemble list pages as JSON itself"""
+        return supports_json_assembly(db.session.get_bind().dialect.name)
+    
+    def list_students_page_json(self, search_term: str = None, limit: int = 100,
+                                after: Optional[List[Any]] = None, fuzzy: bool = False,
+                                fieldset: Optional[Dict[str, List[str]]] = None,
+                                sort: str = DEFAULT_SORT, descending: bool = False,
+                                **filters) -> Tuple[str, int, Optional[List[Any]]]:
+        """
+        Same page as list_students_page, but the database builds the rows as
+        one JSON array. Returns the array as text, the number of rows in it and
+        the key to continue from (or None). Check supports_json_pages() first.
+        """
+        key = self._page_cache_key('json', search_term, limit, after, fuzzy, fieldset,
+                                   sort, descending, filters)
+        return get_query_cache().get_or_load(
+            STUDENT_READ_ENTITIES, key, lambda: self._load_page_json(
+                search_term, limit, after, fuzzy, fieldset, sort, descending, **filters
+            )
+        )
+    
+    def _load_page_json(self, search_term: Optional[str], limit: int, after: Optional[List[Any]],
+                        fuzzy: bool, fieldset: Optional[Dict[str, List[str]]], sort: str,
+                        descending: bool, **filters) -> Tuple[str, int, Optional[List[Any]]]:
+        dialect_name = db.session.get_bind().dialect.name
+        names = self._page_columns(fieldset, sort)
+        page = self._page_select(names, search_term, limit, after, fuzzy, sort, descending,
+                                 **filters) \
+            .add_columns(
+                func.row_number().over(
+                    order_by=self.sort_columns(sort, descending)
+                ).label('position')
+            ).subquery()
+        
+        in_page = page.c.position <= limit
+        is_last = page.c.position == limit
+        row = json_object_expr(
+            dialect_name,
+            student_record_layout(fieldset_key(fieldset)),
+            page.c,
+            dates=DATE_ATTRS,
+            booleans=('is_active',)
+        )
+        statement = select(
+            json_array_agg(dialect_name, row, order_by=page.c.position, where=in_page),
+            func.count(),
+            *[func.max(case((is_last, page.c[name]))) for name in SORT_ORDERS[sort]]
+        )
+        rows_json, total, *last_key = db.session.execute(statement).one()
+        
+        next_key = self._page_key(last_key) if total > limit else None
+        return rows_json, min(total, limit), next_key
+    
+    def iter_students_with_details(self, search_term: str = None, batch_size: int = 500,
+                                   fuzzy: bool = False,
+                                   fieldset: Optional[Dict[str, List[str]]] = None,
+                                   sort: str = DEFAULT_SORT, descending: bool = False,
+                                   **filters) -> Iterator[Dict[str, Any]]:
+        """
+        Yield every matching student with user details, fetching rows from a
+        server-side cursor in batches so memory stays bounded
+        """
+        serialize = student_record_serializer(fieldset_key(fieldset), iso=False)
+        for record in self.select_student_records(search_term, fuzzy, fieldset, batch_size,
+                                                  sort, descending, **filters):
+            yield serialize(record)
+    
+    def cache_keys(self, student: Student) -> List[Tuple[str, Hashable]]:
+        # update_student also writes to the student's user
+        return [('students', student.id), ('users', student.user_id)]
     
     def update_student(self, student_id: int, **kwargs) -> Optional[Student]:
-        student = self.get_by_id(student_id)
+        student = self.get_for_update(student_id)
         if not student:
             return None
+        keys = self.cache_keys(student)
             
         # Handle user data if provided
         user_data = {}
@@ -74,11 +443,13 @@ class StudentRepository(BaseRepository):
         
         # Update user fields if any
         if user_data and hasattr(student, 'user'):
+            user = db.session.get(User, student.user_id, populate_existing=True)
             for key, value in user_data.items():
-                if hasattr(student.user, key):
-                    setattr(student.user, key, value)
+                if hasattr(user, key):
+                    setattr(user, key, value)
         
         db.session.commit()
+        self.evict(keys)
         return student
     
     def get_students_by_class(self, class_id: int) -> List[Student]:
@@ -87,28 +458,49 @@ class StudentRepository(BaseRepository):
         # Example: return Student.query.join(StudentClass).filter(StudentClass.class_id == class_id).all()
         raise NotImplementedError("This method requires implementation of class enrollment")
     
+    @coalesce(STUDENT_READ_ENTITIES)
     def get_students_with_details(self) -> List[Dict[str, Any]]:
         """Get all students with their user details"""
-        students = db.session.query(Student, User).join(User).all()
-        
-        result = []
-        for student, user in students:
-            student_data = student.to_dict()
-            student_data['user'] = user.to_dict(include_role=True)
-            result.append(student_data)
-            
-        return result
+        return [record.to_dict() for record in self.select_student_records()]
+    
+    def get_student_record(
+        self, student_id: int, fieldset: Optional[Dict[str, List[str]]] = None
+    ) -> Optional[StudentRecord]:
+        """Get a single student as a StudentRecord"""
+        names = record_columns(fieldset)
+        statement = self._records_select(names, [StudentDirectory.id == student_id])
+        row = db.session.execute(statement).first()
+        return StudentRecord.from_row(names, row) if row else None
+    
+    def get_students_by_ids(
+        self, ids: List[int], fieldset: Optional[Dict[str, List[str]]] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """Serialized students for the given ids in one IN query, keyed by id"""
+        names = record_columns(fieldset)
+        serialize = student_record_serializer(fieldset_key(fieldset), iso=False)
+        rows = db.session.execute(self._records_select(names, [StudentDirectory.id.in_(ids)]))
+        records = (StudentRecord.from_row(names, row) for row in rows)
+        return {record.id: serialize(record) for record in records}
     
-    def get_student_with_details(self, student_id: int) -> Optional[Dict[str, Any]]:
-        """Get a single student with full details"""
-        result = db.session.query(Student, User).join(User).filter(Student.id == student_id).first()
+    def get_student_with_details(
+        self, student_id: int, fieldset: Optional[Dict[str, List[str]]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get a single student with full details, or the fields in `fieldset`.
+        Full records are kept in the entity cache and serve any fieldset.
+        """
+        cache = get_entity_cache().students
+        record = cache.get(student_id)
+        if record is None:
+            generation = cache.version(student_id)
+            record = self.get_student_record(student_id)
+            if record:
+                cache.set(student_id, record, generation)
         
-        if not result:
+        if not record:
             return None
             
-        student, user = result
-        student_data = student.to_dict()
-        student_data['user'] = user.to_dict(include_role=True)
+        student_data = record.to_dict(fieldset)
         
         # Add additional details like enrollments, grades, etc. here
         # Example: student_data['enrollments'] = [e.to_dict() for e in student.enrollments]
@@ -1,18 +1,76 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Hashable, Set, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, load_only
 from app.models.user import User
+from app.utils.cache import MISSING
 from .base_repo import BaseRepository
+from .entity_cache import get_entity_cache, restore, snapshot
+from .query_cache import get_query_cache
+from .role_registry import get_role_registry
+from .search_index import user_search_index
+# Register the flush hooks that mirror user changes into student_directory
+# and record them in the outbox
+from . import directory  # noqa: F401
+from . import outbox_repo  # noqa: F401
 from app import db
 
 class UserRepository(BaseRepository):
     def __init__(self):
         super().__init__(User)
     
+    def get_by_id(self, id: int) -> Optional[User]:
+        """User by primary key, served from the entity cache when possible"""
+        cache = get_entity_cache()
+        values = cache.users.get(id)
+        if values is not None:
+            return restore(User, values)
+        
+        generation = cache.users.version(id)
+        user = super().get_by_id(id)
+        if user:
+            self._cache(user, generation)
+        return user
+    
     def get_by_username(self, username: str) -> Optional[User]:
-        return self.first(username=username)
+        """User by username, served from the entity cache when possible"""
+        cache = get_entity_cache()
+        user_id = cache.usernames.get(username)
+        values = cache.users.get(user_id) if user_id is not None else None
+        # A renamed user's old username may still point at it
+        if values is not None and values['username'] == username:
+            return restore(User, values)
+        
+        # The user entry can only be versioned under an id known before the load
+        generation = cache.users.version(user_id) if user_id is not None else MISSING
+        user = self.first(username=username)
+        if user:
+            self._cache(user, generation if user.id == user_id else MISSING)
+        return user
+    
+    def _cache(self, user: User, generation: Any) -> None:
+        cache = get_entity_cache()
+        cache.users.set(user.id, snapshot(user), generation)
+        cache.usernames.set(user.username, user.id)
+    
+    def cache_keys(self, user: User) -> List[Tuple[str, Hashable]]:
+        keys = [('users', user.id), ('usernames', user.username)]
+        # Student details embed the user
+        if user.student is not None:
+            keys.append(('students', user.student.id))
+        return keys
     
     def get_by_email(self, email: str) -> Optional[User]:
         return self.first(email=email)
     
+    def get_by_emails(self, emails: List[str]) -> Dict[str, User]:
+        """Users with these emails and their student profiles, fresh from the database"""
+        if not emails:
+            return {}
+        users = User.query.options(joinedload(User.student)).filter(
+            User.email.in_(set(emails))
+        ).populate_existing()
+        return {user.email: user for user in users}
+    
     def create_user(self, username: str, email: str, password: str, role_id: int, **kwargs) -> User:
         user = User(
             username=username,
@@ -25,10 +83,24 @@ class UserRepository(BaseRepository):
         db.session.commit()
         return user
     
+    def find_taken(self, usernames: List[str], emails: List[str],
+                   chunk_size: int = 500) -> Tuple[Set[str], Set[str]]:
+        """Which of these usernames and emails are already registered, in a few IN queries"""
+        taken_usernames, taken_emails = set(), set()
+        for column, values, taken in ((User.username, usernames, taken_usernames),
+                                      (User.email, emails, taken_emails)):
+            values = sorted(set(values))
+            for start in range(0, len(values), chunk_size):
+                taken.update(db.session.execute(
+                    select(column).where(column.in_(values[start:start + chunk_size]))
+                ).scalars())
+        return taken_usernames, taken_emails
+    
     def update_user(self, user_id: int, **kwargs) -> Optional[User]:
-        user = self.get_by_id(user_id)
+        user = self.get_for_update(user_id)
         if not user:
             return None
+        keys = self.cache_keys(user)
             
         # Handle password update separately to ensure hashing
         if 'password' in kwargs:
@@ -39,10 +111,22 @@ class UserRepository(BaseRepository):
                 setattr(user, key, value)
                 
         db.session.commit()
+        self.evict(keys)
         return user
     
-    def search_users(self, search_term: str, role_id: int = None) -> List[User]:
-        query = User.query
+    def search_users(self, search_term: str, role_id: int = None,
+                     fields: Optional[List[str]] = None) -> List[User]:
+        query = self._with_fields(User.query, fields)
+        
+        if search_term and user_search_index.available():
+            matches = user_search_index.match_clause(search_term)
+            if matches is None:
+                return []
+            if role_id is not None:
+                query = query.filter_by(role_id=role_id)
+            matches = matches.subquery()
+            return query.join(matches, matches.c.pk == User.id) \
+                .order_by(matches.c.rank, User.id).all()
         
         if search_term:
             search = f"%{search_term}%"
@@ -58,9 +142,44 @@ class UserRepository(BaseRepository):
             
         return query.all()
     
+    def list_users(self, role_name: str = None, search_term: str = None,
+                   fields: Optional[List[str]] = None) -> List[User]:
+        """
+        Users for the admin listing, by role, by search term or all of them.
+        With `fields`, only those columns are loaded.
+        """
+        if role_name:
+            query = self._users_by_role_query(role_name)
+        elif search_term:
+            return self.search_users(search_term, fields=fields)
+        else:
+            query = User.query
+        
+        return self._with_fields(query, fields).all()
+    
+    def _with_fields(self, query, fields: Optional[List[str]]):
+        """Load only the columns needed to serialize `fields`"""
+        if fields is None:
+            return query
+        columns = [getattr(User, f) for f in fields if f != 'role']
+        if 'role' in fields:
+            columns.append(User.role_id)
+        return query.options(load_only(User.id, *columns))
+    
+    def _users_by_role_query(self, role_name: str):
+        # Resolved in memory, so the query needs no join with roles
+        return User.query.filter(User.role_id == get_role_registry().id_for(role_name))
+    
     def get_users_by_role(self, role_name: str) -> List[User]:
-        from app.models.role import Role
-        return db.session.query(User).join(Role).filter(Role.name == role_name).all()
+        """Users with a role, cached until the next write to users"""
+        role_id = get_role_registry().id_for(role_name)
+        if role_id is None:
+            return []
+        rows = get_query_cache().get_or_load(
+            ('user',), ('users', 'role', role_id),
+            lambda: [snapshot(user) for user in User.query.filter(User.role_id == role_id)]
+        )
+        return [restore(User, values) for values in rows]
     
     def get_students(self) -> List[User]:
         return self.get_users_by_role('student')
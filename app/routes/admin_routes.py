@@ -2,32 +2,49 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from app.services.base_service import BaseService
 from app.repositories.user_repo import UserRepository
-from app.models.role import Role
+from app.repositories.entity_cache import get_entity_cache
+from app.repositories.query_cache import get_query_cache
+from app.repositories.role_registry import get_role_registry
+from app.utils.single_flight import get_single_flight
+from app.models.user import User
+from app.utils.fieldsets import parse_fields
+from app.utils.event_bus import publish
+from app.utils.etags import conditional_get
 from app import db
 
 admin_bp = Blueprint('admin', __name__)
 user_repo = UserRepository()
 
 
+def _parse_user_fields():
+    """Top-level fields from a `fields=` parameter, or None for all fields"""
+    fieldset = parse_fields(request.args.get('fields'), User.FIELDS)
+    return fieldset[''] if fieldset else None
+
+
 @admin_bp.route('/users', methods=['GET'])
 @jwt_required()
 @BaseService.require_roles('admin')
+@conditional_get(('user', 'role'))
 def list_users():
     """List all users with optional filtering"""
     role_name = request.args.get('role', None)
     search = request.args.get('search', None)
     
-    if role_name:
-        users = user_repo.get_users_by_role(role_name)
-    elif search:
-        users = user_repo.search_users(search)
-    else:
-        users = user_repo.get_all()
+    try:
+        fields = _parse_user_fields()
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    
+    users = user_repo.list_users(role_name=role_name, search_term=search, fields=fields)
     
     return jsonify({
         'status': 'success',
         'count': len(users),
-        'users': [user.to_dict(include_role=True) for user in users]
+        'users': [user.to_dict(include_role=True, fields=fields) for user in users]
     }), 200
 
 
@@ -36,6 +53,14 @@ def list_users():
 @BaseService.require_roles('admin')
 def get_user(user_id):
     """Get user details by ID"""
+    try:
+        fields = _parse_user_fields()
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    
     user = user_repo.get_by_id(user_id)
     
     if not user:
@@ -46,7 +71,7 @@ def get_user(user_id):
     
     return jsonify({
         'status': 'success',
-        'user': user.to_dict(include_role=True)
+        'user': user.to_dict(include_role=True, fields=fields)
     }), 200
 
 
@@ -85,6 +110,8 @@ def deactivate_user(user_id):
             'message': 'User not found'
         }), 404
     
+    publish('user.deactivated', {'id': user.id, 'username': user.username})
+    
     return jsonify({
         'status': 'success',
         'message': 'User deactivated successfully'
@@ -104,6 +131,8 @@ def activate_user(user_id):
             'message': 'User not found'
         }), 404
     
+    publish('user.activated', {'id': user.id, 'username': user.username})
+    
     return jsonify({
         'status': 'success',
         'message': 'User activated successfully'
@@ -114,10 +143,24 @@ def activate_user(user_id):
 @jwt_required()
 @BaseService.require_roles('admin')
 def delete_user(user_id):
-    """Delete a user account"""
-    success = user_repo.delete(user_id)
+    """Delete a user account and its student record"""
+    user = user_repo.get_by_id(user_id)
+    if not user:
+        return jsonify({
+            'status': 'error',
+            'message': 'User not found'
+        }), 404
     
-    if success:
+    events = [('user.deleted', {'id': user.id, 'username': user.username})]
+    student = user.student
+    if student:
+        events.append(('student.deleted', {
+            'id': student.id, 'student_id': student.student_id, 'gender': student.gender
+        }))
+    
+    if user_repo.delete(user_id):
+        for event_type, data in events:
+            publish(event_type, data)
         return jsonify({
             'status': 'success',
             'message': 'User deleted successfully'
@@ -134,11 +177,9 @@ def delete_user(user_id):
 @BaseService.require_roles('admin')
 def list_roles():
     """List all available roles"""
-    roles = Role.query.all()
-    
     return jsonify({
         'status': 'success',
-        'roles': [role.to_dict() for role in roles]
+        'roles': get_role_registry().all()
     }), 200
 
 
@@ -147,18 +188,18 @@ def list_roles():
 @BaseService.require_roles('admin')
 def get_system_stats():
     """Get system statistics"""
-    from app.models.user import User
     from app.models.student import Student
     
     total_users = User.query.count()
     active_users = User.query.filter_by(is_active=True).count()
     total_students = Student.query.count()
     
-    # Count users by role
+    # Count users by role; names come from the role registry
+    roles = get_role_registry()
     role_counts = db.session.query(
-        Role.name,
+        User.role_id,
         db.func.count(User.id)
-    ).join(User).group_by(Role.name).all()
+    ).group_by(User.role_id).all()
     
     return jsonify({
         'status': 'success',
@@ -167,6 +208,18 @@ def get_system_stats():
             'active_users': active_users,
             'inactive_users': total_users - active_users,
             'total_students': total_students,
-            'users_by_role': {role: count for role, count in role_counts}
+            'users_by_role': {roles.name_for(role_id): count for role_id, count in role_counts}
         }
-    }), 200
\ No newline at end of file
+    }), 200
+
+
+@admin_bp.route('/cache', methods=['GET'])
+@jwt_required()
+@BaseService.require_roles('admin')
+def get_cache_stats():
+    """Get cache hit, miss and eviction counters, and how many reads were coalesced"""
+    return jsonify({
+        'status': 'success',
+        'cache': {**get_entity_cache().stats(), 'queries': get_query_cache().stats()},
+        'coalescing': get_single_flight().stats()
+    }), 200
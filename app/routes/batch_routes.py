@@ -0,0 +1,14 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from app.services.batch_service import BatchService
+
+batch_bp = Blueprint('batch', __name__)
+batch_service = BatchService()
+
+
+@batch_bp.route('', methods=['POST'])
+@jwt_required()
+def execute_batch():
+    """Run several API requests in one round trip"""
+    response, status_code = batch_service.execute(request.get_json(silent=True))
+    return jsonify(response), status_code
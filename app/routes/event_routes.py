@@ -0,0 +1,53 @@
+import queue
+from flask import Blueprint, Response, current_app, jsonify
+from flask_jwt_extended import get_jwt, jwt_required
+from app.utils.event_bus import get_event_bus
+
+events_bp = Blueprint('events', __name__)
+
+
+def _event_stream(bus, subscriber, heartbeat, dumps):
+    """Format bus events as SSE messages, with comment lines as keep-alives"""
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                event = subscriber.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ': keep-alive\n\n'
+                continue
+            yield f"event: {event['type']}\ndata: {dumps(event['data'])}\n\n"
+    finally:
+        bus.unsubscribe(subscriber)
+
+
+@events_bp.route('', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_events():
+    """
+    Server-Sent Events stream of student and user changes. EventSource cannot
+    set headers, so the token may also be passed as ?jwt=<access_token>.
+    """
+    if not any(role in get_jwt().get('roles', []) for role in ('admin', 'teacher')):
+        return jsonify({
+            'status': 'error',
+            'message': 'Insufficient permissions'
+        }), 403
+    
+    bus = get_event_bus()
+    # Subscribe before returning so nothing published after this is missed
+    subscriber = bus.subscribe()
+    response = Response(
+        _event_stream(
+            bus,
+            subscriber,
+            current_app.config.get('EVENTS_HEARTBEAT_SECONDS', 15),
+            current_app.json.dumps
+        ),
+        mimetype='text/event-stream'
+    )
+    # Covers clients that disconnect before the generator starts
+    response.call_on_close(lambda: bus.unsubscribe(subscriber))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
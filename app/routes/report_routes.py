@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify, send_file
 from flask_jwt_extended import jwt_required
 from app.services.report_service import ReportService
 from app.services.base_service import BaseService
+from app.utils.etags import conditional_get
+from datetime import datetime
 
 report_bp = Blueprint('reports', __name__)
 report_service = ReportService()
@@ -75,6 +77,8 @@ def generate_student_profile():
 @report_bp.route('/analytics', methods=['GET'])
 @jwt_required()
 @BaseService.require_roles('admin')
+# "Recent admissions" is relative to today, so the tag changes daily too
+@conditional_get(('student',), extra=lambda: datetime.now().date())
 def get_analytics():
     """Get student analytics and statistics"""
     response, status_code = report_service.get_student_analytics()
@@ -1,37 +1,125 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required
+from app.services.import_service import ImportService
 from app.services.student_service import StudentService
+from app.services.suggest_service import StudentSuggestService
 from app.services.base_service import BaseService
+from app.repositories.student_repo import STUDENT_READ_ENTITIES
+from app.utils.etags import conditional_get
 from datetime import datetime
 
 student_bp = Blueprint('students', __name__)
 student_service = StudentService()
+suggest_service = StudentSuggestService()
+import_service = ImportService()
+
+
+def _wants_stream():
+    """Streaming is opt-in via ?stream=1 or an NDJSON Accept header"""
+    if request.args.get('stream', '').lower() in ('1', 'true'):
+        return True
+    best = request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson'])
+    return best == 'application/x-ndjson'
 
 
 @student_bp.route('', methods=['GET'])
 @jwt_required()
 @BaseService.require_roles('admin', 'teacher')
+@conditional_get(STUDENT_READ_ENTITIES)
 def list_students():
-    """List all students with optional filtering"""
+    """List students with optional filtering and cursor pagination, or by ?ids="""
     search_term = request.args.get('search', None)
     gender = request.args.get('gender', None)
+    fuzzy = request.args.get('match') == 'fuzzy'
+    
+    if 'ids' in request.args:
+        response, status_code = student_service.get_students_by_ids(
+            request.args['ids'],
+            fields=request.args.get('fields')
+        )
+        return jsonify(response), status_code
     
     filters = {}
     if gender:
         filters['gender'] = gender
     
+    if _wants_stream():
+        try:
+            fieldset = student_service.parse_student_fields(request.args.get('fields'))
+            sort, descending = student_service.parse_student_sort(request.args.get('sort'))
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        
+        return Response(
+            stream_with_context(student_service.stream_students(
+                search_term=search_term, fuzzy=fuzzy, fieldset=fieldset,
+                sort=sort, descending=descending, **filters
+            )),
+            mimetype='application/x-ndjson'
+        )
+    
     response, status_code = student_service.list_students(
         search_term=search_term,
+        limit=request.args.get('limit'),
+        cursor=request.args.get('cursor'),
+        fuzzy=fuzzy,
+        fields=request.args.get('fields'),
+        sort=request.args.get('sort'),
         **filters
     )
     return jsonify(response), status_code
 
 
+@student_bp.route('/lookup', methods=['POST'])
+@jwt_required()
+@BaseService.require_roles('admin', 'teacher')
+def lookup_students():
+    """Get many students by id; the POST form of ?ids= for long id lists"""
+    data = request.get_json(silent=True) or {}
+    response, status_code = student_service.get_students_by_ids(
+        data.get('ids'),
+        fields=data.get('fields')
+    )
+    return jsonify(response), status_code
+
+
+@student_bp.route('/changes', methods=['GET'])
+@jwt_required()
+@BaseService.require_roles('admin', 'teacher')
+def student_changes():
+    """Students created, updated or deleted since a change cursor"""
+    response, status_code = student_service.get_changes(
+        since=request.args.get('since'),
+        limit=request.args.get('limit'),
+        fields=request.args.get('fields')
+    )
+    return jsonify(response), status_code
+
+
+@student_bp.route('/suggest', methods=['GET'])
+@jwt_required()
+@BaseService.require_roles('admin', 'teacher')
+def suggest_students():
+    """Typeahead suggestions by name, email or student ID prefix"""
+    response, status_code = suggest_service.suggest(
+        request.args.get('q', ''),
+        limit=request.args.get('limit')
+    )
+    return jsonify(response), status_code
+
+
 @student_bp.route('/<int:student_id>', methods=['GET'])
 @jwt_required()
+@conditional_get(STUDENT_READ_ENTITIES)
 def get_student(student_id):
     """Get student details by ID"""
-    response, status_code = student_service.get_student_details(student_id)
+    response, status_code = student_service.get_student_details(
+        student_id,
+        fields=request.args.get('fields')
+    )
     return jsonify(response), status_code
 
 
@@ -88,6 +176,31 @@ def create_student():
     return jsonify(response), status_code
 
 
+@student_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+@BaseService.require_roles('admin')
+def bulk_create_students():
+    """Create many students in one transaction, with a result per row"""
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('students')
+    
+    response, status_code = student_service.bulk_create_students(
+        data,
+        partial=request.args.get('partial', '').lower() in ('1', 'true')
+    )
+    return jsonify(response), status_code
+
+
+@student_bp.route('/import', methods=['POST'])
+@jwt_required()
+@BaseService.require_roles('admin')
+def import_students():
+    """Create or update students from an uploaded CSV or XLSX roster"""
+    response, status_code = import_service.import_upload(request.files.get('file'))
+    return jsonify(response), status_code
+
+
 @student_bp.route('/<int:student_id>', methods=['PUT'])
 @jwt_required()
 @BaseService.require_roles('admin', 'teacher')
@@ -6,6 +6,7 @@ from werkzeug.security import check_password_hash
 
 from app.models.user import User
 from app.repositories.user_repo import UserRepository
+from app.repositories.role_registry import get_role_registry
 from .base_service import BaseService
 
 class AuthService(BaseService):
@@ -33,7 +34,7 @@ class AuthService(BaseService):
         access_token = create_access_token(
             identity=user.id,
             additional_claims={
-                'roles': [user.role.name] if user.role else []
+                'roles': self._role_names(user)
             },
             expires_delta=timedelta(minutes=current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES', 60))
         )
@@ -47,6 +48,12 @@ class AuthService(BaseService):
             'user': user.to_dict(include_role=True)
         }, 200
     
+    @staticmethod
+    def _role_names(user: User) -> list:
+        """The `roles` claim for a user's tokens"""
+        role_name = get_role_registry().name_for(user.role_id)
+        return [role_name] if role_name else []
+    
     def refresh_token(self) -> Tuple[Dict[str, str], int]:
         """Refresh access token using refresh token"""
         current_user_id = get_jwt_identity()
@@ -61,7 +68,7 @@ class AuthService(BaseService):
         access_token = create_access_token(
             identity=user.id,
             additional_claims={
-                'roles': [user.role.name] if user.role else []
+                'roles': self._role_names(user)
             },
             expires_delta=timedelta(minutes=current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES', 60))
         )
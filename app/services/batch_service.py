@@ -0,0 +1,136 @@
+import base64
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from flask import current_app, g, request
+from werkzeug.test import EnvironBuilder
+
+from app.config.database import db
+from app.utils.auth import DECODE_CACHE
+from app.utils.json_provider import RawJSON
+
+BATCH_PATH = '/api/batch'
+# Endpoints that never finish and so cannot be batched
+UNBATCHABLE_PATHS = (BATCH_PATH, '/api/events')
+METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+
+
+class BatchService:
+    """Runs API sub-requests in-process on behalf of a single /api/batch call"""
+
+    def execute(self, data: Any) -> Tuple[Dict[str, Any], int]:
+        """
+        Dispatch `data['requests']` through the app's own routes. Sequential
+        sub-requests share this request's application context, so they reuse
+        its DB session and its verified JWT. With `parallel`, a batch of only
+        GET requests runs on a thread pool, each with its own context.
+        """
+        specs = data.get('requests') if isinstance(data, dict) else None
+        try:
+            specs = self._validate(specs)
+        except ValueError as e:
+            return {
+                'status': 'error',
+                'message': str(e)
+            }, 400
+
+        headers = {}
+        if request.headers.get('Authorization'):
+            headers['Authorization'] = request.headers['Authorization']
+
+        parallel = (
+            data.get('parallel') is True
+            and len(specs) > 1
+            and all(spec['method'] == 'GET' for spec in specs)
+        )
+        if parallel:
+            items = self._run_parallel(specs, headers)
+        else:
+            items = [self._dispatch(spec, headers) for spec in specs]
+
+        return {
+            'status': 'success',
+            'count': len(items),
+            'responses': RawJSON('[' + ','.join(items) + ']')
+        }, 200
+
+    @staticmethod
+    def _validate(specs: Any) -> List[Dict[str, Any]]:
+        if not isinstance(specs, list) or not specs:
+            raise ValueError('requests must be a non-empty list')
+        maximum = current_app.config.get('BATCH_MAX_REQUESTS', 20)
+        if len(specs) > maximum:
+            raise ValueError(f'At most {maximum} requests may be batched')
+
+        validated = []
+        for index, spec in enumerate(specs):
+            if not isinstance(spec, dict) or not isinstance(spec.get('path'), str):
+                raise ValueError(f'requests[{index}] must be an object with a path')
+            method = str(spec.get('method', 'GET')).upper()
+            if method not in METHODS:
+                raise ValueError(f'requests[{index}]: unsupported method {method}')
+            path = spec['path']
+            if not path.startswith('/api/') or path.split('?')[0].rstrip('/') in UNBATCHABLE_PATHS:
+                raise ValueError(f'requests[{index}]: path must be an /api/ endpoint other than '
+                                 f'{" or ".join(UNBATCHABLE_PATHS)}')
+            validated.append({
+                'id': spec.get('id', index),
+                'method': method,
+                'path': path,
+                'headers': spec.get('headers') or {},
+                'body': spec.get('body')
+            })
+        return validated
+
+    def _run_parallel(self, specs: List[Dict[str, Any]], headers: Dict[str, str]) -> List[str]:
+        app = current_app._get_current_object()
+        decoded = dict(g.get(DECODE_CACHE, {}))
+
+        def run(spec):
+            with app.app_context():
+                g.setdefault(DECODE_CACHE, {}).update(decoded)
+                return self._dispatch(spec, headers)
+
+        workers = min(len(specs), current_app.config.get('BATCH_MAX_WORKERS', 4))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(run, specs))
+
+    @staticmethod
+    def _dispatch(spec: Dict[str, Any], headers: Dict[str, str]) -> str:
+        """Run one sub-request and return its result entry as JSON text"""
+        app = current_app._get_current_object()
+        builder = EnvironBuilder(
+            path=spec['path'],
+            method=spec['method'],
+            headers={**spec['headers'], **headers},
+            json=spec['body']
+        )
+        try:
+            environ = builder.get_environ()
+        finally:
+            builder.close()
+
+        with app.request_context(environ):
+            try:
+                response = app.full_dispatch_request()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(
+                    f"Error in batched request {spec['method']} {spec['path']}: {str(e)}"
+                )
+                response = app.make_response(({
+                    'status': 'error',
+                    'message': 'Internal server error'
+                }, 500))
+
+            entry = {'id': spec['id'], 'status': response.status_code}
+            if response.is_json:
+                # Splice the sub-response's JSON in rather than decoding it
+                entry['body'] = RawJSON(response.get_data(as_text=True).rstrip('\n') or 'null')
+            elif response.mimetype.startswith('text/'):
+                entry['body'] = response.get_data(as_text=True)
+            else:
+                entry['content_type'] = response.mimetype
+                entry['body_base64'] = base64.b64encode(response.get_data()).decode('ascii')
+            response.close()
+        return app.json.dumps(entry)
@@ -0,0 +1,286 @@
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+import csv
+import os
+import uuid
+import zipfile
+from datetime import datetime
+from itertools import islice
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app.config.database import db
+from app.repositories.role_registry import get_role_registry
+from app.repositories.student_repo import StudentRepository
+from app.repositories.user_repo import UserRepository
+from app.utils.event_bus import publish
+from app.utils.rosters import read_roster, roster_format
+from app.utils.validators import (
+    validate_date, validate_email, validate_gender, validate_password, validate_phone
+)
+from .base_service import BaseService
+from .student_service import StudentService
+
+# Roster columns and the longest value each column accepts
+ROSTER_FIELDS = {
+    'student_id': 20, 'email': 120, 'username': 80, 'password': None, 'first_name': 50,
+    'last_name': 50, 'date_of_birth': None, 'gender': 10, 'address': 255, 'phone': 20,
+    'admission_date': None,
+}
+# Columns a row needs to create a student; existing students only need a key
+NEW_STUDENT_FIELDS = ('username', 'password', 'first_name', 'last_name', 'date_of_birth')
+# Columns an import may change on an existing student
+USER_UPDATE_FIELDS = ('email', 'first_name', 'last_name')
+STUDENT_UPDATE_FIELDS = ('date_of_birth', 'gender', 'address', 'phone', 'admission_date')
+
+ErrorCallback = Callable[[int, str], None]
+
+
+class ImportService(BaseService):
+    def __init__(self):
+        self.student_repo = StudentRepository()
+        self.user_repo = UserRepository()
+        super().__init__(self.student_repo)
+    
+    def import_upload(self, file) -> Tuple[Dict[str, Any], int]:
+        """Import an uploaded roster; the upload is kept in UPLOAD_FOLDER while it is read"""
+        if file is None or not file.filename:
+            return {
+                'status': 'error',
+                'message': 'No file uploaded'
+            }, 400
+        try:
+            extension = roster_format(file.filename)
+        except ValueError as e:
+            return {
+                'status': 'error',
+                'message': str(e)
+            }, 400
+        
+        folder = current_app.config['UPLOAD_FOLDER']
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f'import-{uuid.uuid4().hex}.{extension}')
+        file.save(path)
+        try:
+            return self.import_roster(path)
+        finally:
+            os.remove(path)
+    
+    def import_roster(self, path: str, filename: str = None,
+                      on_progress: Optional[Callable[[Dict[str, int]], None]] = None,
+                      on_error: Optional[ErrorCallback] = None) -> Tuple[Dict[str, Any], int]:
+        """
+        Create or update students from a CSV or XLSX roster, streaming it in
+        chunks of IMPORT_CHUNK_SIZE rows with one transaction per chunk.
+        Rows match existing students on student_id, then on email. The
+        response lists the first IMPORT_MAX_ERRORS row errors; `on_error`
+        sees every one and `on_progress` gets the counts after each chunk.
+        """
+        chunk_size = current_app.config.get('IMPORT_CHUNK_SIZE', 500)
+        max_errors = current_app.config.get('IMPORT_MAX_ERRORS', 1000)
+        summary = {'processed': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'failed': 0}
+        errors: List[Dict[str, Any]] = []
+        
+        def report(line: int, message: str) -> None:
+            summary['failed'] += 1
+            if len(errors) < max_errors:
+                errors.append({'line': line, 'message': message})
+            if on_error:
+                on_error(line, message)
+        
+        def result(status: str, message: str) -> Dict[str, Any]:
+            return {
+                'status': status,
+                'message': message,
+                **summary,
+                'errors': errors,
+                'errors_truncated': summary['failed'] > len(errors)
+            }
+        
+        role_id = get_role_registry().id_for('student')
+        if role_id is None:
+            return {
+                'status': 'error',
+                'message': 'Role student not found'
+            }, 500
+        
+        try:
+            rows = read_roster(path, filename, required=('email',))
+            for chunk in self._chunks(rows, chunk_size):
+                for outcome, count in self._import_chunk(chunk, role_id, report).items():
+                    summary[outcome] += count
+                summary['processed'] += len(chunk)
+                publish('student.import_progress', dict(summary))
+                if on_progress:
+                    on_progress(dict(summary))
+        except (ValueError, csv.Error, zipfile.BadZipFile) as e:
+            # The file itself is unreadable; chunks before this point stay imported
+            db.session.rollback()
+            return result('error', f'Could not read the file: {str(e)}'), 400
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error importing students: {str(e)}")
+            return result('error', 'Failed to import students'), 500
+        
+        return result('success', f"Imported {summary['processed']} rows"), 200
+    
+    @staticmethod
+    def _chunks(rows: Iterator[Tuple[int, Dict[str, str]]],
+                size: int) -> Iterator[List[Tuple[int, Dict[str, str]]]]:
+        while True:
+            chunk = list(islice(rows, size))
+            if not chunk:
+                return
+            yield chunk
+    
+    @staticmethod
+    def parse_roster_row(row: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Validate one roster row and keep its non-empty columns, with dates
+        parsed. Empty cells leave existing values alone. Raises ValueError.
+        """
+        values = {}
+        for field, max_length in ROSTER_FIELDS.items():
+            value = row.get(field)
+            if not value:
+                continue
+            if max_length and len(value) > max_length:
+                raise ValueError(f'{field} is longer than {max_length} characters')
+            values[field] = value
+        
+        if 'email' not in values:
+            raise ValueError('Missing email')
+        if not validate_email(values['email']):
+            raise ValueError('Invalid email format')
+        if 'password' in values:
+            is_valid, message = validate_password(values['password'])
+            if not is_valid:
+                raise ValueError(message)
+        for field in ('date_of_birth', 'admission_date'):
+            if field in values:
+                if not validate_date(values[field]):
+                    raise ValueError(f'Invalid {field} format. Use YYYY-MM-DD')
+                values[field] = datetime.strptime(values[field], '%Y-%m-%d').date()
+        if 'gender' in values:
+            values['gender'] = values['gender'].title()
+            if not validate_gender(values['gender']):
+                raise ValueError('Invalid gender. Use Male, Female or Other')
+        if 'phone' in values and not validate_phone(values['phone']):
+            raise ValueError('Invalid phone number')
+        return values
+    
+    def _import_chunk(self, chunk: List[Tuple[int, Dict[str, str]]], role_id: int,
+                      report: ErrorCallback, retry: bool = True) -> Dict[str, int]:
+        """
+        Upsert one chunk of rows in one transaction; returns counts per outcome.
+        If a concurrent write makes the commit fail, the rows are retried one
+        per transaction so that only the conflicting ones are reported.
+        """
+        parsed = []
+        for line, row in chunk:
+            try:
+                parsed.append((line, self.parse_roster_row(row)))
+            except ValueError as e:
+                report(line, str(e))
+        
+        # One query each for the students and users the chunk refers to
+        students = self.student_repo.get_by_student_ids(
+            [values['student_id'] for _, values in parsed if 'student_id' in values]
+        )
+        users = self.user_repo.get_by_emails([values['email'] for _, values in parsed])
+        taken_usernames, _ = self.user_repo.find_taken(
+            [values['username'] for _, values in parsed if 'username' in values], []
+        )
+        
+        counts = {'created': 0, 'updated': 0, 'unchanged': 0}
+        new_rows, new_student_ids = [], set()
+        # Emails that earlier rows of the chunk create, or move from one user to another
+        claimed_emails = set()
+        written: List[int] = []
+        keys: List[Tuple[str, Hashable]] = []
+        for line, values in parsed:
+            student = students.get(values.get('student_id'))
+            user = users.get(values['email'])
+            if values.get('student_id') in new_student_ids:
+                report(line, 'Duplicate of an earlier row in the file')
+                continue
+            if values['email'] in claimed_emails:
+                report(line, 'Email is used by an earlier row in the file')
+                continue
+            if student is None and user is not None:
+                if user.student is None:
+                    report(line, 'Email belongs to a non-student account')
+                    continue
+                if 'student_id' in values:
+                    report(line, f'Email already registered to student {user.student.student_id}')
+                    continue
+                student = user.student
+            
+            if student is not None:
+                if user is not None and user is not student.user:
+                    report(line, 'Email already registered')
+                    continue
+                student_keys = self.student_repo.cache_keys(student)
+                if student.user.email != values['email']:
+                    claimed_emails.update((student.user.email, values['email']))
+                if self._apply(student, values):
+                    keys.extend(student_keys)
+                    written.append(line)
+                    counts['updated'] += 1
+                else:
+                    counts['unchanged'] += 1
+                continue
+            
+            missing = [field for field in NEW_STUDENT_FIELDS if field not in values]
+            if missing:
+                report(line, f"Missing required fields for a new student: {', '.join(missing)}")
+                continue
+            if values['username'] in taken_usernames:
+                report(line, 'Username already exists')
+                continue
+            taken_usernames.add(values['username'])
+            claimed_emails.add(values['email'])
+            if 'student_id' in values:
+                new_student_ids.add(values['student_id'])
+            written.append(line)
+            new_rows.append(values)
+        
+        hashes = StudentService.hash_passwords([values.pop('password') for values in new_rows])
+        batch = []
+        for values, password_hash in zip(new_rows, hashes):
+            user_fields = {field: values.pop(field)
+                           for field in ('username', 'email', 'first_name', 'last_name')}
+            user_fields.update(password_hash=password_hash, role_id=role_id)
+            batch.append((user_fields, values))
+        
+        try:
+            self.student_repo.add_students(batch)
+            db.session.commit()
+        except IntegrityError:
+            # Another request wrote one of these usernames, emails or student IDs meanwhile
+            db.session.rollback()
+            if not retry:
+                for line in written:
+                    report(line, 'Conflicting concurrent write; row not imported, please retry')
+                return {'unchanged': counts['unchanged']}
+            rows = dict(chunk)
+            counts = {'created': 0, 'updated': 0, 'unchanged': counts['unchanged']}
+            for line in written:
+                for outcome, count in self._import_chunk([(line, rows[line])], role_id, report,
+                                                         retry=False).items():
+                    counts[outcome] += count
+            return counts
+        self.student_repo.evict(keys)
+        
+        counts['created'] = len(batch)
+        return counts
+    
+    @staticmethod
+    def _apply(student, values: Dict[str, Any]) -> bool:
+        """Copy changed roster values onto a student and its user; True if any changed"""
+        changed = False
+        targets = ((student.user, USER_UPDATE_FIELDS), (student, STUDENT_UPDATE_FIELDS))
+        for target, fields in targets:
+            for field in fields:
+                if field in values and getattr(target, field) != values[field]:
+                    setattr(target, field, values[field])
+                    changed = True
+        return changed
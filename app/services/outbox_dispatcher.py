@@ -0,0 +1,180 @@
+"""
+In-process delivery of outbox events to consumers
+
+Each consumer registers a handler and is fed the outbox rows after its own
+sequence number, a batch at a time. One query per batch serves every
+consumer: rows are read after the lowest position and each handler gets the
+slice it has not seen yet. Dispatch runs right after any commit that wrote
+outbox rows and, with OUTBOX_POLL_SECONDS set, on a background thread that
+also picks up events committed by other worker processes.
+"""
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config.database import db
+from app.repositories import outbox_repo
+
+EXTENSION_KEY = 'outbox_dispatcher'
+
+Handler = Callable[[List[Dict[str, Any]]], None]
+
+
+class _Consumer:
+    def __init__(self, handler: Handler, entities: Optional[Iterable[str]], position: int):
+        self.handler = handler
+        self.entities = set(entities) if entities is not None else None
+        self.position = position
+
+
+class OutboxDispatcher:
+    def __init__(self, app, batch_size: int = 500, poll_seconds: float = 0):
+        self.app = app
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self._consumers: Dict[str, _Consumer] = {}
+        self._lock = threading.Lock()
+        self._dispatching = threading.Lock()
+        self._again = False
+        self._stop = threading.Event()
+        self._poller_pid: Optional[int] = None
+
+    def subscribe(self, name: str, handler: Handler, entities: Optional[Iterable[str]] = None,
+                  after: Optional[int] = None) -> int:
+        """
+        Feed `handler` batches of events for `entities` (all if None) with a
+        sequence number above `after`, or above the current head when `after`
+        is None. Returns the starting position.
+        """
+        if after is None:
+            with db.engine.connect() as connection:
+                after = outbox_repo.head(connection)
+        with self._lock:
+            self._consumers[name] = _Consumer(handler, entities, after)
+        self._ensure_poller()
+        return after
+
+    def unsubscribe(self, name: str) -> None:
+        with self._lock:
+            self._consumers.pop(name, None)
+
+    def position(self, name: str) -> Optional[int]:
+        consumer = self._consumers.get(name)
+        return consumer.position if consumer else None
+
+    def dispatch(self) -> int:
+        """
+        Deliver every pending event; returns the number of handler calls. If
+        another thread is already dispatching, it is asked to go round again
+        and this call returns 0 straight away.
+        """
+        if not self._consumers:
+            return 0
+        if not self._dispatching.acquire(blocking=False):
+            self._again = True
+            return 0
+        calls = 0
+        try:
+            while True:
+                self._again = False
+                calls += self._dispatch_pending()
+                if not self._again:
+                    return calls
+        finally:
+            self._dispatching.release()
+
+    def _dispatch_pending(self) -> int:
+        calls = 0
+        failed = set()
+        with db.engine.connect() as connection:
+            while True:
+                with self._lock:
+                    # A consumer that failed sits out until the next dispatch
+                    consumers = [consumer for consumer in self._consumers.values()
+                                 if id(consumer) not in failed]
+                if not consumers:
+                    return calls
+                after = min(consumer.position for consumer in consumers)
+                # Reading by `seq > after` cannot skip a row: outbox writers are
+                # serialized (see outbox_repo), so rows commit in seq order
+                rows = outbox_repo.read_events(connection, after, self.batch_size)
+                if not rows:
+                    return calls
+
+                for consumer in consumers:
+                    batch = [
+                        row for row in rows
+                        if row['seq'] > consumer.position
+                        and (consumer.entities is None or row['entity'] in consumer.entities)
+                    ]
+                    try:
+                        if batch:
+                            consumer.handler(batch)
+                            calls += 1
+                    except Exception as e:
+                        # Keep the position so the batch is offered again next time
+                        current_app.logger.error(
+                            f"Outbox consumer failed at seq {batch[0]['seq']}: {str(e)}"
+                        )
+                        failed.add(id(consumer))
+                        continue
+                    consumer.position = max(consumer.position, rows[-1]['seq'])
+
+                if len(rows) < self.batch_size:
+                    return calls
+
+    def _ensure_poller(self) -> None:
+        if self.poll_seconds <= 0 or self._poller_pid == os.getpid():
+            return
+        # First subscriber in this process (or first since a fork)
+        self._poller_pid = os.getpid()
+        self._stop.clear()
+        threading.Thread(target=self._poll, daemon=True).start()
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.poll_seconds):
+            with self.app.app_context():
+                try:
+                    self.dispatch()
+                except Exception as e:
+                    current_app.logger.error(f"Error polling the outbox: {str(e)}")
+
+    def close(self) -> None:
+        """Stop the background poller"""
+        self._stop.set()
+        self._poller_pid = None
+
+
+def get_outbox_dispatcher() -> OutboxDispatcher:
+    """The current app's OutboxDispatcher, created on first use"""
+    dispatcher = current_app.extensions.get(EXTENSION_KEY)
+    if dispatcher is None:
+        dispatcher = current_app.extensions.setdefault(EXTENSION_KEY, OutboxDispatcher(
+            current_app._get_current_object(),
+            batch_size=current_app.config.get('OUTBOX_BATCH_SIZE', 500),
+            poll_seconds=current_app.config.get('OUTBOX_POLL_SECONDS', 0)
+        ))
+    return dispatcher
+
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_after_commit(session):
+    if not session.info.pop('outbox_written', False) or not has_app_context():
+        return
+    dispatcher = current_app.extensions.get(EXTENSION_KEY)
+    if dispatcher is None:
+        return
+    try:
+        dispatcher.dispatch()
+    except Exception as e:
+        # The write is already committed; consumers catch up on a later dispatch
+        current_app.logger.error(f"Error dispatching outbox events: {str(e)}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back(session):
+    session.info.pop('outbox_written', None)
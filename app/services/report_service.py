@@ -3,10 +3,16 @@ import os
 from datetime import datetime
 from flask import current_app
 from app.repositories.student_repo import StudentRepository
+from app.repositories.records import StudentRecord
 from app.models.student import Student
+from app.utils.single_flight import coalesce
 from .base_service import BaseService
 
 
+def _format_date(value, default):
+    return value.isoformat() if value else default
+
+
 class ReportService(BaseService):
     def __init__(self):
         self.student_repo = StudentRepository()
@@ -15,23 +21,11 @@ class ReportService(BaseService):
     def generate_student_report(self, format: str = 'pdf', search_term: str = None, **filters) -> Tuple[Dict[str, Any], int]:
         """Generate student report in specified format"""
         try:
-            # Get student data
-            students = self.student_repo.get_students_with_details()
-            
-            # Apply filters
-            if search_term:
-                search = search_term.lower()
-                students = [
-                    s for s in students 
-                    if (search in s['student_id'].lower() or
-                        search in s['user'].get('first_name', '').lower() or
-                        search in s['user'].get('last_name', '').lower() or
-                        search in s['user'].get('email', '').lower())
-                ]
-            
-            for key, value in filters.items():
-                if value is not None:
-                    students = [s for s in students if str(s.get(key, '')).lower() == str(value).lower()]
+            # Read plain records; the generators only print them
+            students = list(self.student_repo.select_student_records(
+                search_term=search_term,
+                **filters
+            ))
             
             if format == 'pdf':
                 file_path = self._generate_pdf_report(students)
@@ -56,7 +50,7 @@ class ReportService(BaseService):
     def generate_student_profile(self, student_id: int, format: str = 'pdf') -> Tuple[Dict[str, Any], int]:
         """Generate individual student profile report"""
         try:
-            student = self.student_repo.get_student_with_details(student_id)
+            student = self.student_repo.get_student_record(student_id)
             
             if not student:
                 return {
@@ -65,7 +59,8 @@ class ReportService(BaseService):
                 }, 404
             
             file_path = self._generate_student_profile_pdf(student)
-            filename = f"student_profile_{student['student_id']}_{datetime.now().strftime('%Y%m%d')}.pdf"
+            date_stamp = datetime.now().strftime('%Y%m%d')
+            filename = f"student_profile_{student.student_id}_{date_stamp}.pdf"
             
             return {
                 'status': 'success',
@@ -80,6 +75,7 @@ class ReportService(BaseService):
                 'message': f'Failed to generate profile: {str(e)}'
             }, 500
     
+    @coalesce(('student',))
     def get_student_analytics(self) -> Tuple[Dict[str, Any], int]:
         """Get student statistics and analytics"""
         try:
@@ -165,15 +161,13 @@ class ReportService(BaseService):
             data = [['Student ID', 'Name', 'Email', 'Gender', 'Phone', 'Admission Date']]
             
             for student in students:
-                user = student.get('user', {})
-                full_name = f"{user.get('first_name', '')} {user.get('last_name', '')}".strip()
                 data.append([
-                    student.get('student_id', 'N/A'),
-                    full_name or 'N/A',
-                    user.get('email', 'N/A'),
-                    student.get('gender', 'N/A'),
-                    student.get('phone', 'N/A'),
-                    student.get('admission_date', 'N/A')
+                    student.student_id or 'N/A',
+                    student.full_name or 'N/A',
+                    student.email or 'N/A',
+                    student.gender or 'N/A',
+                    student.phone or 'N/A',
+                    _format_date(student.admission_date, 'N/A')
                 ])
             
             # Create table
@@ -238,16 +232,15 @@ class ReportService(BaseService):
             
             # Add data
             for student in students:
-                user = student.get('user', {})
                 ws.append([
-                    student.get('student_id', ''),
-                    user.get('first_name', ''),
-                    user.get('last_name', ''),
-                    user.get('email', ''),
-                    student.get('gender', ''),
-                    student.get('phone', ''),
-                    student.get('date_of_birth', ''),
-                    student.get('admission_date', '')
+                    student.student_id or '',
+                    student.first_name or '',
+                    student.last_name or '',
+                    student.email or '',
+                    student.gender or '',
+                    student.phone or '',
+                    _format_date(student.date_of_birth, ''),
+                    _format_date(student.admission_date, '')
                 ])
             
             # Adjust column widths
@@ -270,7 +263,7 @@ class ReportService(BaseService):
             current_app.logger.warning("openpyxl not installed, generating text report instead")
             return self._generate_text_report(students, 'excel')
     
-    def _generate_student_profile_pdf(self, student: dict) -> str:
+    def _generate_student_profile_pdf(self, student: StudentRecord) -> str:
         """Generate PDF profile for individual student"""
         try:
             from reportlab.lib import colors
@@ -283,7 +276,8 @@ class ReportService(BaseService):
             pdf_dir = os.path.join(reports_dir, 'pdf')
             os.makedirs(pdf_dir, exist_ok=True)
             
-            filename = f"student_profile_{student['student_id']}_{datetime.now().strftime('%Y%m%d')}.pdf"
+            date_stamp = datetime.now().strftime('%Y%m%d')
+            filename = f"student_profile_{student.student_id}_{date_stamp}.pdf"
             filepath = os.path.join(pdf_dir, filename)
             
             doc = SimpleDocTemplate(filepath, pagesize=A4)
@@ -304,17 +298,16 @@ class ReportService(BaseService):
             elements.append(Spacer(1, 0.3*inch))
             
             # Student information
-            user = student.get('user', {})
             info_data = [
-                ['Student ID:', student.get('student_id', 'N/A')],
-                ['Name:', f"{user.get('first_name', '')} {user.get('last_name', '')}"],
-                ['Email:', user.get('email', 'N/A')],
-                ['Date of Birth:', student.get('date_of_birth', 'N/A')],
-                ['Gender:', student.get('gender', 'N/A')],
-                ['Phone:', student.get('phone', 'N/A')],
-                ['Address:', student.get('address', 'N/A')],
-                ['Admission Date:', student.get('admission_date', 'N/A')],
-                ['Status:', 'Active' if user.get('is_active', False) else 'Inactive']
+                ['Student ID:', student.student_id or 'N/A'],
+                ['Name:', student.full_name],
+                ['Email:', student.email or 'N/A'],
+                ['Date of Birth:', _format_date(student.date_of_birth, 'N/A')],
+                ['Gender:', student.gender or 'N/A'],
+                ['Phone:', student.phone or 'N/A'],
+                ['Address:', student.address or 'N/A'],
+                ['Admission Date:', _format_date(student.admission_date, 'N/A')],
+                ['Status:', 'Active' if student.is_active else 'Inactive']
             ]
             
             info_table = Table(info_data, colWidths=[2*inch, 4*inch])
@@ -353,13 +346,12 @@ class ReportService(BaseService):
             f.write(f"Generated on: {datetime.now().strftime('%B %d, %Y at %H:%M')}\n\n")
             
             for student in students:
-                user = student.get('user', {})
-                f.write(f"Student ID: {student.get('student_id', 'N/A')}\n")
-                f.write(f"Name: {user.get('first_name', '')} {user.get('last_name', '')}\n")
-                f.write(f"Email: {user.get('email', 'N/A')}\n")
-                f.write(f"Gender: {student.get('gender', 'N/A')}\n")
-                f.write(f"Phone: {student.get('phone', 'N/A')}\n")
-                f.write(f"Admission Date: {student.get('admission_date', 'N/A')}\n")
+                f.write(f"Student ID: {student.student_id or 'N/A'}\n")
+                f.write(f"Name: {student.full_name}\n")
+                f.write(f"Email: {student.email or 'N/A'}\n")
+                f.write(f"Gender: {student.gender or 'N/A'}\n")
+                f.write(f"Phone: {student.phone or 'N/A'}\n")
+                f.write(f"Admission Date: {_format_date(student.admission_date, 'N/A')}\n")
                 f.write("-" * 80 + "\n\n")
         
         return filepath
\ No newline at end of file
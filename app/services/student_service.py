@@ -1,15 +1,37 @@
-from typing import List, Dict, Any, Optional, Tuple
-from datetime import date
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
 from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app.config.database import db
+from werkzeug.security import generate_password_hash
 from app.models.student import Student
-from app.repositories.student_repo import StudentRepository
+from app.models.user import User
+from app.models.outbox import OutboxEvent
+from app.repositories.outbox_repo import OutboxRepository
+from app.repositories.role_registry import get_role_registry
+from app.repositories.student_repo import (
+    DEFAULT_SORT, SORT_ORDERS, STUDENT_READ_ENTITIES, StudentRepository
+)
 from app.repositories.user_repo import UserRepository
+from app.utils.pagination import encode_cursor, decode_cursor, parse_ids, parse_limit, parse_sort
+from app.utils.fieldsets import parse_fields
+from app.utils.json_provider import RawJSON
+from app.utils.msgpack_codec import wants_msgpack
+from app.utils.event_bus import publish
+from app.utils.single_flight import coalesce
+from app.utils.validators import validate_email, validate_password
 from .base_service import BaseService
 
+# User fields every bulk row must have
+BULK_USER_FIELDS = ('username', 'email', 'password', 'first_name', 'last_name')
+
 class StudentService(BaseService):
     def __init__(self):
         self.student_repo = StudentRepository()
         self.user_repo = UserRepository()
+        self.outbox_repo = OutboxRepository()
         super().__init__(self.student_repo)
     
     def create_student(self, user_data: Dict[str, Any], student_data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
@@ -31,6 +53,7 @@ class StudentService(BaseService):
             
             # Get the complete student data with user details
             result = self.student_repo.get_student_with_details(student.id)
+            publish('student.created', self._event_data(result))
             
             return {
                 'status': 'success',
@@ -47,6 +70,180 @@ class StudentService(BaseService):
                 'message': 'Failed to create student profile'
             }, 500
     
+    def bulk_create_students(self, rows: Any, partial: bool = False) -> Tuple[Dict[str, Any], int]:
+        """
+        Create many students with their user accounts in one transaction.
+        Every row is validated and checked for username and email conflicts
+        first; unless `partial`, one bad row means nothing is created.
+        Returns one result per row, in input order.
+        """
+        if not isinstance(rows, list) or not rows:
+            return {
+                'status': 'error',
+                'message': 'Expected a non-empty array of students'
+            }, 400
+        
+        max_rows = current_app.config.get('STUDENTS_BULK_MAX_ROWS', 10000)
+        if len(rows) > max_rows:
+            return {
+                'status': 'error',
+                'message': f'At most {max_rows} students per request'
+            }, 400
+        
+        role_id = get_role_registry().id_for('student')
+        if role_id is None:
+            return {
+                'status': 'error',
+                'message': 'Role student not found'
+            }, 500
+        
+        results: List[Dict[str, Any]] = [{'index': i} for i in range(len(rows))]
+        parsed = {}
+        for i, row in enumerate(rows):
+            try:
+                parsed[i] = self.parse_student_row(row)
+            except ValueError as e:
+                results[i].update(status='error', message=str(e))
+        
+        self._reject_conflicts(parsed, results)
+        
+        failed = len(rows) - len(parsed)
+        if not parsed or (failed and not partial):
+            for i in parsed:
+                results[i]['status'] = 'skipped'
+            return {
+                'status': 'error',
+                'message': f'{failed} of {len(rows)} rows are invalid; no students were created',
+                'created': 0,
+                'failed': failed,
+                'results': results
+            }, 400
+        
+        indexes = sorted(parsed)
+        hashes = self.hash_passwords([parsed[i][0].pop('password') for i in indexes])
+        batch = []
+        for i, password_hash in zip(indexes, hashes):
+            user_data, student_data = parsed[i]
+            user_fields = {**user_data, 'password_hash': password_hash, 'role_id': role_id}
+            batch.append((user_fields, student_data))
+        
+        try:
+            students = self.student_repo.bulk_create_students(batch)
+        except IntegrityError:
+            # Another request took a username, email or student ID meanwhile
+            db.session.rollback()
+            return {
+                'status': 'error',
+                'message': 'Conflicting concurrent write; no students were created, please retry'
+            }, 409
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error creating students in bulk: {str(e)}")
+            return {
+                'status': 'error',
+                'message': 'Failed to create students'
+            }, 500
+        
+        for i, student in zip(indexes, students):
+            results[i].update(status='created', id=student.id, student_id=student.student_id,
+                              user_id=student.user_id, username=student.user.username)
+        publish('student.bulk_created', {'count': len(students)})
+        
+        return {
+            'status': 'success',
+            'created': len(students),
+            'failed': failed,
+            'results': results
+        }, 201 if not failed else 207
+    
+    @staticmethod
+    def parse_student_row(row: Any) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Validate one student for bulk creation and split it into user and
+        student fields. Dates are YYYY-MM-DD strings. Raises ValueError.
+        """
+        if not isinstance(row, dict):
+            raise ValueError('Expected an object')
+        
+        missing = [field for field in BULK_USER_FIELDS + ('date_of_birth',)
+                   if not isinstance(row.get(field), str) or not row[field].strip()]
+        if missing:
+            raise ValueError(f"Missing required fields: {', '.join(missing)}")
+        if not validate_email(row['email']):
+            raise ValueError('Invalid email format')
+        is_valid, message = validate_password(row['password'])
+        if not is_valid:
+            raise ValueError(message)
+        
+        student_data = {}
+        for field in ('date_of_birth', 'admission_date'):
+            if row.get(field):
+                try:
+                    student_data[field] = datetime.strptime(row[field], '%Y-%m-%d').date()
+                except (TypeError, ValueError):
+                    raise ValueError(f'Invalid {field} format. Use YYYY-MM-DD')
+        for field in ('gender', 'address', 'phone'):
+            if row.get(field) is not None:
+                student_data[field] = str(row[field])
+        
+        user_data = {field: row[field].strip() if field != 'password' else row[field]
+                     for field in BULK_USER_FIELDS}
+        return user_data, student_data
+    
+    def _reject_conflicts(self, parsed: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]],
+                          results: List[Dict[str, Any]]) -> None:
+        """Drop rows whose username or email repeats in the batch or is already registered"""
+        taken_usernames, taken_emails = self.user_repo.find_taken(
+            [user['username'] for user, _ in parsed.values()],
+            [user['email'] for user, _ in parsed.values()]
+        )
+        seen_usernames, seen_emails = set(), set()
+        for i in sorted(parsed):
+            username, email = parsed[i][0]['username'], parsed[i][0]['email']
+            if username in taken_usernames:
+                message = 'Username already exists'
+            elif email in taken_emails:
+                message = 'Email already registered'
+            elif username in seen_usernames:
+                message = 'Duplicate username in request'
+            elif email in seen_emails:
+                message = 'Duplicate email in request'
+            else:
+                seen_usernames.add(username)
+                seen_emails.add(email)
+                continue
+            del parsed[i]
+            results[i].update(status='error', message=message)
+    
+    @staticmethod
+    def hash_passwords(passwords: List[str]) -> List[str]:
+        """Hash passwords on a thread pool; the hash function releases the GIL"""
+        workers = current_app.config.get('PASSWORD_HASH_WORKERS') or os.cpu_count() or 1
+        if workers <= 1 or len(passwords) <= 1:
+            return [generate_password_hash(password) for password in passwords]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(generate_password_hash, passwords))
+    
+    def delete(self, student_id: int) -> bool:
+        """Delete a student and notify connected clients"""
+        student = self.student_repo.get_by_id(student_id)
+        if not student:
+            return False
+        data = {'id': student.id, 'student_id': student.student_id, 'gender': student.gender}
+        if not self.student_repo.delete(student_id):
+            return False
+        publish('student.deleted', data)
+        return True
+    
+    @staticmethod
+    def _event_data(student: Dict[str, Any]) -> Dict[str, Any]:
+        """Compact event payload for a serialized student"""
+        return {
+            'id': student['id'],
+            'student_id': student['student_id'],
+            'gender': student['gender']
+        }
+    
     def update_student(self, student_id: int, student_data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
         """Update student information"""
         student = self.student_repo.get_by_id(student_id)
@@ -77,6 +274,7 @@ class StudentService(BaseService):
         
         # Get updated student data
         updated_student = self.student_repo.get_student_with_details(student_id)
+        publish('student.updated', self._event_data(updated_student))
         
         return {
             'status': 'success',
@@ -84,9 +282,18 @@ class StudentService(BaseService):
             'student': updated_student
         }, 200
     
-    def get_student_details(self, student_id: int) -> Tuple[Dict[str, Any], int]:
+    def get_student_details(self, student_id: int,
+                            fields: str = None) -> Tuple[Dict[str, Any], int]:
         """Get detailed information about a student"""
-        student = self.student_repo.get_student_with_details(student_id)
+        try:
+            fieldset = self.parse_student_fields(fields)
+        except ValueError as e:
+            return {
+                'status': 'error',
+                'message': str(e)
+            }, 400
+        
+        student = self.student_repo.get_student_with_details(student_id, fieldset)
         
         if not student:
             return {
@@ -99,31 +306,154 @@ class StudentService(BaseService):
             'student': student
         }, 200
     
-    def list_students(self, search_term: str = None, **filters) -> Tuple[Dict[str, Any], int]:
-        """List all students with optional filtering"""
+    def get_students_by_ids(self, ids: Any, fields: str = None) -> Tuple[Dict[str, Any], int]:
+        """
+        Get many students in one query. Results follow the order of `ids`
+        (repeats dropped) and ids with no student are listed in `missing`.
+        """
         try:
-            students = self.student_repo.get_students_with_details()
-            
-            # Apply search filter if provided
-            if search_term:
-                search = search_term.lower()
-                students = [
-                    s for s in students 
-                    if (search in s['student_id'].lower() or
-                        search in s['user'].get('first_name', '').lower() or
-                        search in s['user'].get('last_name', '').lower() or
-                        search in s['user'].get('email', '').lower())
-                ]
-            
-            # Apply additional filters
-            for key, value in filters.items():
-                if value is not None:
-                    students = [s for s in students if str(s.get(key, '')).lower() == str(value).lower()]
+            fieldset = self.parse_student_fields(fields)
+            ids = parse_ids(ids, current_app.config.get('STUDENTS_MAX_IDS', 5000))
+        except ValueError as e:
+            return {
+                'status': 'error',
+                'message': str(e)
+            }, 400
+        
+        found = self.student_repo.get_students_by_ids(ids, fieldset)
+        
+        return {
+            'status': 'success',
+            'count': len(found),
+            'students': [found[student_id] for student_id in ids if student_id in found],
+            'missing': [student_id for student_id in ids if student_id not in found]
+        }, 200
+    
+    def get_changes(self, since: str = None, limit: Any = None,
+                    fields: str = None) -> Tuple[Dict[str, Any], int]:
+        """
+        Student creates, updates and deletes after the `since` cursor, oldest
+        first. Each student appears once per page, with its latest operation
+        and current data (None once deleted). Without `since`, returns no
+        changes and a cursor at the current end of the feed.
+        """
+        try:
+            fieldset = self.parse_student_fields(fields)
+            page_size = parse_limit(
+                limit,
+                default=current_app.config.get('STUDENTS_PAGE_SIZE', 100),
+                maximum=current_app.config.get('STUDENTS_MAX_PAGE_SIZE', 1000)
+            )
+            after = decode_cursor(since, 1)[0] if since else None
+            if after is not None and not isinstance(after, int):
+                raise ValueError('Invalid cursor')
+        except ValueError as e:
+            return {
+                'status': 'error',
+                'message': str(e)
+            }, 400
+        
+        if after is None:
+            return {
+                'status': 'success',
+                'count': 0,
+                'changes': [],
+                'next_cursor': encode_cursor([self.outbox_repo.head('student')]),
+                'has_more': False
+            }, 200
+        
+        changes, has_more = self.outbox_repo.events_since('student', after, page_size)
+        
+        latest = {}
+        for change in changes:
+            latest.pop(change.entity_id, None)
+            latest[change.entity_id] = change
+        live_ids = [pk for pk, change in latest.items() if change.operation != OutboxEvent.DELETE]
+        students = self.student_repo.get_students_by_ids(live_ids, fieldset) if live_ids else {}
+        
+        return {
+            'status': 'success',
+            'count': len(latest),
+            'changes': [
+                {
+                    'seq': change.seq,
+                    'operation': change.operation,
+                    'id': pk,
+                    'changed_at': change.created_at,
+                    # A student deleted later in the feed has no current data
+                    'student': students.get(pk)
+                }
+                for pk, change in latest.items()
+            ],
+            'next_cursor': encode_cursor([changes[-1].seq if changes else after]),
+            'has_more': has_more
+        }, 200
+    
+    @staticmethod
+    def parse_student_fields(fields: Optional[str]) -> Optional[Dict[str, List[str]]]:
+        """Parse a `fields=` parameter for student endpoints; raises ValueError"""
+        return parse_fields(fields, Student.FIELDS, {'user': User.FIELDS})
+    
+    @staticmethod
+    def parse_student_sort(sort: Optional[str]) -> Tuple[str, bool]:
+        """Parse a `sort=` parameter for student lists; raises ValueError"""
+        return parse_sort(sort, list(SORT_ORDERS), DEFAULT_SORT)
+    
+    @coalesce(STUDENT_READ_ENTITIES)
+    def list_students(self, search_term: str = None, limit: Any = None, cursor: str = None,
+                      fuzzy: bool = False, fields: str = None, sort: str = None,
+                      **filters) -> Tuple[Dict[str, Any], int]:
+        """List students with optional filtering, one keyset page at a time"""
+        try:
+            fieldset = self.parse_student_fields(fields)
+            page_size = parse_limit(
+                limit,
+                default=current_app.config.get('STUDENTS_PAGE_SIZE', 100),
+                maximum=current_app.config.get('STUDENTS_MAX_PAGE_SIZE', 1000)
+            )
+            sort_key, descending = self.parse_student_sort(sort)
+            after = self.student_repo.parse_page_key(
+                sort_key, decode_cursor(cursor, len(SORT_ORDERS[sort_key]))
+            ) if cursor else None
+        except ValueError as e:
+            return {
+                'status': 'error',
+                'message': str(e)
+            }, 400
+        
+        try:
+            if (current_app.config.get('STUDENTS_DB_JSON') and not wants_msgpack()
+                    and self.student_repo.supports_json_pages()):
+                # Rows need no Python-side work, so the database writes the JSON
+                rows_json, count, next_key = self.student_repo.list_students_page_json(
+                    search_term=search_term,
+                    limit=page_size,
+                    after=after,
+                    fuzzy=fuzzy,
+                    fieldset=fieldset,
+                    sort=sort_key,
+                    descending=descending,
+                    **filters
+                )
+                students = RawJSON(rows_json)
+            else:
+                students, next_key = self.student_repo.list_students_page(
+                    search_term=search_term,
+                    limit=page_size,
+                    after=after,
+                    fuzzy=fuzzy,
+                    fieldset=fieldset,
+                    sort=sort_key,
+                    descending=descending,
+                    **filters
+                )
+                count = len(students)
             
             return {
                 'status': 'success',
-                'count': len(students),
-                'students': students
+                'count': count,
+                'students': students,
+                'next_cursor': encode_cursor(next_key) if next_key else None
             }, 200
             
         except Exception as e:
@@ -133,13 +463,34 @@ class StudentService(BaseService):
                 'message': 'Failed to retrieve students'
             }, 500
     
+    def stream_students(self, search_term: str = None, fuzzy: bool = False,
+                        fieldset: Optional[Dict[str, List[str]]] = None,
+                        sort: str = DEFAULT_SORT, descending: bool = False,
+                        **filters) -> Iterator[str]:
+        """Yield matching students as newline-delimited JSON, one row per line"""
+        batch_size = current_app.config.get('STUDENTS_STREAM_BATCH_SIZE', 500)
+        dumps = current_app.json.dumps
+        
+        try:
+            for student in self.student_repo.iter_students_with_details(
+                search_term=search_term,
+                batch_size=batch_size,
+                fuzzy=fuzzy,
+                fieldset=fieldset,
+                sort=sort,
+                descending=descending,
+                **filters
+            ):
+                yield dumps(student) + '\n'
+        except Exception as e:
+            # Headers are already sent; log and end the stream early
+            current_app.logger.error(f"Error streaming students: {str(e)}")
+    
     def _create_user_account(self, user_data: Dict[str, Any], role_name: str) -> Tuple[Dict[str, Any], int]:
         """Helper method to create a user account with the specified role"""
-        from app.models.role import Role
-        
         # Get the role ID
-        role = Role.query.filter_by(name=role_name).first()
-        if not role:
+        role_id = get_role_registry().id_for(role_name)
+        if role_id is None:
             return {
                 'status': 'error',
                 'message': f'Role {role_name} not found'
@@ -164,7 +515,7 @@ class StudentService(BaseService):
                 username=user_data['username'],
                 email=user_data['email'],
                 password=user_data['password'],
-                role_id=role.id,
+                role_id=role_id,
                 first_name=user_data.get('first_name', ''),
                 last_name=user_data.get('last_name', '')
             )
@@ -0,0 +1,195 @@
+import threading
+import time
+from functools import partial
+from typing import Any, Dict, Iterable, List, Tuple
+from flask import current_app, has_app_context
+from sqlalchemy import bindparam, event, text
+from sqlalchemy.orm import Session
+
+from app.config.database import db
+from app.repositories.search_index import student_search_index
+from app.utils.event_bus import get_event_bus
+from app.utils.prefix_index import PrefixIndex
+
+CHANGED_EVENT = 'suggest.changed'
+# Entries per bus notice, keeping each datagram well under its size limit
+NOTICE_BATCH = 100
+
+_load_lock = threading.Lock()
+
+_SUGGEST_SQL = (
+    "SELECT students.id, students.student_id, users.first_name, users.last_name, users.email "
+    "FROM students JOIN users ON users.id = students.user_id"
+)
+
+
+def _entry(row) -> Tuple[int, Dict[str, Any], List[str]]:
+    pk, student_id, first_name, last_name, email = row
+    payload = {
+        'id': pk,
+        'student_id': student_id,
+        'first_name': first_name,
+        'last_name': last_name,
+        'email': email
+    }
+    keys = [
+        student_id,
+        first_name,
+        last_name,
+        f"{first_name or ''} {last_name or ''}",
+        f"{last_name or ''} {first_name or ''}",
+        email
+    ]
+    return pk, payload, keys
+
+
+class StudentSuggestService:
+    """
+    Typeahead over student names, emails and student IDs
+
+    Each worker keeps a PrefixIndex per app, so lookups never touch the
+    database. Gunicorn workers load it when they start (see gunicorn.conf.py).
+    Commits update it in the writing worker and send the changed entries to
+    the other workers over the event bus; SUGGEST_INDEX_TTL bounds how long a
+    worker that missed a notice, e.g. for a write made outside the web
+    workers, serves the old entries. Once the TTL has passed, a background
+    thread reloads the index while requests keep using the current entries.
+    """
+
+    EXTENSION_KEY = 'student_suggest_index'
+
+    def get_index(self, load: bool = True):
+        index = current_app.extensions.get(self.EXTENSION_KEY)
+        if not load:
+            return index
+        if index is None or index.loaded_at is None:
+            # Nothing to serve yet, so this request waits for the first load
+            with _load_lock:
+                index = current_app.extensions.get(self.EXTENSION_KEY)
+                if index is None:
+                    index = current_app.extensions[self.EXTENSION_KEY] = PrefixIndex()
+                    get_event_bus().on(CHANGED_EVENT, partial(_apply_notice, index))
+                if index.loaded_at is None and index.start_reload():
+                    try:
+                        index.load(_load_entries())
+                    except Exception:
+                        index.cancel_reload()
+                        raise
+        elif self._expired(index) and index.start_reload():
+            threading.Thread(
+                target=_reload, args=(current_app._get_current_object(), index), daemon=True
+            ).start()
+        return index
+
+    @staticmethod
+    def _expired(index: PrefixIndex) -> bool:
+        ttl = current_app.config.get('SUGGEST_INDEX_TTL', 300)
+        return index.loaded_at + ttl <= time.monotonic()
+
+    def suggest(self, query: str, limit: Any = None) -> Tuple[Dict[str, Any], int]:
+        """Return the top matches for a typeahead query"""
+        max_limit = current_app.config.get('SUGGEST_MAX_RESULTS', 20)
+        default_limit = current_app.config.get('SUGGEST_RESULTS', 10)
+        try:
+            limit = min(int(limit), max_limit) if limit else default_limit
+        except ValueError:
+            return {
+                'status': 'error',
+                'message': 'limit must be an integer'
+            }, 400
+
+        suggestions = self.get_index().search(query or '', limit) if query else []
+
+        return {
+            'status': 'success',
+            'count': len(suggestions),
+            'suggestions': suggestions
+        }, 200
+
+
+def _load_entries():
+    return [_entry(row) for row in db.session.execute(text(_SUGGEST_SQL))]
+
+
+def _reload(app, index: PrefixIndex) -> None:
+    """Reload an expired index off the request path"""
+    with app.app_context():
+        try:
+            index.load(_load_entries())
+        except Exception as e:
+            index.cancel_reload()
+            app.logger.error(f"Error reloading the suggestion index: {str(e)}")
+        finally:
+            db.session.remove()
+
+
+def _fetch_entries(connection, ids: Iterable[int]):
+    statement = text(f"{_SUGGEST_SQL} WHERE students.id IN :ids").bindparams(
+        bindparam('ids', expanding=True)
+    )
+    return [_entry(row) for row in connection.execute(statement, {'ids': list(ids)})]
+
+
+def _apply_notice(index: PrefixIndex, data: Dict[str, Any]) -> None:
+    """Apply changes another worker committed"""
+    for pk in data.get('remove', ()):
+        index.remove(pk)
+    for pk, payload, keys in data.get('entries', ()):
+        index.put(pk, payload, keys)
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_suggest_changes(session, flush_context, instances):
+    # Collected even without a local index: other workers need the changes
+    if not has_app_context():
+        return
+    reindex, remove = student_search_index.affected_ids(session, flush_context)
+    pending = session.info.setdefault('suggest_pending',
+                                      {'reindex': set(), 'remove': set(), 'new': []})
+    pending['reindex'].update(reindex)
+    pending['remove'].update(remove)
+    pending['new'].extend(i for i in session.new if type(i) in student_search_index.watch)
+
+
+@event.listens_for(Session, 'after_flush')
+def _snapshot_suggest_changes(session, flush_context):
+    pending = session.info.get('suggest_pending')
+    if not pending:
+        return
+    connection = session.connection()
+    new_ids = student_search_index.resolve(session, flush_context, pending['new'])
+    reindex = pending['reindex'] | new_ids
+    reindex -= pending['remove']
+    if reindex:
+        # Read the rows now, while the flushed state is visible to this transaction
+        pending.setdefault('entries', []).extend(_fetch_entries(connection, reindex))
+    pending['reindex'], pending['new'] = set(), []
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_suggest_changes(session):
+    pending = session.info.pop('suggest_pending', None)
+    if not pending or not has_app_context():
+        return
+    remove = sorted(pending['remove'])
+    entries = [entry for entry in pending.get('entries', []) if entry[0] not in pending['remove']]
+    if not remove and not entries:
+        return
+
+    index = current_app.extensions.get(StudentSuggestService.EXTENSION_KEY)
+    if index is not None:
+        _apply_notice(index, {'remove': remove, 'entries': entries})
+    try:
+        bus = get_event_bus()
+        if remove:
+            bus.notify(CHANGED_EVENT, {'remove': remove, 'entries': []})
+        for start in range(0, len(entries), NOTICE_BATCH):
+            batch = entries[start:start + NOTICE_BATCH]
+            bus.notify(CHANGED_EVENT, {'remove': [], 'entries': batch})
+    except Exception as e:
+        current_app.logger.error(f"Error announcing suggestion changes: {str(e)}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_suggest_changes(session):
+    session.info.pop('suggest_pending', None)
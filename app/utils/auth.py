@@ -0,0 +1,21 @@
+"""
+JWT manager that decodes each token once per application context
+
+jwt_required() and BaseService.require_roles() both verify the token, and
+batched sub-requests share their parent's application context, so without
+a cache one HTTP request can verify the same signature several times.
+Verified claims are kept on `g` for the lifetime of the context.
+"""
+from flask import g
+from flask_jwt_extended import JWTManager
+
+DECODE_CACHE = 'jwt_decode_cache'
+
+
+class RequestScopedJWTManager(JWTManager):
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        cache = g.setdefault(DECODE_CACHE, {})
+        key = (encoded_token, csrf_value, allow_expired)
+        if key not in cache:
+            cache[key] = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        return cache[key]
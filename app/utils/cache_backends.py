@@ -0,0 +1,463 @@
+"""
+Cache backends shared by all worker processes
+
+create_cache() picks the backend named by the CACHE_BACKEND setting:
+
+    memory                 LRUCache in each worker process (the default)
+    sqlite:///path/to.db   one SQLite file for every worker on the host
+    redis://host:6379/0    a Redis server (or anything speaking its protocol)
+
+Every backend offers the LRUCache interface: get, version, set (with the
+generation check), delete, clear and stats. Shared backends pickle values and
+store them under a hash of the key's repr, prefixed with the cache's
+namespace. Their generations live in the store too, one per key plus one for
+the namespace: delete() and clear() bump them, and every entry is stored with
+the generations its loader read, so a load that raced a delete in any worker
+is ignored rather than served.
+A store that cannot be reached counts as a miss and is logged, so a cache
+outage slows requests down rather than failing them. After a failed Redis
+connection, commands fail at once for a few seconds instead of each waiting
+for its own connect timeout.
+"""
+import hashlib
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from flask import current_app, has_app_context
+
+from app.utils.cache import MISSING, LRUCache
+
+
+class RedisError(Exception):
+    """Error reply from a Redis server"""
+
+
+BACKEND_ERRORS = (OSError, sqlite3.Error, RedisError, pickle.UnpicklingError)
+
+
+class SharedCache:
+    """Base for caches kept outside the worker process"""
+
+    # Prepended to every name the cache uses in the store
+    prefix = ''
+
+    def __init__(self, namespace: str, max_size: int, ttl: float):
+        self.namespace = namespace
+        self.max_size = max_size
+        self.ttl = ttl
+        # Generations outlive any entry stored with an older one
+        self.generation_ttl = 2 * ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.errors = 0
+
+    def _digest(self, key: Hashable) -> str:
+        return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+    def _key(self, key: Hashable) -> str:
+        return f'{self.prefix}{self.namespace}:{self._digest(key)}'
+
+    def _generation_keys(self, key: Hashable) -> Tuple[str, str]:
+        """Names of the namespace's and the key's generation counters"""
+        namespace = f'{self.prefix}gen:{self.namespace}'
+        return namespace, f'{namespace}:{self._digest(key)}'
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        payload = None
+        if self.max_size > 0:
+            try:
+                payload, generations = self._fetch(self._key(key), self._generation_keys(key))
+                if payload is not None:
+                    generation, value = pickle.loads(payload)
+                    # Stored by a load that raced a delete
+                    if generation is not None and generation != generations:
+                        payload = None
+                        self._remove(self._key(key))
+            except BACKEND_ERRORS as e:
+                self._failed('get', e)
+                payload = None
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return value
+
+    def version(self, key: Hashable) -> Any:
+        """Generation to pass to set() for a value about to be loaded for `key`"""
+        try:
+            return self._generations(self._generation_keys(key))
+        except BACKEND_ERRORS as e:
+            self._failed('version', e)
+            # Nothing loaded now can be checked later, so set() drops it
+            return MISSING
+
+    def set(self, key: Hashable, value: Any, generation: Any = None) -> None:
+        if self.max_size <= 0 or generation is MISSING:
+            return
+        try:
+            self._store(self._key(key),
+                        pickle.dumps((generation, value), protocol=pickle.HIGHEST_PROTOCOL))
+        except BACKEND_ERRORS as e:
+            self._failed('set', e)
+
+    def delete(self, key: Hashable) -> None:
+        try:
+            self._bump(self._generation_keys(key)[1])
+            self._remove(self._key(key))
+        except BACKEND_ERRORS as e:
+            self._failed('delete', e)
+
+    def clear(self) -> None:
+        try:
+            self._bump(self._generation_keys(None)[0])
+            self._remove_all()
+        except BACKEND_ERRORS as e:
+            self._failed('clear', e)
+
+    def __len__(self) -> int:
+        try:
+            return self._size()
+        except BACKEND_ERRORS as e:
+            self._failed('size', e)
+            return 0
+
+    def stats(self) -> Dict[str, Any]:
+        size = len(self)
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': size,
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'errors': self.errors
+            }
+
+    def _failed(self, operation: str, error: Exception) -> None:
+        with self._lock:
+            self.errors += 1
+        if has_app_context():
+            current_app.logger.warning(
+                f"Cache {operation} failed for {self.namespace}: {str(error)}"
+            )
+
+    # Implemented by each backend; keys are already namespaced strings
+    def _fetch(self, key: str, generation_keys: Tuple[str, ...]) -> Tuple[Optional[bytes], tuple]:
+        """An entry's payload and the current values of its generations"""
+        raise NotImplementedError
+
+    def _generations(self, generation_keys: Tuple[str, ...]) -> Tuple[int, ...]:
+        raise NotImplementedError
+
+    def _bump(self, generation_key: str) -> None:
+        raise NotImplementedError
+
+    def _store(self, key: str, payload: bytes) -> None:
+        raise NotImplementedError
+
+    def _remove(self, key: str) -> None:
+        raise NotImplementedError
+
+    def _remove_all(self) -> None:
+        raise NotImplementedError
+
+    def _size(self) -> int:
+        raise NotImplementedError
+
+
+class SQLiteCache(SharedCache):
+    """
+    Entries in a SQLite file that all workers on the host open. Expired
+    entries are purged on writes, and past max_size the entries nearest to
+    expiry (the oldest written) go first.
+    """
+
+    def __init__(self, path: str, namespace: str, max_size: int, ttl: float,
+                 clock=time.time):
+        super().__init__(namespace, max_size, ttl)
+        self.path = path
+        self._clock = clock
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, and none inherited across a fork
+        if getattr(self._local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entries ('
+                'namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, '
+                'expires_at REAL NOT NULL, PRIMARY KEY (namespace, key)) WITHOUT ROWID'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS ix_cache_entries_expiry '
+                'ON cache_entries (namespace, expires_at)'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache_generations ('
+                'key TEXT PRIMARY KEY, generation INTEGER NOT NULL, '
+                'expires_at REAL NOT NULL) WITHOUT ROWID'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS ix_cache_generations_expiry '
+                'ON cache_generations (expires_at)'
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def _fetch(self, key: str, generation_keys: Tuple[str, ...]) -> Tuple[Optional[bytes], tuple]:
+        row = self._connection().execute(
+            'SELECT value FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at > ?',
+            (self.namespace, key, self._clock())
+        ).fetchone()
+        if row is None:
+            return None, ()
+        return row[0], self._generations(generation_keys)
+
+    def _generations(self, generation_keys: Tuple[str, ...]) -> Tuple[int, ...]:
+        rows = dict(self._connection().execute(
+            f'SELECT key, generation FROM cache_generations WHERE key IN '
+            f'({", ".join("?" * len(generation_keys))}) AND expires_at > ?',
+            (*generation_keys, self._clock())
+        ))
+        return tuple(rows.get(key, 0) for key in generation_keys)
+
+    def _bump(self, generation_key: str) -> None:
+        connection = self._connection()
+        now = self._clock()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('DELETE FROM cache_generations WHERE expires_at <= ?', (now,))
+            connection.execute(
+                'INSERT INTO cache_generations (key, generation, expires_at) VALUES (?, 1, ?) '
+                'ON CONFLICT (key) DO UPDATE SET generation = generation + 1, '
+                'expires_at = excluded.expires_at',
+                (generation_key, now + self.generation_ttl)
+            )
+
+    def _store(self, key: str, payload: bytes) -> None:
+        connection = self._connection()
+        now = self._clock()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                'INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) '
+                'VALUES (?, ?, ?, ?)',
+                (self.namespace, key, payload, now + self.ttl)
+            )
+            expired = connection.execute(
+                'DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?',
+                (self.namespace, now)
+            ).rowcount
+            over = self._size() - self.max_size
+            if over > 0:
+                connection.execute(
+                    'DELETE FROM cache_entries WHERE namespace = ? AND key IN ('
+                    'SELECT key FROM cache_entries WHERE namespace = ? '
+                    'ORDER BY expires_at LIMIT ?)',
+                    (self.namespace, self.namespace, over)
+                )
+        with self._lock:
+            self.expirations += expired
+            self.evictions += max(over, 0)
+
+    def _remove(self, key: str) -> None:
+        self._connection().execute(
+            'DELETE FROM cache_entries WHERE namespace = ? AND key = ?', (self.namespace, key)
+        )
+
+    def _remove_all(self) -> None:
+        self._connection().execute('DELETE FROM cache_entries WHERE namespace = ?',
+                                   (self.namespace,))
+
+    def _size(self) -> int:
+        return self._connection().execute(
+            'SELECT count(*) FROM cache_entries WHERE namespace = ?', (self.namespace,)
+        ).fetchone()[0]
+
+
+class RedisConnection:
+    """Minimal client for the Redis wire protocol (RESP), one socket per instance"""
+
+    def __init__(self, host: str, port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, timeout: float = 1.0,
+                 backoff: float = 5.0, clock=time.monotonic):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        # Seconds to skip the server for after a connection failure
+        self.backoff = backoff
+        self._clock = clock
+        self._retry_at = None
+        self._socket: Optional[socket.socket] = None
+        self._reader = None
+
+    def execute(self, *args: Any) -> Any:
+        """
+        Send one command and return its reply; error replies raise RedisError.
+        Raises ConnectionError without trying the server while backing off.
+        """
+        if self._socket is None:
+            if self._retry_at is not None and self._clock() < self._retry_at:
+                raise ConnectionError(f'Redis at {self.host}:{self.port} is unavailable')
+            try:
+                self._connect()
+            except OSError:
+                self._retry_at = self._clock() + self.backoff
+                raise
+            self._retry_at = None
+        try:
+            self._socket.sendall(self._encode(args))
+            return self._read_reply()
+        except OSError:
+            # The connection state is unknown; reconnect on the next command
+            self.close()
+            raise
+
+    def _connect(self) -> None:
+        self._socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._reader = self._socket.makefile('rb')
+        try:
+            if self.password:
+                self.execute('AUTH', self.password)
+            if self.db:
+                self.execute('SELECT', self.db)
+        except (OSError, RedisError):
+            self.close()
+            raise
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError('Connection closed by the server')
+        prefix, rest = line[:1], line[1:-2]
+        if prefix == b'+':
+            return rest.decode('utf-8')
+        if prefix == b'-':
+            raise RedisError(rest.decode('utf-8'))
+        if prefix == b':':
+            return int(rest)
+        if prefix == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError('Connection closed by the server')
+            return data[:-2]
+        if prefix == b'*':
+            length = int(rest)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise RedisError(f'Unexpected reply: {line!r}')
+
+    def close(self) -> None:
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+        self._socket = None
+        self._reader = None
+
+
+class RedisCache(SharedCache):
+    """
+    Entries on a Redis server, expiring through Redis' own TTLs. max_size
+    only switches the cache on or off; the server's maxmemory policy bounds
+    its size.
+    """
+
+    prefix = 'cache:'
+
+    def __init__(self, url: str, namespace: str, max_size: int, ttl: float):
+        super().__init__(namespace, max_size, ttl)
+        parts = urlsplit(url)
+        self._options = {
+            'host': parts.hostname or 'localhost',
+            'port': parts.port or 6379,
+            'db': int(parts.path.strip('/') or 0),
+            'password': unquote(parts.password) if parts.password else None
+        }
+        self._local = threading.local()
+
+    def _redis(self) -> RedisConnection:
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.connection = RedisConnection(**self._options)
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def _fetch(self, key: str, generation_keys: Tuple[str, ...]) -> Tuple[Optional[bytes], tuple]:
+        payload, *generations = self._redis().execute('MGET', key, *generation_keys)
+        return payload, tuple(int(generation or 0) for generation in generations)
+
+    def _generations(self, generation_keys: Tuple[str, ...]) -> Tuple[int, ...]:
+        generations = self._redis().execute('MGET', *generation_keys)
+        return tuple(int(generation or 0) for generation in generations)
+
+    def _bump(self, generation_key: str) -> None:
+        self._redis().execute('INCR', generation_key)
+        self._redis().execute('PEXPIRE', generation_key, max(int(self.generation_ttl * 1000), 1))
+
+    def _store(self, key: str, payload: bytes) -> None:
+        self._redis().execute('SET', key, payload, 'PX', max(int(self.ttl * 1000), 1))
+
+    def _remove(self, key: str) -> None:
+        self._redis().execute('DEL', key)
+
+    def _keys(self) -> List[bytes]:
+        keys, cursor = [], b'0'
+        while True:
+            cursor, batch = self._redis().execute(
+                'SCAN', cursor, 'MATCH', f'{self.prefix}{self.namespace}:*', 'COUNT', 500
+            )
+            keys.extend(batch)
+            if cursor in (b'0', '0'):
+                return keys
+
+    def _remove_all(self) -> None:
+        keys = self._keys()
+        for start in range(0, len(keys), 500):
+            self._redis().execute('DEL', *keys[start:start + 500])
+
+    def _size(self) -> int:
+        return len(self._keys())
+
+
+def create_cache(backend: str, namespace: str, max_size: int, ttl: float):
+    """A cache for `namespace` on the backend named by a CACHE_BACKEND value"""
+    if not backend or backend == 'memory':
+        return LRUCache(max_size, ttl)
+    if backend.startswith('sqlite:///'):
+        return SQLiteCache(backend[len('sqlite:///'):], namespace, max_size, ttl)
+    if backend.startswith('redis://'):
+        return RedisCache(backend, namespace, max_size, ttl)
+    raise ValueError(f'Unknown cache backend: {backend}')
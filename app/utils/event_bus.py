@@ -0,0 +1,171 @@
+"""
+Cross-worker event fan-out for the Server-Sent Events stream
+
+Each gunicorn worker with at least one connected SSE client binds a Unix
+datagram socket in a shared directory. publish() delivers an event to the
+local subscribers directly and sends one datagram to every other bound
+socket; a listener thread in each receiving worker hands it on to that
+worker's subscribers. Workers with no clients bind nothing, so publishing
+costs them nothing. Where Unix sockets are unavailable, events only reach
+clients of the publishing worker.
+
+Workers also use the bus among themselves: notify() sends an internal event
+to handlers registered with on() in the other workers, such as the entity
+cache dropping entries another worker has evicted. Internal events never
+reach SSE clients, and registering a handler binds the worker's socket.
+"""
+import json
+import os
+import queue
+import socket
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from flask import current_app
+
+EXTENSION_KEY = 'event_bus'
+MAX_DATAGRAM = 64 * 1024
+
+
+class EventBus:
+    def __init__(self, directory: str, queue_size: int = 100):
+        self.directory = directory
+        self.queue_size = queue_size
+        self._subscribers: Set[queue.Queue] = set()
+        self._handlers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+        self._lock = threading.Lock()
+        self._socket: Optional[socket.socket] = None
+        self._path: Optional[str] = None
+        self._pid: Optional[int] = None
+
+    def subscribe(self) -> queue.Queue:
+        """Queue receiving every event published from now on, in any worker"""
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._ensure_listener()
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def on(self, event_type: str, handler: Callable[[Dict[str, Any]], None]) -> None:
+        """Call handler(data) for each internal event of `event_type` from another worker"""
+        with self._lock:
+            self._ensure_listener()
+            self._handlers.setdefault(event_type, []).append(handler)
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> None:
+        event = {'type': event_type, 'data': data}
+        self._deliver(event)
+        self._send(event)
+
+    def notify(self, event_type: str, data: Dict[str, Any]) -> None:
+        """Send an internal event to the other workers' handlers"""
+        self._send({'type': event_type, 'data': data, 'internal': True})
+
+    def _send(self, event: Dict[str, Any]) -> None:
+        """Send an event to every other bound worker"""
+        if not hasattr(socket, 'AF_UNIX') or not os.path.isdir(self.directory):
+            return
+        payload = json.dumps(event, default=str).encode('utf-8')
+        if len(payload) > MAX_DATAGRAM:
+            return
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            sender.setblocking(False)
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if not name.endswith('.sock') or (path == self._path and self._pid == os.getpid()):
+                    continue
+                try:
+                    sender.sendto(payload, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # The worker that bound it has exited
+                    _unlink(path)
+                except OSError:
+                    # Full receive buffer or similar; events are best-effort
+                    pass
+        finally:
+            sender.close()
+
+    def _deliver(self, event: Dict[str, Any]) -> None:
+        if event.get('internal'):
+            for handler in list(self._handlers.get(event['type'], ())):
+                try:
+                    handler(event['data'])
+                except Exception:
+                    # One failing handler must not stop the listener thread
+                    pass
+            return
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # Slow client; it misses this event rather than stalling others
+                pass
+
+    def _ensure_listener(self) -> None:
+        if self._pid == os.getpid() or not hasattr(socket, 'AF_UNIX'):
+            return
+        # First subscriber in this process (or first since a fork)
+        self._subscribers = set()
+        os.makedirs(self.directory, exist_ok=True)
+        self._path = os.path.join(self.directory, f'{os.getpid()}.sock')
+        _unlink(self._path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(self._path)
+        self._pid = os.getpid()
+        threading.Thread(target=self._listen, args=(self._socket,), daemon=True).start()
+
+    def _listen(self, sock: socket.socket) -> None:
+        sock.settimeout(1.0)
+        while sock is self._socket:
+            try:
+                payload = sock.recv(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            try:
+                self._deliver(json.loads(payload))
+            except ValueError:
+                continue
+
+    def close(self) -> None:
+        """Stop receiving and remove this worker's socket"""
+        if self._socket is not None and self._pid == os.getpid():
+            self._socket.close()
+            _unlink(self._path)
+        self._socket = None
+        self._pid = None
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def get_event_bus() -> EventBus:
+    """The current app's EventBus, created on first use"""
+    bus = current_app.extensions.get(EXTENSION_KEY)
+    if bus is None:
+        bus = current_app.extensions.setdefault(EXTENSION_KEY, EventBus(
+            current_app.config['EVENTS_SOCKET_DIR'],
+            queue_size=current_app.config.get('EVENTS_QUEUE_SIZE', 100)
+        ))
+    return bus
+
+
+def publish(event_type: str, data: Dict[str, Any]) -> None:
+    """Publish an event to every connected SSE client; never raises"""
+    try:
+        get_event_bus().publish(event_type, data)
+    except Exception as e:
+        current_app.logger.error(f"Error publishing {event_type} event: {str(e)}")
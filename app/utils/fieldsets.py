@@ -0,0 +1,42 @@
+"""
+Sparse fieldset helpers for the `fields=` query parameter
+"""
+
+
+def parse_fields(value, allowed, nested=None):
+    """
+    Parse 'a,b,user.c' into {'': ['a', 'b'], 'user': ['c']}
+    `allowed` lists the top-level fields, `nested` maps a prefix to the fields
+    allowed under it. Raises ValueError on unknown fields.
+    Returns None when no fieldset was requested.
+    """
+    if not value:
+        return None
+    nested = nested or {}
+    fieldset = {'': []}
+    for name in (part.strip() for part in value.split(',')):
+        if not name:
+            continue
+        prefix, _, field = name.rpartition('.')
+        options = nested.get(prefix) if prefix else allowed
+        if options is None or field not in options:
+            raise ValueError(f'Unknown field: {name}')
+        fields = fieldset.setdefault(prefix, [])
+        if field not in fields:
+            fields.append(field)
+    if not any(fieldset.values()):
+        return None
+    return fieldset
+
+
+def partial_dict(instance, fields):
+    """Serialize only the given attributes, formatting dates as ISO strings"""
+    result = {}
+    for field in fields:
+        value = getattr(instance, field)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        elif hasattr(value, 'to_dict'):
+            value = value.to_dict()
+        result[field] = value
+    return result
@@ -0,0 +1,195 @@
+"""
+Phonetic keys and edit-distance lookup for typo-tolerant name matching
+"""
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+
+def _letters(word):
+    decomposed = unicodedata.normalize('NFKD', word or '')
+    return ''.join(ch for ch in decomposed if 'A' <= ch.upper() <= 'Z').upper()
+
+
+def metaphone(word, max_length=8):
+    """
+    Original Lawrence Philips Metaphone key, e.g. metaphone('Knight') == 'NT'
+    """
+    word = _letters(word)
+    if not word:
+        return ''
+
+    # Initial letter exceptions
+    for prefix, replacement in (('AE', 'E'), ('GN', 'N'), ('KN', 'N'), ('PN', 'N'), ('WR', 'R')):
+        if word.startswith(prefix):
+            word = replacement + word[2:]
+            break
+    if word[0] == 'X':
+        word = 'S' + word[1:]
+    elif word.startswith('WH'):
+        word = 'W' + word[2:]
+
+    vowels = 'AEIOU'
+    length = len(word)
+    result = []
+
+    def at(i):
+        return word[i] if 0 <= i < length else ''
+
+    i = 0
+    while i < length and len(result) < max_length:
+        c = word[i]
+        prev, nxt, nxt2 = at(i - 1), at(i + 1), at(i + 2)
+
+        if c == prev and c != 'C':
+            i += 1
+            continue
+
+        if c in vowels:
+            if i == 0:
+                result.append(c)
+        elif c == 'B':
+            if not (prev == 'M' and i == length - 1):
+                result.append('B')
+        elif c == 'C':
+            if nxt == 'I' and nxt2 == 'A':
+                result.append('X')
+            elif nxt == 'H':
+                result.append('K' if prev == 'S' or nxt2 == 'R' else 'X')
+                i += 1
+            elif nxt in 'IEY' and nxt:
+                if prev != 'S':
+                    result.append('S')
+            else:
+                result.append('K')
+        elif c == 'D':
+            if nxt == 'G' and nxt2 in 'EIY' and nxt2:
+                result.append('J')
+                i += 2
+            else:
+                result.append('T')
+        elif c == 'G':
+            if nxt == 'H' and nxt2 and nxt2 not in vowels:
+                pass
+            elif nxt == 'N' and (i + 1 == length - 1 or word[i + 1:] == 'NED'):
+                pass
+            elif nxt in 'IEY' and nxt and prev != 'G':
+                result.append('J')
+            else:
+                result.append('K')
+        elif c == 'H':
+            if nxt in vowels and nxt and prev not in 'CSPTG':
+                result.append('H')
+        elif c == 'K':
+            if prev != 'C':
+                result.append('K')
+        elif c == 'P':
+            if nxt == 'H':
+                result.append('F')
+                i += 1
+            else:
+                result.append('P')
+        elif c == 'Q':
+            result.append('K')
+        elif c == 'S':
+            if nxt == 'H':
+                result.append('X')
+                i += 1
+            elif nxt == 'I' and nxt2 in 'OA' and nxt2:
+                result.append('X')
+            else:
+                result.append('S')
+        elif c == 'T':
+            if nxt == 'I' and nxt2 in 'OA' and nxt2:
+                result.append('X')
+            elif nxt == 'H':
+                result.append('0')
+                i += 1
+            elif not (nxt == 'C' and nxt2 == 'H'):
+                result.append('T')
+        elif c == 'V':
+            result.append('F')
+        elif c in 'WY':
+            if nxt in vowels and nxt:
+                result.append(c)
+        elif c == 'X':
+            result.append('KS')
+        elif c == 'Z':
+            result.append('S')
+        else:
+            # F, J, L, M, N, R
+            result.append(c)
+        i += 1
+
+    return ''.join(result)[:max_length]
+
+
+def levenshtein(a, b):
+    """Edit distance between two strings"""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb)
+            ))
+        previous = current
+    return previous[-1]
+
+
+def max_typos(word):
+    """Edit distance tolerated for a query word of this length"""
+    return 0 if len(word) <= 2 else 1 if len(word) <= 5 else 2
+
+
+class BKTree:
+    """Burkhard-Keller tree of words under Levenshtein distance"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._root: Optional[Tuple[str, Dict[int, tuple]]] = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, word):
+        if not word:
+            return
+        with self._lock:
+            if self._root is None:
+                self._root = (word, {})
+                self._size = 1
+                return
+            node = self._root
+            while True:
+                distance = levenshtein(word, node[0])
+                if distance == 0:
+                    return
+                child = node[1].get(distance)
+                if child is None:
+                    node[1][distance] = (word, {})
+                    self._size += 1
+                    return
+                node = child
+
+    def search(self, word, max_distance) -> List[Tuple[int, str]]:
+        """(distance, word) pairs within max_distance of word, closest first"""
+        if self._root is None or not word:
+            return []
+        results = []
+        stack = [self._root]
+        while stack:
+            candidate, children = stack.pop()
+            distance = levenshtein(word, candidate)
+            if distance <= max_distance:
+                results.append((distance, candidate))
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(child for d, child in children.items() if low <= d <= high)
+        return sorted(results)
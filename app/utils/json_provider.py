@@ -0,0 +1,110 @@
+"""
+JSON provider used by jsonify and current_app.json
+
+Encodes with orjson when it is installed and falls back to the standard
+library otherwise. Dates and datetimes are written as ISO 8601 strings (Flask's
+default provider writes HTTP dates), and any object with a `to_dict()` method,
+such as a StudentRecord, is encoded through it, so services can hand records
+with raw date values straight to jsonify.
+
+A RawJSON value at the top level of a response dict is written out verbatim,
+which lets JSON assembled by the database pass through without parsing.
+
+Responses are packed as MessagePack instead when the request prefers it
+(see app.utils.msgpack_codec); the document is the same either way.
+"""
+import json
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider, _default as _flask_default
+
+from app.utils import msgpack_codec
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is absent
+    orjson = None
+
+
+class RawJSON(str):
+    """Already-encoded JSON text, spliced in as-is when a top-level dict value"""
+    __slots__ = ()
+
+
+def _has_raw(obj) -> bool:
+    return isinstance(obj, dict) and any(isinstance(value, RawJSON) for value in obj.values())
+
+
+def _default(o):
+    if isinstance(o, date):
+        return o.isoformat()
+    if hasattr(o, 'to_dict'):
+        return o.to_dict()
+    return _flask_default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    default = staticmethod(_default)
+    # Keep model field order; sorting every dict costs time on large lists
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs) -> str:
+        if _has_raw(obj):
+            return self._splice(obj)
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        return self._orjson_dumps(obj, kwargs.get('indent')).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if msgpack_codec.wants_msgpack():
+            response = self._msgpack_response(obj)
+        elif _has_raw(obj):
+            response = self._app.response_class(self._splice(obj) + '\n', mimetype=self.mimetype)
+        elif orjson is None:
+            response = super().response(obj)
+        else:
+            pretty = self.compact is False or (self.compact is None and self._app.debug)
+            indent = 2 if pretty else None
+            response = self._app.response_class(
+                self._orjson_dumps(obj, indent) + b'\n', mimetype=self.mimetype
+            )
+        if msgpack_codec.available():
+            response.vary.add('Accept')
+        return response
+
+    def _msgpack_response(self, obj):
+        if _has_raw(obj):
+            obj = {
+                key: self.loads(value) if isinstance(value, RawJSON) else value
+                for key, value in obj.items()
+            }
+        return self._app.response_class(
+            msgpack_codec.packb(obj, default=self.default),
+            mimetype=msgpack_codec.MSGPACK_MIMETYPE
+        )
+
+    def _splice(self, obj: dict) -> str:
+        """Encode a dict compactly, copying RawJSON values through untouched"""
+        parts = []
+        for key, value in obj.items():
+            encoded = value if isinstance(value, RawJSON) else self.dumps(value)
+            parts.append(f'{self.dumps(str(key))}:{encoded}')
+        return '{' + ','.join(parts) + '}'
+
+    def _orjson_dumps(self, obj, indent=None) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=self.default, option=option)
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits; let the standard encoder try
+            return json.dumps(obj, default=self.default).encode('utf-8')
@@ -0,0 +1,59 @@
+"""
+MessagePack encoding for API responses
+
+Clients that send `Accept: application/msgpack` get the same documents as
+the JSON API, packed as MessagePack. Datetimes use the standard timestamp
+extension type (-1, naive values are UTC); dates use extension type 1 holding
+the ISO date string. `unpackb` decodes both back to datetime and date.
+"""
+from datetime import date, datetime, timezone
+
+from flask import has_request_context, request
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - exercised when msgpack is absent
+    msgpack = None
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, 'application/x-msgpack')
+DATE_EXT_TYPE = 1
+
+
+def available() -> bool:
+    return msgpack is not None
+
+
+def wants_msgpack() -> bool:
+    """Whether the current request prefers MessagePack over JSON"""
+    if msgpack is None or not has_request_context():
+        return False
+    accept = request.accept_mimetypes
+    best = accept.best_match(('application/json',) + MSGPACK_MIMETYPES)
+    return best in MSGPACK_MIMETYPES and accept[best] > accept['application/json']
+
+
+def packb(obj, default=None) -> bytes:
+    """Pack `obj`; `default` handles objects MessagePack has no type for"""
+    def encode(o):
+        if isinstance(o, datetime):
+            # Aware datetimes are packed as timestamps by msgpack's C packer
+            return o.replace(tzinfo=timezone.utc)
+        if isinstance(o, date):
+            return msgpack.ExtType(DATE_EXT_TYPE, o.isoformat().encode('ascii'))
+        if default is not None:
+            return default(o)
+        raise TypeError(f'Object of type {type(o).__name__} is not MessagePack serializable')
+
+    return msgpack.packb(obj, default=encode, datetime=True)
+
+
+def _ext_hook(code, data):
+    if code == DATE_EXT_TYPE:
+        return date.fromisoformat(data.decode('ascii'))
+    return msgpack.ExtType(code, data)
+
+
+def unpackb(data: bytes):
+    """Unpack a response body, restoring dates and (UTC) datetimes"""
+    return msgpack.unpackb(data, ext_hook=_ext_hook, timestamp=3)
@@ -0,0 +1,78 @@
+"""
+Keyset pagination helpers
+"""
+import base64
+import json
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    """
+    Decode a cursor produced by encode_cursor
+    Raises ValueError if the cursor is malformed or has the wrong arity
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError('Invalid cursor')
+
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError('Invalid cursor')
+
+    return values
+
+
+def parse_limit(value, default, maximum):
+    """Parse a page size query parameter, clamped to [1, maximum]"""
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be a positive integer')
+    return min(limit, maximum)
+
+
+def parse_ids(value, maximum):
+    """
+    Parse ids from '1,2,3' or a list, keeping request order and dropping
+    repeats. Raises ValueError on non-integers or more than `maximum` ids.
+    """
+    if isinstance(value, str):
+        value = [part for part in (p.strip() for p in value.split(',')) if part]
+    if not isinstance(value, (list, tuple)) or not value:
+        raise ValueError('ids must be a non-empty list of integers')
+    ids = []
+    for v in value:
+        if isinstance(v, (bool, float)):
+            raise ValueError('ids must be integers')
+        try:
+            ids.append(int(v))
+        except (TypeError, ValueError):
+            raise ValueError('ids must be integers')
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > maximum:
+        raise ValueError(f'At most {maximum} ids may be requested at once')
+    return ids
+
+
+def parse_sort(value, allowed, default):
+    """
+    Parse a `sort=` parameter: one of `allowed`, optionally prefixed with '-'
+    for descending order. Returns (key, descending); raises ValueError.
+    """
+    if value is None or value == '':
+        return default, False
+    descending = value.startswith('-')
+    key = value[1:] if descending else value
+    if key not in allowed:
+        raise ValueError(f"sort must be one of {', '.join(allowed)}, optionally prefixed with '-'")
+    return key, descending
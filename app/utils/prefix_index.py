@@ -0,0 +1,137 @@
+"""
+In-memory prefix index over normalized strings
+"""
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+def normalize(value):
+    """Casefold and strip accents so 'Élodie' and 'elodie' share a prefix"""
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(value))
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.casefold().split())
+
+
+class PrefixIndex:
+    """
+    Sorted array of (key, id) pairs answered with bisect
+
+    Each id carries a payload and any number of keys. Lookups return payloads
+    whose keys start with the query, in key order, without scanning
+    non-matching entries. Writes are O(n) memmoves, which is cheap next to the
+    database round trip they replace.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys: List[Tuple[str, Hashable]] = []
+        self._entries: Dict[Hashable, Tuple[Any, List[str]]] = {}
+        # time.monotonic() of the last load(), None until then
+        self.loaded_at = None
+        # put/remove calls made since start_reload(), replayed by load()
+        self._journal: Optional[List[Tuple[str, tuple]]] = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def reloading(self) -> bool:
+        return self._journal is not None
+
+    def start_reload(self) -> bool:
+        """
+        Record put/remove calls until the next load(), which replays them on
+        top of the new items, so changes made while those items are read are
+        not lost. Call it before reading the items. Returns False if a reload
+        is already in progress.
+        """
+        with self._lock:
+            if self._journal is not None:
+                return False
+            self._journal = []
+            return True
+
+    def cancel_reload(self):
+        with self._lock:
+            self._journal = None
+
+    def load(self, items: Iterable[Tuple[Hashable, Any, Iterable[str]]]):
+        """Replace the whole index with (id, payload, keys) items"""
+        entries = {}
+        pairs = []
+        for item_id, payload, keys in items:
+            keys = sorted({normalize(key) for key in keys if key})
+            entries[item_id] = (payload, keys)
+            pairs.extend((key, item_id) for key in keys)
+        pairs.sort()
+        with self._lock:
+            self._entries = entries
+            self._keys = pairs
+            for operation, arguments in self._journal or ():
+                getattr(self, operation)(*arguments)
+            self._journal = None
+            self.loaded_at = time.monotonic()
+
+    def put(self, item_id: Hashable, payload: Any, keys: Iterable[str]):
+        """Add or replace one entry"""
+        keys = sorted({normalize(key) for key in keys if key})
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(('_put', (item_id, payload, keys)))
+            self._put(item_id, payload, keys)
+
+    def remove(self, item_id: Hashable):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(('_discard', (item_id,)))
+            self._discard(item_id)
+
+    def _put(self, item_id, payload, keys):
+        self._discard(item_id)
+        self._entries[item_id] = (payload, keys)
+        for key in keys:
+            insort(self._keys, (key, item_id))
+
+    def _discard(self, item_id):
+        entry = self._entries.pop(item_id, None)
+        if not entry:
+            return
+        for key in entry[1]:
+            position = bisect_left(self._keys, (key, item_id))
+            if position < len(self._keys) and self._keys[position] == (key, item_id):
+                del self._keys[position]
+
+    def search(self, query: str, limit: int = 10) -> List[Any]:
+        """
+        Payloads with a key starting with the first word of the query and
+        every further word prefixing one of their keys' words
+        """
+        words = normalize(query).split()
+        if not words or limit < 1:
+            return []
+        head, rest = ' '.join(words), words[1:]
+
+        results, seen = [], set()
+        with self._lock:
+            keys = self._keys
+            position = bisect_left(keys, (words[0],))
+            while position < len(keys) and len(results) < limit:
+                key, item_id = keys[position]
+                position += 1
+                if not key.startswith(words[0]):
+                    break
+                if item_id in seen:
+                    continue
+                payload, item_keys = self._entries[item_id]
+                if not key.startswith(head) and rest:
+                    item_words = {word for k in item_keys for word in k.split()}
+                    if not all(any(w.startswith(word) for w in item_words) for word in rest):
+                        continue
+                seen.add(item_id)
+                results.append(payload)
+        return results
@@ -0,0 +1,87 @@
+"""
+Streaming readers for student roster files
+
+CSV and XLSX rosters are read one row at a time, so memory use does not
+depend on the size of the file. The first row holds the column names;
+they are matched case-insensitively, with spaces and hyphens read as
+underscores. Every value comes back as a stripped string, with empty
+cells as ''.
+"""
+import csv
+import os
+import re
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+ROSTER_EXTENSIONS = ('.csv', '.xlsx')
+
+
+def roster_format(filename: str) -> str:
+    """'csv' or 'xlsx' from the file name; raises ValueError for anything else"""
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension not in ROSTER_EXTENSIONS:
+        raise ValueError(f"Unsupported file type. Use one of: {', '.join(ROSTER_EXTENSIONS)}")
+    return extension[1:]
+
+
+def column_name(header: Any) -> str:
+    return re.sub(r'[\s\-]+', '_', str(header or '').strip().lower())
+
+
+def cell_text(value: Any) -> str:
+    """A spreadsheet cell as text; dates as YYYY-MM-DD and whole numbers without '.0'"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def read_roster(path: str, filename: str = None,
+                required: Iterable[str] = ()) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """
+    Yield (line number, row) for each non-blank data row of a CSV or XLSX
+    file. Line numbers count the header as line 1, as spreadsheets do.
+    The format comes from `filename`, or from `path` if not given. Raises
+    ValueError if the file is empty or lacks a `required` column.
+    """
+    if roster_format(filename or path) == 'xlsx':
+        rows = _xlsx_rows(path)
+    else:
+        rows = _csv_rows(path)
+
+    header = next(rows, None)
+    if header is None:
+        raise ValueError('The file is empty')
+    columns = [column_name(name) for name in header]
+    missing = [column for column in required if column not in columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    for line, values in enumerate(rows, start=2):
+        row = {column: cell_text(value) for column, value in zip(columns, values) if column}
+        if any(row.values()):
+            yield line, row
+
+
+def _csv_rows(path: str) -> Iterator[list]:
+    # utf-8-sig drops the byte order mark Excel puts at the start of CSV exports
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        yield from csv.reader(f)
+
+
+def _xlsx_rows(path: str) -> Iterator[tuple]:
+    try:
+        import openpyxl
+    except ImportError:
+        raise ValueError('XLSX import needs openpyxl; upload a CSV file instead')
+
+    # read_only streams the sheet XML instead of building the whole workbook
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
@@ -0,0 +1,89 @@
+"""
+Precompiled row serializers
+
+`to_dict` style serialization re-evaluates the same branches for every row.
+For list endpoints the shape of each row is fixed by the fieldset, so a
+serializer is generated once per (model, fieldset) as a single dict literal
+and cached; each row then costs one function call.
+"""
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+FieldsetKey = Optional[Tuple[Tuple[str, Tuple[str, ...]], ...]]
+
+
+def fieldset_key(fieldset: Optional[Dict[str, List[str]]]) -> FieldsetKey:
+    """Hashable form of a parse_fields() result, for caching"""
+    if fieldset is None:
+        return None
+    return tuple((prefix, tuple(fields)) for prefix, fields in fieldset.items())
+
+
+def _value(attr: str, is_date: bool, iso: bool) -> str:
+    if is_date and iso:
+        return f"(r.{attr}.isoformat() if r.{attr} is not None else None)"
+    return f"r.{attr}"
+
+
+def compile_serializer(name: str, layout: List[Tuple[str, object]], dates, iso: bool) -> Callable:
+    """
+    Build `serialize(r)` returning a dict literal described by `layout`, a list
+    of (key, attribute) pairs where attribute is either an attribute name or a
+    nested (guard_attribute, layout) tuple; a nested dict becomes None when its
+    guard attribute is None, and is always emitted when the guard is None.
+    Attributes in `dates` are converted with isoformat() when `iso`.
+    """
+    def render(items):
+        parts = []
+        for key, attr in items:
+            if isinstance(attr, tuple):
+                guard, nested = attr
+                if guard is None:
+                    parts.append(f"{key!r}: {render(nested)}")
+                else:
+                    parts.append(f"{key!r}: ({render(nested)} if r.{guard} is not None else None)")
+            else:
+                parts.append(f"{key!r}: {_value(attr, attr in dates, iso)}")
+        return '{' + ', '.join(parts) + '}'
+
+    source = f"def {name}(r):\n    return {render(layout)}\n"
+    namespace = {}
+    exec(compile(source, f'<serializer {name}>', 'exec'), namespace)
+    return namespace[name]
+
+
+def student_record_layout(key: FieldsetKey = None) -> List[Tuple[str, object]]:
+    """
+    compile_serializer() layout for StudentRecord rows: the Student.to_dict()
+    shape (nested user and role), or just the fields in the fieldset key
+    """
+    from app.repositories.records import ROLE_LAYOUT, STUDENT_FIELD_ATTRS, USER_FIELD_ATTRS
+
+    role = ('role_id', ROLE_LAYOUT)
+    if key is None:
+        user = [(field, attr) for field, attr in USER_FIELD_ATTRS.items()] + [('role', role)]
+        layout = [(field, attr) for field, attr in STUDENT_FIELD_ATTRS.items()]
+        layout.append(('user', (None, user)))
+        return layout
+
+    fieldset = dict(key)
+    layout = [(field, STUDENT_FIELD_ATTRS[field]) for field in fieldset.get('', ())]
+    if fieldset.get('user'):
+        user = [
+            (field, role if field == 'role' else USER_FIELD_ATTRS[field])
+            for field in fieldset['user']
+        ]
+        layout.append(('user', (None, user)))
+    return layout
+
+
+@lru_cache(maxsize=128)
+def student_record_serializer(key: FieldsetKey = None, iso: bool = True) -> Callable:
+    """
+    Serializer for StudentRecord rows following student_record_layout(key).
+    With iso=False, dates are left as date objects for the JSON provider.
+    """
+    from app.repositories.records import DATE_ATTRS
+
+    return compile_serializer('serialize_student_record', student_record_layout(key),
+                              DATE_ATTRS, iso)
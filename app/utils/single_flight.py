@@ -0,0 +1,125 @@
+"""
+Request coalescing for identical concurrent reads
+
+When a read is already running with the same arguments, later callers in
+the same worker wait for its result instead of running it again. Calls are
+keyed by method, arguments and the outbox heads of the tables the method
+reads, so a caller never joins a computation that started before its own
+committed write. Results are shared between callers and must not be mutated.
+"""
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from flask import current_app, has_app_context
+
+from app.config.database import db
+from app.utils.etags import data_version
+
+EXTENSION_KEY = 'single_flight'
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    def __init__(self, timeout: float = 30):
+        # How long a caller waits for another's result before running its own
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[str, Hashable], _Call] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def do(self, name: str, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Result of fn(), shared with any concurrent call with the same name and key"""
+        with self._lock:
+            call = self._calls.get((name, key))
+            leader = call is None
+            if leader:
+                call = self._calls[(name, key)] = _Call()
+            self._count(name, 'calls')
+
+        if not leader:
+            if call.done.wait(self.timeout):
+                with self._lock:
+                    self._count(name, 'coalesced')
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            with self._lock:
+                self._count(name, 'timeouts')
+            return fn()
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._count(name, 'executions')
+                del self._calls[(name, key)]
+            call.done.set()
+
+    def _count(self, name: str, counter: str) -> None:
+        counters = self._counters.setdefault(
+            name, {'calls': 0, 'executions': 0, 'coalesced': 0, 'timeouts': 0}
+        )
+        counters[counter] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'methods': {name: dict(counters) for name, counters in self._counters.items()}
+            }
+
+
+def get_single_flight() -> SingleFlight:
+    """The current app's SingleFlight, created on first use"""
+    flight = current_app.extensions.get(EXTENSION_KEY)
+    if flight is None:
+        flight = current_app.extensions.setdefault(EXTENSION_KEY, SingleFlight(
+            timeout=current_app.config.get('SINGLE_FLIGHT_TIMEOUT', 30)
+        ))
+    return flight
+
+
+def _call_key(args: tuple, kwargs: Dict[str, Any]) -> Optional[Hashable]:
+    key = (args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def coalesce(entities: Tuple[str, ...]):
+    """
+    Decorator for read methods of services and repositories: concurrent
+    calls with equal arguments share one execution. `entities` names the
+    outbox entities whose tables the method reads. Calls with unhashable
+    arguments, outside an app context or inside an uncommitted write run
+    on their own.
+    """
+    def decorator(f):
+        name = f.__qualname__
+
+        @wraps(f)
+        def decorated_function(self, *args, **kwargs):
+            key = _call_key(args, kwargs)
+            if key is None or not has_app_context() or db.session.info.get('outbox_written'):
+                return f(self, *args, **kwargs)
+
+            return get_single_flight().do(
+                name, (data_version(entities), key), lambda: f(self, *args, **kwargs)
+            )
+        return decorated_function
+    return decorator
@@ -9,6 +9,8 @@ let currentUser = null;
 let accessToken = null;
 let allStudents = [];
 let studentModal = null;
+let eventSource = null;
+let liveRefreshTimer = null;
 
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', function() {
@@ -102,6 +104,7 @@ function logout() {
         localStorage.removeItem('currentUser');
         accessToken = null;
         currentUser = null;
+        disconnectLiveUpdates();
         
         document.getElementById('mainNav').style.display = 'none';
         document.getElementById('dashboardPage').style.display = 'none';
@@ -123,9 +126,46 @@ function showMainApp() {
         document.getElementById('addStudentBtn').style.display = 'block';
     }
     
+    connectLiveUpdates();
     showDashboard();
 }
 
+// Live updates: the server pushes change events, and the visible page is
+// reloaded once per burst of events instead of being polled
+function connectLiveUpdates() {
+    const role = currentUser.role ? currentUser.role.name : null;
+    if (isDemoMode || eventSource || !window.EventSource || !['admin', 'teacher'].includes(role)) {
+        return;
+    }
+    
+    // EventSource cannot send headers, so the token goes in the query string
+    eventSource = new EventSource(`${API_BASE_URL}/events?jwt=${encodeURIComponent(accessToken)}`);
+    ['student.created', 'student.bulk_created', 'student.import_progress', 'student.updated',
+     'student.deleted', 'user.activated', 'user.deactivated']
+        .forEach(type => eventSource.addEventListener(type, scheduleLiveRefresh));
+}
+
+function disconnectLiveUpdates() {
+    if (eventSource) {
+        eventSource.close();
+        eventSource = null;
+    }
+    clearTimeout(liveRefreshTimer);
+}
+
+function scheduleLiveRefresh() {
+    clearTimeout(liveRefreshTimer);
+    liveRefreshTimer = setTimeout(() => {
+        if (document.getElementById('dashboardPage').style.display === 'block') {
+            loadDashboardData();
+        } else if (document.getElementById('studentsPage').style.display === 'block') {
+            loadStudents();
+        } else if (document.getElementById('usersPage').style.display === 'block') {
+            loadUsers();
+        }
+    }, 500);
+}
+
 // Page Navigation
 function hideAllPages() {
     document.getElementById('dashboardPage').style.display = 'none';
@@ -175,13 +215,7 @@ async function loadDashboardData() {
                 usersData = await window.DEMO_API.getUsers();
             }
         } else {
-            const studentsResponse = await fetch(`${API_BASE_URL}/students`, {
-                headers: { 'Authorization': `Bearer ${accessToken}` }
-            });
-            
-            if (studentsResponse.ok) {
-                studentsData = await studentsResponse.json();
-            }
+            studentsData = await fetchAllStudents();
             
             if (currentUser.role && currentUser.role.name === 'admin') {
                 const usersResponse = await fetch(`${API_BASE_URL}/admin/users`, {
@@ -243,6 +277,29 @@ function displayRecentStudents(students) {
 }
 
 // Students Functions
+async function fetchAllStudents() {
+    // The list endpoint is paginated; follow next_cursor until exhausted
+    const students = [];
+    let cursor = null;
+    
+    do {
+        const url = `${API_BASE_URL}/students?limit=1000` + (cursor ? `&cursor=${encodeURIComponent(cursor)}` : '');
+        const response = await fetch(url, {
+            headers: { 'Authorization': `Bearer ${accessToken}` }
+        });
+        
+        if (!response.ok) {
+            throw new Error('Failed to load students');
+        }
+        
+        const page = await response.json();
+        students.push(...(page.students || []));
+        cursor = page.next_cursor;
+    } while (cursor);
+    
+    return { status: 'success', count: students.length, students };
+}
+
 async function loadStudents() {
     try {
         let data;
@@ -250,17 +307,7 @@ async function loadStudents() {
         if (isDemoMode) {
             data = await window.DEMO_API.getStudents();
         } else {
-            const response = await fetch(`${API_BASE_URL}/students`, {
-                headers: {
-                    'Authorization': `Bearer ${accessToken}`
-                }
-            });
-            
-            if (!response.ok) {
-                throw new Error('Failed to load students');
-            }
-            
-            data = await response.json();
+            data = await fetchAllStudents();
         }
         
         allStudents = data.students || [];
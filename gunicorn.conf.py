@@ -0,0 +1,44 @@
+"""
+Gunicorn settings, loaded automatically from the working directory
+
+Threaded workers let long-lived Server-Sent Events connections
+(/api/events) hold a thread rather than a whole worker process.
+Command-line flags such as -w and -b still override these values.
+"""
+import os
+import shutil
+
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 32))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+
+
+def on_starting(server):
+    # Sockets left behind by a previous run would only collect dropped events
+    from app.config.settings import Config
+    shutil.rmtree(Config.EVENTS_SOCKET_DIR, ignore_errors=True)
+
+
+def post_worker_init(worker):
+    # Load the in-memory indexes now rather than in the first request that needs them
+    from app.config.database import db
+    from app.repositories.name_index import get_name_tree
+    from app.services.suggest_service import StudentSuggestService
+    app = worker.wsgi
+    with app.app_context():
+        for load in (StudentSuggestService().get_index, get_name_tree):
+            try:
+                load()
+            except Exception as e:
+                app.logger.error(f"Error loading {load.__qualname__}: {str(e)}")
+                db.session.rollback()
+        db.session.remove()
+
+
+def worker_exit(server, worker):
+    from app.utils.event_bus import EXTENSION_KEY
+    app = getattr(worker, 'wsgi', None)
+    bus = getattr(app, 'extensions', {}).get(EXTENSION_KEY) if app else None
+    if bus is not None:
+        bus.close()
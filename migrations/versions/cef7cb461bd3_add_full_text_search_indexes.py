@@ -0,0 +1,35 @@
+"""Add full-text search indexes
+
+The student_search and user_search indexes: FTS5 tables on SQLite,
+tsvector tables with a GIN index on PostgreSQL, nothing on other
+databases. Existing students and users are indexed as part of the upgrade.
+The indexes are not models, so the DDL comes from app.repositories.search_index.
+
+Revision ID: cef7cb461bd3
+Revises: 764d988acbfe
+Create Date: 2026-10-18 03:12:28.512904
+
+"""
+from alembic import op
+
+from app.repositories.search_index import indexes
+
+
+# revision identifiers, used by Alembic.
+revision = 'cef7cb461bd3'
+down_revision = '764d988acbfe'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    connection = op.get_bind()
+    for index in indexes.values():
+        if index.create(connection):
+            index.populate(connection)
+
+
+def downgrade():
+    connection = op.get_bind()
+    for index in indexes.values():
+        index.drop(connection)
@@ -0,0 +1,99 @@
+"""
+Benchmark student creation: N single POST /api/students requests against one
+POST /api/students/bulk with the same N rows.
+Runs the app in-process against a fresh SQLite file in a temporary directory.
+Password hashing dominates both paths, so by default it uses a cheap hash to
+show the database side; pass --real-hash to time the configured hash too.
+
+    python scripts/benchmark_bulk_create.py [rows] [--real-hash]
+"""
+import shutil
+import sys
+import os
+import tempfile
+import time
+from functools import partial
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The settings read DATABASE_URL when they are imported
+DIRECTORY = tempfile.mkdtemp(prefix='benchmark_bulk_create')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(DIRECTORY, 'bench.db')}"
+
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.models import user as user_model
+from app.models.role import Role
+from app.models.user import User
+from app.services import student_service
+
+
+def make_rows(start, count):
+    return [{
+        'username': f'student{i}', 'email': f'student{i}@school.edu',
+        'password': 'password123', 'first_name': 'Alex', 'last_name': f'Smith{i}',
+        'date_of_birth': '2005-01-01', 'gender': 'Female',
+    } for i in range(start, start + count)]
+
+
+def make_app():
+    app = create_app('production')
+    app.config['EVENTS_SOCKET_DIR'] = os.path.join(DIRECTORY, 'events')
+    with app.app_context():
+        db.create_all()
+        for name in ('admin', 'teacher', 'student'):
+            db.session.add(Role(name=name, description=name.title()))
+        db.session.flush()
+        admin = User(username='admin', email='admin@school.edu',
+                     role_id=Role.query.filter_by(name='admin').first().id)
+        admin.password = 'admin123'
+        db.session.add(admin)
+        db.session.commit()
+    return app
+
+
+def timed(label, count, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms  ({elapsed * 1000 / count:.2f} ms per student)")
+    return elapsed
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    count = int(args[0]) if args else 200
+    if '--real-hash' not in sys.argv:
+        cheap_hash = partial(generate_password_hash, method='pbkdf2:sha256:1')
+        user_model.generate_password_hash = cheap_hash
+        student_service.generate_password_hash = cheap_hash
+
+    try:
+        app = make_app()
+        client = app.test_client()
+        token = client.post('/api/auth/login', json={
+            'username': 'admin', 'password': 'admin123'
+        }).get_json()['access_token']
+        headers = {'Authorization': f'Bearer {token}'}
+
+        def single():
+            for row in make_rows(0, count):
+                assert client.post('/api/students', headers=headers, json=row).status_code == 201
+
+        def bulk():
+            response = client.post('/api/students/bulk', headers=headers,
+                                   json=make_rows(count, count))
+            assert response.status_code == 201, response.get_json()
+
+        print(f"Creating {count} students on SQLite (wall time)")
+        singles = timed(f'{count} x POST /api/students', count, single)
+        batched = timed('POST /api/students/bulk', count, bulk)
+        print(f"speedup: {singles / batched:.1f}x")
+    finally:
+        shutil.rmtree(DIRECTORY, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark list serialization: per-row to_dict() with the standard json
+module against the compiled record serializer with the app's JSON provider,
+and against MessagePack.
+Uses synthetic StudentRecords, so no database is needed.
+
+    python scripts/benchmark_serialization.py [rows]
+"""
+import json
+import sys
+import os
+import time
+from datetime import date, datetime
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.repositories.records import STUDENT_RECORD_COLUMNS, StudentRecord
+from app.utils import msgpack_codec
+from app.utils.serializers import student_record_serializer
+
+
+def make_records(count):
+    now = datetime(2024, 1, 1, 9, 30)
+    records = []
+    for i in range(count):
+        values = {
+            'id': i, 'student_id': f'STU{i:06d}', 'date_of_birth': date(2005, 1, 1 + i % 28),
+            'gender': 'Female', 'address': f'{i} Main Street', 'phone': '555-0100',
+            'admission_date': date(2023, 9, 1), 'created_at': now, 'updated_at': now,
+            'user_id': i, 'username': f'student{i}', 'email': f'student{i}@school.edu',
+            'first_name': 'Alex', 'last_name': f'Smith{i}', 'is_active': True,
+            'last_login': None, 'user_created_at': now, 'user_updated_at': now,
+            'role_id': 3, 'role_name': 'student', 'role_description': 'Student',
+            'role_created_at': now, 'role_updated_at': now,
+        }
+        records.append(StudentRecord.from_row(list(STUDENT_RECORD_COLUMNS), values.values()))
+    return records
+
+
+def legacy_to_dict(r):
+    """Row-by-row serialization as Student.to_dict() and User.to_dict() do it"""
+    def iso(value):
+        return value.isoformat() if value else None
+
+    role = {
+        'id': r.role_id, 'name': r.role_name, 'description': r.role_description,
+        'created_at': iso(r.role_created_at), 'updated_at': iso(r.role_updated_at),
+    } if r.role_id is not None else None
+    return {
+        'id': r.id, 'student_id': r.student_id, 'date_of_birth': iso(r.date_of_birth),
+        'gender': r.gender, 'address': r.address, 'phone': r.phone,
+        'admission_date': iso(r.admission_date), 'created_at': iso(r.created_at),
+        'updated_at': iso(r.updated_at),
+        'user': {
+            'id': r.user_id, 'username': r.username, 'email': r.email,
+            'first_name': r.first_name, 'last_name': r.last_name, 'is_active': r.is_active,
+            'last_login': iso(r.last_login), 'created_at': iso(r.user_created_at),
+            'updated_at': iso(r.user_updated_at), 'role': role,
+        },
+    }
+
+
+def timed(label, func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.process_time()
+        size = len(func())
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<40} {best * 1000:8.1f} ms  ({size} bytes)")
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    records = make_records(count)
+    app = create_app()
+    serialize = student_record_serializer(None, iso=False)
+
+    print(f"Serializing {count} student records (best of 5, CPU time)")
+    legacy = timed('to_dict() + json.dumps',
+                   lambda: json.dumps([legacy_to_dict(r) for r in records]))
+    compiled = timed('compiled serializer + json.dumps',
+                     lambda: json.dumps([r.to_dict() for r in records]))
+    fast = timed('compiled serializer + app.json',
+                 lambda: app.json.dumps([serialize(r) for r in records]))
+    print(f"speedup: {legacy / compiled:.1f}x (serializer), "
+          f"{legacy / fast:.1f}x (serializer + provider)")
+    if msgpack_codec.available():
+        timed('compiled serializer + msgpack',
+              lambda: msgpack_codec.packb([serialize(r) for r in records]))
+
+
+if __name__ == '__main__':
+    main()
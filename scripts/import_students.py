@@ -0,0 +1,70 @@
+"""
+Import a student roster from a CSV or XLSX file, creating new students and
+updating existing ones (matched on student_id, then email)
+
+    python scripts/import_students.py roster.xlsx [--errors errors.csv] [--chunk-size 500]
+"""
+import argparse
+import csv
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from app.services.import_service import ImportService
+
+
+def import_students(path, errors_path=None, chunk_size=None):
+    """Stream the roster into the database, printing progress after each chunk"""
+    app = create_app()
+    if chunk_size:
+        app.config['IMPORT_CHUNK_SIZE'] = chunk_size
+    
+    def progress(summary):
+        print(f"  {summary['processed']} rows: {summary['created']} created, "
+              f"{summary['updated']} updated, {summary['unchanged']} unchanged, "
+              f"{summary['failed']} failed", flush=True)
+    
+    errors_file = open(errors_path, 'w', newline='') if errors_path else None
+    try:
+        # Every row error goes to the report as it happens, not just the first IMPORT_MAX_ERRORS
+        on_error = None
+        if errors_file:
+            writer = csv.writer(errors_file)
+            writer.writerow(['line', 'message'])
+            on_error = lambda line, message: writer.writerow([line, message])
+        
+        with app.app_context():
+            print(f"Importing {path}...")
+            response, status_code = ImportService().import_roster(
+                path, on_progress=progress, on_error=on_error
+            )
+    finally:
+        if errors_file:
+            errors_file.close()
+    
+    if status_code != 200:
+        print(f"✗ {response['message']}")
+        return 1
+    
+    print(f"✓ {response['message']}: {response['created']} created, {response['updated']} updated, "
+          f"{response['unchanged']} unchanged, {response['failed']} failed")
+    if not errors_file:
+        for error in response['errors']:
+            print(f"  line {error['line']}: {error['message']}")
+        if response['errors_truncated']:
+            print("  ... more errors not shown; use --errors to write them all to a file")
+    elif response['failed']:
+        print(f"  Row errors written to {errors_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import students from a CSV or XLSX roster')
+    parser.add_argument('path', help='CSV or XLSX file with a header row')
+    parser.add_argument('--errors', help='write every row error to this CSV file')
+    parser.add_argument('--chunk-size', type=int, help='rows per transaction (IMPORT_CHUNK_SIZE)')
+    args = parser.parse_args()
+    sys.exit(import_students(args.path, args.errors, args.chunk_size))
@@ -0,0 +1,39 @@
+"""
+Rebuild the full-text search indexes and phonetic name keys from the
+students and users tables
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models.user import User
+from app.repositories.search_index import indexes
+
+
+def rebuild_search_index():
+    """Drop, recreate and repopulate every search index"""
+    app = create_app()
+    
+    with app.app_context():
+        with db.engine.begin() as connection:
+            for index in indexes.values():
+                count = index.rebuild(connection)
+                if index.available(connection):
+                    print(f"✓ {index.name}: indexed {count} rows")
+                else:
+                    print(f"- {index.name}: full-text search not supported on this database")
+        
+        # Assigning the names re-runs the validator that derives the phonetic keys
+        updated = 0
+        for user in User.query.yield_per(1000):
+            user.first_name, user.last_name = user.first_name, user.last_name
+            updated += 1
+        db.session.commit()
+        print(f"✓ phonetic keys: refreshed {updated} users")
+
+
+if __name__ == '__main__':
+    rebuild_search_index()
@@ -0,0 +1,28 @@
+"""
+Rebuild the student_directory read model from the students, users and
+roles tables, e.g. after a bulk import that bypassed the ORM
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.repositories.student_repo import StudentRepository
+
+
+def rebuild_student_directory():
+    """Recompute every student_directory row in one transaction"""
+    app = create_app()
+    
+    with app.app_context():
+        # create_all() adds the table to databases that predate it
+        db.create_all()
+        count = StudentRepository().rebuild_directory()
+        db.session.commit()
+        print(f"✓ student_directory: rebuilt {count} rows")
+
+
+if __name__ == '__main__':
+    rebuild_student_directory()
@@ -0,0 +1,211 @@
+import pytest
+from app import create_app, db
+from app.models.user import User
+from app.models.role import Role
+from app.config.settings import TestingConfig
+
+
+@pytest.fixture
+def app():
+    """Create and configure a test Flask application"""
+    app = create_app()
+    app.config.from_object(TestingConfig)
+    
+    with app.app_context():
+        db.create_all()
+        
+        # Create test roles
+        roles = [
+            Role(name='admin', description='Administrator'),
+            Role(name='teacher', description='Teacher'),
+            Role(name='student', description='Student')
+        ]
+        for role in roles:
+            db.session.add(role)
+        db.session.commit()
+        
+        yield app
+        
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    """Create a test client"""
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_token(client, app):
+    """Get admin token for authenticated requests"""
+    with app.app_context():
+        admin_role = Role.query.filter_by(name='admin').first()
+        user = User(
+            username='admin',
+            email='admin@test.com',
+            first_name='Admin',
+            last_name='User',
+            role_id=admin_role.id
+        )
+        user.password = 'admin123'
+        db.session.add(user)
+        db.session.commit()
+    
+    response = client.post('/api/auth/login', json={
+        'username': 'admin',
+        'password': 'admin123'
+    })
+    return response.get_json()['access_token']
+
+
+def test_list_users(client, admin_token):
+    """Test listing users"""
+    response = client.get('/api/admin/users',
+        headers={'Authorization': f'Bearer {admin_token}'}
+    )
+    
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['count'] == 1
+    assert data['users'][0]['role']['name'] == 'admin'
+
+
+def test_list_users_sparse_fields(client, admin_token):
+    """Test that fields= limits the keys returned for users"""
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    data = client.get('/api/admin/users?fields=username,role', headers=headers).get_json()
+    assert set(data['users'][0]) == {'username', 'role'}
+    assert data['users'][0]['role']['name'] == 'admin'
+    
+    data = client.get('/api/admin/users?role=admin&fields=email', headers=headers).get_json()
+    assert data['users'] == [{'email': 'admin@test.com'}]
+    
+    response = client.get('/api/admin/users?fields=password_hash', headers=headers)
+    assert response.status_code == 400
+
+
+def test_conditional_get_users_and_analytics(client, admin_token):
+    """Test ETags on the user list and analytics, and that writes change them"""
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    for url in ('/api/admin/users', '/api/reports/analytics'):
+        response = client.get(url, headers=headers)
+        etag = response.headers['ETag']
+        assert response.headers['Cache-Control'] == 'private, no-cache'
+        
+        response = client.get(url, headers={**headers, 'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+    
+    etag = client.get('/api/admin/users', headers=headers).headers['ETag']
+    assert client.get('/api/admin/users?fields=email', headers=headers).headers['ETag'] != etag
+    
+    analytics_etag = client.get('/api/reports/analytics', headers=headers).headers['ETag']
+    client.put('/api/admin/users/1', json={'first_name': 'Changed'}, headers=headers)
+    response = client.get('/api/admin/users', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    # Analytics only reads students, so a user write keeps its tag
+    response = client.get('/api/reports/analytics',
+                          headers={**headers, 'If-None-Match': analytics_etag})
+    assert response.status_code == 304
+
+
+def test_entity_cache_invalidation(client, admin_token, app):
+    """Test cached user lookups, their eviction on writes, and the stats endpoint"""
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    with app.app_context():
+        student_role = Role.query.filter_by(name='student').first()
+        user = User(username='cached', email='cached@test.com', role_id=student_role.id)
+        user.password = 'password123'
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    
+    url = f'/api/admin/users/{user_id}'
+    assert client.get(url, headers=headers).get_json()['user']['is_active'] is True
+    before = client.get('/api/admin/cache', headers=headers).get_json()['cache']['users']
+    assert client.get(url, headers=headers).get_json()['user']['is_active'] is True
+    after = client.get('/api/admin/cache', headers=headers).get_json()['cache']['users']
+    # The user lookup and the admin's own token check both hit
+    assert after['hits'] > before['hits']
+    assert after['misses'] == before['misses']
+    
+    client.post(f'{url}/deactivate', headers=headers)
+    assert client.get(url, headers=headers).get_json()['user']['is_active'] is False
+    client.post(f'{url}/activate', headers=headers)
+    assert client.get(url, headers=headers).get_json()['user']['is_active'] is True
+    
+    client.put(url, json={'first_name': 'Renamed'}, headers=headers)
+    assert client.get(url, headers=headers).get_json()['user']['first_name'] == 'Renamed'
+    
+    client.delete(url, headers=headers)
+    assert client.get(url, headers=headers).status_code == 404
+    
+    stats = client.get('/api/admin/cache', headers=headers).get_json()['cache']
+    assert set(stats) == {'users', 'usernames', 'students', 'queries'}
+    assert set(stats['users']) >= {'size', 'hits', 'misses', 'hit_rate', 'evictions'}
+
+
+def test_users_by_role_cache(client, admin_token, app):
+    """Test that cached users-by-role results follow user and role writes"""
+    from app.repositories.user_repo import UserRepository
+    from app.repositories.query_cache import get_query_cache
+    
+    with app.app_context():
+        repo = UserRepository()
+        assert [user.username for user in repo.get_admins()] == ['admin']
+        hits = get_query_cache().results.hits
+        admins = repo.get_admins()
+        assert get_query_cache().results.hits == hits + 1
+        assert admins[0].role.name == 'admin'
+        
+        teacher_role = Role.query.filter_by(name='teacher').first()
+        repo.create_user('teacher1', 'teacher1@test.com', 'password123', teacher_role.id)
+        assert [user.username for user in repo.get_teachers()] == ['teacher1']
+        
+        admin_role = Role.query.filter_by(name='admin').first()
+        admin_role.name = 'administrator'
+        db.session.commit()
+        assert repo.get_admins() == []
+
+
+def test_role_registry_avoids_role_queries(client, admin_token, app):
+    """Test that role lookups and serialization come from memory and follow role writes"""
+    from sqlalchemy import event
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    # Load the registry
+    client.get('/api/admin/roles', headers=headers)
+    
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        roles = client.get('/api/admin/roles', headers=headers).get_json()['roles']
+        assert [role['name'] for role in roles] == ['admin', 'teacher', 'student']
+        users = client.get('/api/admin/users', headers=headers).get_json()['users']
+        assert users[0]['role']['name'] == 'admin'
+        stats = client.get('/api/admin/stats', headers=headers).get_json()['stats']
+        assert stats['users_by_role'] == {'admin': 1}
+        response = client.post('/api/students', headers=headers, json={
+            'username': 'newstudent', 'email': 'new@test.com', 'password': 'password123',
+            'first_name': 'New', 'last_name': 'Student', 'date_of_birth': '2005-05-05'
+        })
+        assert response.status_code == 201
+        assert response.get_json()['student']['user']['role']['name'] == 'student'
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', record)
+    role_reads = [s for s in statements if s.lstrip().startswith('SELECT') and 'FROM roles' in s]
+    assert not role_reads, role_reads
+    
+    with app.app_context():
+        role = Role.query.filter_by(name='teacher').first()
+        role.description = 'Teaching staff'
+        db.session.commit()
+    roles = client.get('/api/admin/roles', headers=headers).get_json()['roles']
+    assert roles[1]['description'] == 'Teaching staff'
@@ -0,0 +1,99 @@
+import pytest
+from app import create_app, db
+from app.models.user import User
+from app.models.role import Role
+from app.config.settings import TestingConfig
+
+
+@pytest.fixture
+def app():
+    """Create and configure a test Flask application"""
+    app = create_app()
+    app.config.from_object(TestingConfig)
+    
+    with app.app_context():
+        db.create_all()
+        
+        # Create test roles
+        roles = [
+            Role(name='admin', description='Administrator'),
+            Role(name='teacher', description='Teacher'),
+            Role(name='student', description='Student')
+        ]
+        for role in roles:
+            db.session.add(role)
+        db.session.commit()
+        
+        yield app
+        
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    """Create a test client"""
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_token(client, app):
+    """Get admin token for authenticated requests"""
+    with app.app_context():
+        admin_role = Role.query.filter_by(name='admin').first()
+        user = User(
+            username='admin',
+            email='admin@test.com',
+            first_name='Admin',
+            last_name='User',
+            role_id=admin_role.id
+        )
+        user.password = 'admin123'
+        db.session.add(user)
+        db.session.commit()
+    
+    response = client.post('/api/auth/login', json={
+        'username': 'admin',
+        'password': 'admin123'
+    })
+    return response.get_json()['access_token']
+
+
+def test_batch_requests(client, admin_token):
+    """Test that sub-requests run in order and return their own statuses"""
+    response = client.post('/api/batch', json={'requests': [
+        {'id': 'me', 'path': '/api/auth/me'},
+        {'id': 'users', 'path': '/api/admin/users?fields=username'},
+        {'id': 'missing', 'path': '/api/students/999999'},
+    ]}, headers={'Authorization': f'Bearer {admin_token}'})
+    
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [r['id'] for r in data['responses']] == ['me', 'users', 'missing']
+    assert [r['status'] for r in data['responses']] == [200, 200, 404]
+    assert data['responses'][1]['body']['users'] == [{'username': 'admin'}]
+
+
+def test_batch_requests_parallel(client, admin_token):
+    """Test that GET-only batches can run concurrently"""
+    response = client.post('/api/batch', json={'parallel': True, 'requests': [
+        {'path': '/api/admin/users'},
+        {'path': '/api/admin/roles'},
+        {'path': '/api/students'},
+    ]}, headers={'Authorization': f'Bearer {admin_token}'})
+    
+    data = response.get_json()
+    assert [r['status'] for r in data['responses']] == [200, 200, 200]
+    assert [r['id'] for r in data['responses']] == [0, 1, 2]
+
+
+def test_batch_rejects_invalid_requests(client, admin_token):
+    """Test batch validation and authentication"""
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    response = client.post('/api/batch', json={'requests': [{'path': '/api/batch'}]},
+                           headers=headers)
+    assert response.status_code == 400
+    
+    response = client.post('/api/batch', json={'requests': [{'path': '/api/admin/users'}]})
+    assert response.status_code == 401
@@ -0,0 +1,399 @@
+import fnmatch
+import multiprocessing
+import socket
+import socketserver
+import threading
+import time
+import pytest
+from datetime import date
+from app import create_app, db
+from app.models.user import User
+from app.models.role import Role
+from app.models.student import Student
+from app.config.settings import TestingConfig
+from app.repositories.entity_cache import EntityCache, get_entity_cache
+from app.utils.cache_backends import RedisCache, RedisConnection, SQLiteCache, create_cache
+from app.utils.event_bus import EventBus
+from app.utils.single_flight import SingleFlight
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Speaks enough of the Redis protocol for RedisCache: GET, MGET, SET PX, DEL, INCR,
+    PEXPIRE, SCAN"""
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2])
+            self.wfile.write(self.server.execute(args))
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeRedisHandler)
+        self.data = {}
+        self.commands = []
+
+    @property
+    def url(self):
+        return f'redis://127.0.0.1:{self.server_address[1]}/0'
+
+    def execute(self, args):
+        command = args[0].upper().decode()
+        self.commands.append(command)
+        now = time.monotonic()
+        self.data = {k: v for k, v in self.data.items() if v[1] is None or v[1] > now}
+        if command == 'GET':
+            value = self.data.get(args[1])
+            return b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value[0]), value[0])
+        if command == 'MGET':
+            values = [self.data.get(key) for key in args[1:]]
+            return b'*%d\r\n' % len(values) + b''.join(
+                b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value[0]), value[0])
+                for value in values
+            )
+        if command == 'INCR':
+            value, expires = self.data.get(args[1], (b'0', None))
+            self.data[args[1]] = (b'%d' % (int(value) + 1), expires)
+            return b':%d\r\n' % (int(value) + 1)
+        if command == 'PEXPIRE':
+            if args[1] not in self.data:
+                return b':0\r\n'
+            self.data[args[1]] = (self.data[args[1]][0], now + int(args[2]) / 1000)
+            return b':1\r\n'
+        if command == 'SET':
+            expires = None
+            if len(args) == 5 and args[3].upper() == b'PX':
+                expires = now + int(args[4]) / 1000
+            self.data[args[1]] = (args[2], expires)
+            return b'+OK\r\n'
+        if command == 'DEL':
+            removed = sum(self.data.pop(key, None) is not None for key in args[1:])
+            return b':%d\r\n' % removed
+        if command == 'SCAN':
+            pattern = args[args.index(b'MATCH') + 1].decode()
+            keys = [key for key in self.data if fnmatch.fnmatchcase(key.decode(), pattern)]
+            reply = b'*2\r\n$1\r\n0\r\n*%d\r\n' % len(keys)
+            return reply + b''.join(b'$%d\r\n%s\r\n' % (len(key), key) for key in keys)
+        return b'-ERR unknown command\r\n'
+
+
+@pytest.fixture
+def redis_server():
+    """A local stand-in for a Redis server"""
+    server = FakeRedisServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def backend(request, tmp_path):
+    """CACHE_BACKEND value for each backend"""
+    if request.param == 'sqlite':
+        return f'sqlite:///{tmp_path / "cache.db"}'
+    if request.param == 'redis':
+        return request.getfixturevalue('redis_server').url
+    return 'memory'
+
+
+@pytest.fixture
+def app(backend, tmp_path):
+    """Create a test Flask application using `backend` for its caches"""
+    app = create_app()
+    app.config.from_object(TestingConfig)
+    app.config['CACHE_BACKEND'] = backend
+    app.config['EVENTS_SOCKET_DIR'] = str(tmp_path / 'events')
+
+    with app.app_context():
+        db.create_all()
+
+        # Create test roles
+        roles = [
+            Role(name='admin', description='Administrator'),
+            Role(name='teacher', description='Teacher'),
+            Role(name='student', description='Student')
+        ]
+        for role in roles:
+            db.session.add(role)
+        db.session.commit()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def admin_token(app):
+    """Get admin token for authenticated requests"""
+    with app.app_context():
+        admin_role = Role.query.filter_by(name='admin').first()
+        user = User(username='admin', email='admin@test.com', role_id=admin_role.id)
+        user.password = 'admin123'
+        db.session.add(user)
+        db.session.commit()
+
+    response = app.test_client().post('/api/auth/login', json={
+        'username': 'admin',
+        'password': 'admin123'
+    })
+    return response.get_json()['access_token']
+
+
+def test_backend_operations(backend):
+    """Test that every backend honours the same get/set/delete/clear contract"""
+    cache = create_cache(backend, 'test', max_size=10, ttl=60)
+    assert cache.get(('students', 1)) is None
+
+    cache.set(('students', 1), {'born': date(2000, 1, 1)})
+    assert cache.get(('students', 1)) == {'born': date(2000, 1, 1)}
+
+    # A load that raced an invalidation is not stored
+    generation = cache.version(('students', 1))
+    cache.delete(('students', 1))
+    cache.set(('students', 1), 'stale', generation)
+    assert cache.get(('students', 1), 'missing') == 'missing'
+
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert len(cache) == 2
+    cache.clear()
+    assert cache.get('a') is None
+
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 3
+    assert stats['size'] == 0
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'redis'], indirect=True)
+def test_shared_generations_reach_other_workers(backend):
+    """Test that a load racing a delete in another worker is never served"""
+    first = create_cache(backend, 'students', max_size=10, ttl=60)
+    second = create_cache(backend, 'students', max_size=10, ttl=60)
+
+    generation = first.version(1)
+    second.delete(1)
+    first.set(1, 'stale', generation)
+    assert first.get(1) is None
+    assert second.get(1) is None
+
+    first.set(1, 'fresh', first.version(1))
+    assert second.get(1) == 'fresh'
+    generation = second.version(1)
+    first.clear()
+    second.set(1, 'stale', generation)
+    assert first.get(1) is None
+
+
+def test_sqlite_cache_is_shared_and_bounded(tmp_path):
+    """Test that SQLite caches on one file see each other's entries, within max_size and ttl"""
+    now = [1000.0]
+    path = str(tmp_path / 'cache.db')
+    first = SQLiteCache(path, 'users', max_size=2, ttl=10, clock=lambda: now[0])
+    second = SQLiteCache(path, 'users', max_size=2, ttl=10, clock=lambda: now[0])
+
+    first.set(1, 'one')
+    assert second.get(1) == 'one'
+    second.delete(1)
+    assert first.get(1) is None
+
+    for key in range(3):
+        now[0] += 1
+        first.set(key, key)
+    assert len(second) == 2
+    assert first.stats()['evictions'] == 1
+    assert second.get(0) is None
+
+    now[0] += 10
+    assert second.get(2) is None
+    # A different namespace in the same file is separate
+    assert SQLiteCache(path, 'students', max_size=2, ttl=10).get(1) is None
+
+
+def test_redis_cache_uses_server_ttl_and_survives_outages(redis_server):
+    """Test RedisCache against the fake server, and that errors count as misses"""
+    cache = RedisCache(redis_server.url, 'users', max_size=10, ttl=0.05)
+    cache.set(1, 'one')
+    assert cache.get(1) == 'one'
+    time.sleep(0.1)
+    assert cache.get(1) is None
+
+    unreachable = RedisCache('redis://127.0.0.1:1/0', 'users', max_size=10, ttl=60)
+    unreachable.set(1, 'one')
+    assert unreachable.get(1) is None
+    assert unreachable.errors == 2
+
+
+def test_redis_connection_backs_off_after_failures(monkeypatch):
+    """Test that commands skip an unreachable server until the backoff has passed"""
+    attempts = []
+    create_connection = socket.create_connection
+
+    def counting_create_connection(*args, **kwargs):
+        attempts.append(args[0])
+        return create_connection(*args, **kwargs)
+
+    monkeypatch.setattr(socket, 'create_connection', counting_create_connection)
+    now = [100.0]
+    connection = RedisConnection('127.0.0.1', 1, backoff=5, clock=lambda: now[0])
+    for _ in range(3):
+        with pytest.raises(OSError):
+            connection.execute('GET', 'key')
+    assert len(attempts) == 1
+
+    now[0] += 5
+    with pytest.raises(OSError):
+        connection.execute('GET', 'key')
+    assert len(attempts) == 2
+
+
+def test_evictions_reach_other_workers(tmp_path):
+    """Test that an eviction in one process drops the entry from another process's cache"""
+    context = multiprocessing.get_context('fork')
+    ready, received = context.Event(), context.Queue()
+    directory = str(tmp_path / 'bus')
+
+    def worker():
+        cache = EntityCache(max_size=10, ttl=60)
+        cache.listen(EventBus(directory))
+        cache.users.set(7, {'id': 7})
+        ready.set()
+        deadline = time.monotonic() + 5
+        while cache.users.get(7) is not None and time.monotonic() < deadline:
+            time.sleep(0.001)
+        received.put(cache.users.get(7))
+
+    process = context.Process(target=worker)
+    process.start()
+    assert ready.wait(5)
+
+    cache = EntityCache(max_size=10, ttl=60, notify=EventBus(directory).notify)
+    cache.evict([('users', 7)])
+
+    assert received.get(timeout=5) is None
+    process.join(5)
+
+
+def test_app_caches_on_backend(app, admin_token):
+    """Test cached user and student lookups end to end on each backend"""
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    with app.app_context():
+        student_role = Role.query.filter_by(name='student').first()
+        user = User(username='cached', email='cached@test.com', first_name='Cached',
+                    last_name='Student', role_id=student_role.id)
+        user.password = 'password123'
+        db.session.add(user)
+        db.session.flush()
+        student = Student(user_id=user.id, student_id='2024001', date_of_birth=date(2000, 1, 1))
+        db.session.add(student)
+        db.session.commit()
+        student_id, user_id = student.id, user.id
+
+    url = f'/api/students/{student_id}'
+    for _ in range(2):
+        data = client.get(url, headers=headers).get_json()['student']
+        assert data['date_of_birth'] == '2000-01-01'
+        assert client.get('/api/students?search=cached', headers=headers).get_json()['count'] == 1
+        assert client.get('/api/auth/me', headers=headers).status_code == 200
+
+    client.put(url, json={'last_name': 'Changed'}, headers=headers)
+    assert client.get(url, headers=headers).get_json()['student']['user']['last_name'] == 'Changed'
+    assert client.get('/api/students?search=cached', headers=headers).get_json()['count'] == 1
+
+    # Logins and password changes read the hash from the database, never from the cache
+    def login(password):
+        return client.post('/api/auth/login', json={'username': 'cached', 'password': password})
+
+    assert login('password123').status_code == 200
+    token = login('password123').get_json()['access_token']
+    assert login('wrong-password').status_code == 401
+    with app.app_context():
+        cached = get_entity_cache().users.get(user_id)
+        assert cached['username'] == 'cached'
+        assert 'password_hash' not in cached
+    response = client.post('/api/auth/change-password',
+                           headers={'Authorization': f'Bearer {token}'},
+                           json={'current_password': 'password123', 'new_password': 'password456'})
+    assert response.status_code == 200
+    assert login('password123').status_code == 401
+    assert login('password456').status_code == 200
+
+    stats = client.get('/api/admin/cache', headers=headers).get_json()['cache']
+    assert stats['students']['hits'] >= 1
+    assert stats['users']['hits'] >= 1
+    assert stats['queries']['hits'] >= 1
+
+
+def test_single_flight_collapses_concurrent_calls():
+    """Test that identical concurrent calls share one execution and its errors"""
+    flight = SingleFlight(timeout=5)
+    started, release = threading.Event(), threading.Event()
+    executions = []
+
+    def compute():
+        executions.append(1)
+        started.set()
+        assert release.wait(5)
+        return {'total': 3}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('analytics', (), compute)))
+               for _ in range(5)]
+    threads[0].start()
+    assert started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    while flight._counters['analytics']['calls'] < 5:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(executions) == 1
+    assert results == [{'total': 3}] * 5
+    assert flight.stats() == {
+        'in_flight': 0,
+        'methods': {'analytics': {'calls': 5, 'executions': 1, 'coalesced': 4, 'timeouts': 0}}
+    }
+
+    # Different arguments run separately, and finished calls are not reused
+    assert flight.do('analytics', ('other',), lambda: 1) == 1
+    with pytest.raises(ValueError):
+        flight.do('analytics', (), lambda: int('x'))
+    assert flight.stats()['methods']['analytics']['executions'] == 3
+
+
+@pytest.mark.parametrize('backend', ['memory'])
+def test_coalesced_reads_follow_writes(app, admin_token):
+    """Test that coalesced service reads run again after a write and report their counts"""
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {admin_token}'}
+
+    assert client.get('/api/reports/analytics', headers=headers) \
+        .get_json()['analytics']['total_students'] == 0
+    with app.app_context():
+        student_role = Role.query.filter_by(name='student').first()
+        user = User(username='new', email='new@test.com', role_id=student_role.id)
+        user.password = 'password123'
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Student(user_id=user.id, student_id='2024001',
+                               date_of_birth=date(2000, 1, 1)))
+        db.session.commit()
+    assert client.get('/api/reports/analytics', headers=headers) \
+        .get_json()['analytics']['total_students'] == 1
+
+    coalescing = client.get('/api/admin/cache', headers=headers).get_json()['coalescing']
+    assert coalescing['methods']['ReportService.get_student_analytics']['executions'] == 2
@@ -0,0 +1,126 @@
+import multiprocessing
+import pytest
+from app import create_app, db
+from app.models.user import User
+from app.models.role import Role
+from app.config.settings import TestingConfig
+from app.utils.event_bus import EventBus
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Create and configure a test Flask application"""
+    app = create_app()
+    app.config.from_object(TestingConfig)
+    app.config['EVENTS_SOCKET_DIR'] = str(tmp_path / 'events')
+    
+    with app.app_context():
+        db.create_all()
+        
+        # Create test roles
+        roles = [
+            Role(name='admin', description='Administrator'),
+            Role(name='teacher', description='Teacher'),
+            Role(name='student', description='Student')
+        ]
+        for role in roles:
+            db.session.add(role)
+        db.session.commit()
+        
+        yield app
+        
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    """Create a test client"""
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_token(client, app):
+    """Get admin token for authenticated requests"""
+    with app.app_context():
+        admin_role = Role.query.filter_by(name='admin').first()
+        user = User(
+            username='admin',
+            email='admin@test.com',
+            first_name='Admin',
+            last_name='User',
+            role_id=admin_role.id
+        )
+        user.password = 'admin123'
+        db.session.add(user)
+        db.session.commit()
+    
+    response = client.post('/api/auth/login', json={
+        'username': 'admin',
+        'password': 'admin123'
+    })
+    return response.get_json()['access_token']
+
+
+def test_event_stream_pushes_changes(client, admin_token):
+    """Test that /api/events streams student and user changes as SSE"""
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    response = client.get(f'/api/events?jwt={admin_token}')
+    assert response.mimetype == 'text/event-stream'
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b'retry:')
+    
+    created = client.post('/api/students', headers=headers, json={
+        'username': 'student1',
+        'email': 'student1@test.com',
+        'password': 'password123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'date_of_birth': '2000-01-15',
+        'gender': 'Male'
+    }).get_json()['student']
+    client.post(f"/api/admin/users/{created['user']['id']}/deactivate", headers=headers)
+    client.delete(f"/api/admin/users/{created['user']['id']}", headers=headers)
+    
+    assert next(chunks) == (
+        b'event: student.created\n'
+        b'data: {"id":%d,"student_id":"%s","gender":"Male"}\n\n'
+        % (created['id'], created['student_id'].encode())
+    )
+    assert next(chunks).startswith(b'event: user.deactivated\n')
+    assert next(chunks) == (
+        b'event: user.deleted\ndata: {"id":%d,"username":"student1"}\n\n' % created['user']['id']
+    )
+    assert next(chunks) == (
+        b'event: student.deleted\n'
+        b'data: {"id":%d,"student_id":"%s","gender":"Male"}\n\n'
+        % (created['id'], created['student_id'].encode())
+    )
+    response.close()
+
+
+def test_event_stream_requires_staff_role(client, app):
+    """Test that the event stream rejects missing tokens"""
+    response = client.get('/api/events')
+    assert response.status_code == 401
+
+
+def test_event_bus_fans_out_across_processes(tmp_path):
+    """Test that an event published in one process reaches subscribers in another"""
+    context = multiprocessing.get_context('fork')
+    ready, received = context.Event(), context.Queue()
+    directory = str(tmp_path / 'bus')
+    
+    def worker():
+        subscriber = EventBus(directory).subscribe()
+        ready.set()
+        received.put(subscriber.get(timeout=5))
+    
+    process = context.Process(target=worker)
+    process.start()
+    assert ready.wait(5)
+    
+    EventBus(directory).publish('student.deleted', {'id': 7})
+    
+    assert received.get(timeout=5) == {'type': 'student.deleted', 'data': {'id': 7}}
+    process.join(5)
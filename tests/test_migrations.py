@@ -0,0 +1,85 @@
+"""
+Migration tests
+
+The revisions are run against an empty in-memory database and checked
+against the models, and a database in the shape of the initial revision is
+upgraded to check that every later revision backfills the rows already in it.
+"""
+import os
+from datetime import date, datetime
+
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import upgrade
+from sqlalchemy import inspect, select, text
+
+from app import create_app, db
+from app.models.student_directory import StudentDirectory
+from app.repositories.search_index import indexes, student_search_index
+from app.utils.fuzzy import metaphone
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+@pytest.fixture
+def app():
+    """An app on an empty in-memory database"""
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+def _schema_differences():
+    with db.engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={
+            # The search index tables are not models
+            'include_object': lambda object, name, type_, reflected, compare_to:
+                not (type_ == 'table' and reflected and compare_to is None),
+        })
+        return compare_metadata(context, db.metadata)
+
+
+def test_migrations_match_models(app):
+    """Test that upgrading an empty database yields the schema of the models"""
+    upgrade(directory=MIGRATIONS)
+    assert _schema_differences() == []
+    tables = inspect(db.engine).get_table_names()
+    for index in indexes.values():
+        assert index.available() == (index.name in tables)
+
+
+def test_upgrade_backfills_initial_schema(app):
+    """Test that a database created before migrations is brought up to date with its rows"""
+    upgrade(directory=MIGRATIONS, revision='764d988acbfe')
+    now = datetime(2024, 1, 1)
+    with db.engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO roles (id, name, description, created_at, updated_at) "
+            "VALUES (1, 'student', 'Student', :now, :now)"
+        ), {'now': now})
+        connection.execute(text(
+            "INSERT INTO users (id, username, email, password_hash, first_name, last_name, "
+            "is_active, created_at, updated_at, role_id) VALUES (1, 'alice', 'alice@test.com', "
+            "'x', 'Alice', 'Knight', 1, :now, :now, 1)"
+        ), {'now': now})
+        connection.execute(text(
+            "INSERT INTO students (id, student_id, date_of_birth, gender, user_id, created_at) "
+            "VALUES (1, '240001', :born, 'Female', 1, :now)"
+        ), {'born': date(2000, 1, 1), 'now': now})
+
+    upgrade(directory=MIGRATIONS)
+
+    assert _schema_differences() == []
+    keys = db.session.execute(text(
+        "SELECT first_name_phonetic, last_name_phonetic FROM users WHERE id = 1"
+    )).one()
+    assert tuple(keys) == (metaphone('Alice'), metaphone('Knight'))
+    row = db.session.execute(select(StudentDirectory)).scalar_one()
+    assert (row.student_id, row.username, row.role_name, row.gender_key,
+            row.last_name_phonetic) == ('240001', 'alice', 'student', 'female', metaphone('Knight'))
+    assert row.search_text == '240001 alice knight alice@test.com'
+    if student_search_index.available():
+        matches = db.session.execute(student_search_index.match_clause('knig')).all()
+        assert [match.pk for match in matches] == [1]
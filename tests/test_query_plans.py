@@ -0,0 +1,211 @@
+"""
+Query-plan regression tests
+
+Every SELECT issued by the repository and report queries below is run
+through EXPLAIN QUERY PLAN, and the test fails if SQLite would read a table
+from end to end instead of using an index. Steps that read a whole table on
+purpose name the tables they may scan.
+"""
+import re
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.config.settings import TestingConfig
+from app.models.role import Role
+from app.models.student import Student
+from app.models.user import User
+from app.repositories.name_index import get_name_tree
+from app.repositories.outbox_repo import OutboxRepository
+from app.repositories.role_registry import get_role_registry
+from app.repositories.search_index import student_search_index
+from app.repositories.student_repo import SORT_ORDERS, StudentRepository
+from app.repositories.user_repo import UserRepository
+
+# "SCAN students" is a full table scan; "SCAN students USING INDEX ..." walks an index
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+
+@pytest.fixture
+def app():
+    """Create and configure a test Flask application"""
+    app = create_app()
+    app.config.from_object(TestingConfig)
+
+    with app.app_context():
+        db.create_all()
+
+        # Create test roles
+        roles = [
+            Role(name='admin', description='Administrator'),
+            Role(name='teacher', description='Teacher'),
+            Role(name='student', description='Student')
+        ]
+        for role in roles:
+            db.session.add(role)
+        db.session.commit()
+
+        for i, (first_name, last_name, gender) in enumerate([
+            ('Alice', 'Adams', 'Female'), ('Bob', 'Brown', 'Male'), ('Cara', 'Cole', 'Female')
+        ]):
+            user = User(
+                username=f'{first_name.lower()}{i}',
+                email=f'{first_name.lower()}{i}@test.com',
+                first_name=first_name,
+                last_name=last_name,
+                role_id=roles[2].id
+            )
+            user.password = 'password123'
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Student(
+                user_id=user.id,
+                student_id=f'2490{i:02d}',
+                date_of_birth=date(2000, 1, 1 + i),
+                gender=gender
+            ))
+        db.session.commit()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+
+
+@contextmanager
+def recorded_selects():
+    """Collect (statement, parameters) for every SELECT run on the engine"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')) and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def query_plan(statement, parameters):
+    rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan):
+    """Tables the plan reads end to end without an index"""
+    tables = set(db.metadata.tables)
+    return {match.group(1) for match in map(FULL_SCAN.match, plan)
+            if match and match.group(1) in tables}
+
+
+def _workload():
+    """(label, call, tables it may scan in full) for each repository read"""
+    students, users, outbox = StudentRepository(), UserRepository(), OutboxRepository()
+    alice = Student.query.filter_by(student_id='249000').first()
+    alice_id, alice_user_id = alice.id, alice.user_id
+    student_role_id = Role.query.filter_by(name='student').first().id
+    # Substring search without the full-text index has to read every row
+    search_scans = set() if student_search_index.available() else {'student_directory'}
+    # Workers load the vocabulary of names when they start
+    get_name_tree()
+
+    steps = [
+        ('student by id', lambda: students.get_by_id(alice_id), set()),
+        ('student by user', lambda: students.get_by_user_id(alice_user_id), set()),
+        ('student by student_id', lambda: students.get_by_student_id('249000'), set()),
+        ('next student_id', lambda: Student.generate_student_id(2490), set()),
+        ('student record', lambda: students.get_student_with_details(alice_id), set()),
+        ('students by ids', lambda: students.get_students_by_ids([alice_id, alice_id + 1]), set()),
+        ('filtered page', lambda: students.list_students_page(limit=2, gender='female'), set()),
+        ('search page', lambda: students.list_students_page('adams', limit=2), search_scans),
+        ('fuzzy page', lambda: students.list_students_page('adams', limit=2, fuzzy=True), set()),
+        ('search', lambda: students.search_students('adams'), search_scans),
+        ('fuzzy search', lambda: students.search_students('adams', fuzzy=True), set()),
+        ('stream', lambda: list(students.iter_students_with_details(gender='male')), set()),
+        ('user by username', lambda: users.get_by_username('alice0'), set()),
+        ('user by email', lambda: users.get_by_email('alice0@test.com'), set()),
+        # The registry loads every role once, then resolves names in memory
+        ('role registry', lambda: get_role_registry().all(), {'roles'}),
+        ('users by role', lambda: users.list_users(role_name='student'), set()),
+        ('user search', lambda: users.search_users('alice', role_id=student_role_id),
+         set() if student_search_index.available() else {'users'}),
+        ('outbox head', lambda: (outbox.head(), outbox.head('student')), set()),
+        ('outbox tail', lambda: outbox.events_since('student', 0, 10), set()),
+        # Whole-table reads by design
+        ('all students', lambda: students.get_all(), {'students'}),
+        ('all users', lambda: users.list_users(), {'users'}),
+    ]
+    for sort in SORT_ORDERS:
+        for descending in (False, True):
+            def page(sort=sort, descending=descending):
+                rows, key = students.list_students_page(limit=1, sort=sort, descending=descending)
+                after = students.parse_page_key(sort, key)
+                students.list_students_page(limit=1, after=after, sort=sort, descending=descending)
+                if students.supports_json_pages():
+                    students.list_students_page_json(limit=1, after=after, sort=sort,
+                                                     descending=descending)
+            steps.append((f'{"-" if descending else ""}{sort} page', page, set()))
+    return steps
+
+
+def test_repository_queries_use_indexes(app):
+    """Test that no repository query falls back to a full table scan"""
+    with app.app_context():
+        failures = []
+        for label, call, allowed in _workload():
+            # Start each step without cached entities so every lookup hits the database
+            db.session.expunge_all()
+            with recorded_selects() as statements:
+                call()
+            assert statements, f'{label}: no queries recorded'
+            for statement, parameters in statements:
+                scanned = full_scans(query_plan(statement, parameters)) - allowed
+                if scanned:
+                    tables = ', '.join(sorted(scanned))
+                    failures.append(f'{label}: full scan of {tables}\n{statement}')
+
+        assert not failures, '\n\n'.join(failures)
+
+
+def test_sorted_pages_read_in_index_order(app):
+    """Test that every sort= order is served by an index without a separate sort step"""
+    with app.app_context():
+        repo = StudentRepository()
+        for sort in SORT_ORDERS:
+            for descending in (False, True):
+                with recorded_selects() as statements:
+                    repo.list_students_page(limit=2, sort=sort, descending=descending)
+                plan = query_plan(*statements[-1])
+                assert not any('TEMP B-TREE' in step for step in plan), (sort, descending, plan)
+                assert any('USING INDEX' in step or 'USING COVERING INDEX' in step
+                           for step in plan), (sort, descending, plan)
+
+
+def test_stats_queries_use_indexes(app):
+    """Test the admin stats and analytics queries against their filter indexes"""
+    client = app.test_client()
+    with app.app_context():
+        admin_role = Role.query.filter_by(name='admin').first()
+        user = User(username='admin', email='admin@test.com', role_id=admin_role.id)
+        user.password = 'admin123'
+        db.session.add(user)
+        db.session.commit()
+    token = client.post('/api/auth/login', json={
+        'username': 'admin', 'password': 'admin123'
+    }).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    with app.app_context():
+        with recorded_selects() as statements:
+            assert client.get('/api/admin/stats', headers=headers).status_code == 200
+            assert client.get('/api/reports/analytics', headers=headers).status_code == 200
+
+        plans = [query_plan(statement, parameters) for statement, parameters in statements]
+        scans = [(statement, plan) for (statement, _), plan in zip(statements, plans)
+                 if full_scans(plan)]
+        assert not scans, scans
@@ -1,5 +1,9 @@
+import json
+import os
+import subprocess
+import sys
 import pytest
-from datetime import date
+from datetime import date, datetime
 from flask import Flask
 from app import create_app, db
 from app.models.user import User
@@ -168,4 +172,920 @@ def test_update_student(client, admin_token, app):
     
     assert response.status_code == 200
     data = response.get_json()
-    assert data['status'] == 'success'
\ No newline at end of file
+    assert data['status'] == 'success'
+
+def _create_students(app, names):
+    """Insert students directly for list/search tests"""
+    with app.app_context():
+        student_role = Role.query.filter_by(name='student').first()
+        for i, (first_name, last_name, gender) in enumerate(names):
+            user = User(
+                username=f'{first_name.lower()}{i}',
+                email=f'{first_name.lower()}{i}@test.com',
+                first_name=first_name,
+                last_name=last_name,
+                role_id=student_role.id
+            )
+            user.password = 'password123'
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Student(
+                user_id=user.id,
+                student_id=f'2490{i:02d}',
+                date_of_birth=date(2000, 1, 1),
+                gender=gender
+            ))
+        db.session.commit()
+
+
+def test_list_students_cursor_pagination(client, admin_token, app):
+    """Test that pages follow next_cursor in name order without overlap"""
+    _create_students(app, [
+        ('Carol', 'Brown', 'Female'),
+        ('Alice', 'Adams', 'Female'),
+        ('Bob', 'Adams', 'Male'),
+        ('Dave', 'Clark', 'Male'),
+        ('Eve', 'Brown', 'Female'),
+    ])
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    seen = []
+    cursor = None
+    while True:
+        url = '/api/students?limit=2' + (f'&cursor={cursor}' if cursor else '')
+        data = client.get(url, headers=headers).get_json()
+        assert data['count'] <= 2
+        seen.extend(s['user']['first_name'] for s in data['students'])
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+    
+    assert seen == ['Alice', 'Bob', 'Carol', 'Eve', 'Dave']
+
+
+def test_list_students_filters_in_query(client, admin_token, app):
+    """Test search and gender filters"""
+    _create_students(app, [
+        ('Alice', 'Adams', 'Female'),
+        ('Bob', 'Adams', 'Male'),
+        ('Carol', 'Brown', 'Female'),
+    ])
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    data = client.get('/api/students?search=adams&gender=female', headers=headers).get_json()
+    assert [s['user']['first_name'] for s in data['students']] == ['Alice']
+    
+    response = client.get('/api/students?cursor=not-a-cursor', headers=headers)
+    assert response.status_code == 400
+
+
+def test_list_students_sort(client, admin_token, app):
+    """Test sort= orders, descending pages and cursors keyed on dates"""
+    _create_students(app, [
+        ('Alice', 'Adams', 'Female'),
+        ('Bob', 'Brown', 'Male'),
+        ('Carol', 'Clark', 'Female'),
+    ])
+    with app.app_context():
+        for student, admitted in zip(Student.query.order_by(Student.student_id),
+                                     [date(2024, 9, 1), date(2023, 9, 1), date(2024, 9, 1)]):
+            student.admission_date = admitted
+        db.session.commit()
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    for db_json in (True, False):
+        app.config['STUDENTS_DB_JSON'] = db_json
+        seen, cursor = [], None
+        while True:
+            url = '/api/students?sort=-admission_date&limit=1'
+            if cursor:
+                url += f'&cursor={cursor}'
+            data = client.get(url, headers=headers).get_json()
+            seen.extend(s['user']['first_name'] for s in data['students'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        # Descending applies to the name tie-break too
+        assert seen == ['Carol', 'Alice', 'Bob']
+    
+    data = client.get('/api/students?sort=-student_id', headers=headers).get_json()
+    assert [s['student_id'] for s in data['students']] == ['249002', '249001', '249000']
+    
+    assert client.get('/api/students?sort=password', headers=headers).status_code == 400
+    name_cursor = client.get('/api/students?limit=1', headers=headers).get_json()['next_cursor']
+    response = client.get(f'/api/students?sort=admission_date&cursor={name_cursor}',
+                          headers=headers)
+    assert response.status_code == 400
+
+
+def test_conditional_get_students(client, admin_token, app):
+    """Test that a matching If-None-Match gets a 304 without querying students"""
+    from sqlalchemy import event
+    _create_students(app, [('Alice', 'Adams', 'Female')])
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    with app.app_context():
+        alice = Student.query.first().id
+    
+    for url in ('/api/students', f'/api/students/{alice}'):
+        response = client.get(url, headers=headers)
+        etag = response.headers['ETag']
+        
+        statements = []
+        with app.app_context():
+            record = lambda conn, cursor, statement, *args: statements.append(statement)
+            event.listen(db.engine, 'before_cursor_execute', record)
+            try:
+                response = client.get(url, headers={**headers, 'If-None-Match': etag})
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', record)
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+        assert not any('student_directory' in statement for statement in statements)
+    
+    client.put(f'/api/students/{alice}', json={'phone': '5550100'}, headers=headers)
+    response = client.get(f'/api/students/{alice}', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['student']['phone'] == '5550100'
+
+
+def test_list_students_ndjson_stream(client, admin_token, app):
+    """Test streaming the roster as newline-delimited JSON"""
+    _create_students(app, [
+        ('Alice', 'Adams', 'Female'),
+        ('Bob', 'Adams', 'Male'),
+        ('Carol', 'Brown', 'Female'),
+    ])
+    
+    response = client.get('/api/students',
+        headers={
+            'Authorization': f'Bearer {admin_token}',
+            'Accept': 'application/x-ndjson'
+        }
+    )
+    
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)['user']['first_name'] for line in lines] == ['Alice', 'Bob', 'Carol']
+    
+    response = client.get('/api/students?stream=1&gender=Male',
+        headers={'Authorization': f'Bearer {admin_token}'}
+    )
+    assert len(response.get_data(as_text=True).splitlines()) == 1
+
+
+def test_search_index_tracks_writes(client, admin_token, app):
+    """Test that full-text search sees creates, renames and deletes"""
+    from app.repositories.search_index import student_search_index
+    from app.repositories.student_repo import StudentRepository
+    
+    _create_students(app, [
+        ('Alice', 'Adams', 'Female'),
+        ('Bob', 'Baker', 'Male'),
+    ])
+    
+    with app.app_context():
+        assert student_search_index.available()
+        repo = StudentRepository()
+        bob = repo.search_students('bak')[0]
+        assert bob.user.first_name == 'Bob'
+        
+        repo.update_student(bob.id, last_name='Zimmer')
+        assert repo.search_students('baker') == []
+        assert [s.id for s in repo.search_students('zimm')] == [bob.id]
+        
+        repo.delete(bob.id)
+        assert repo.search_students('zimmer') == []
+        assert len(repo.search_students('alice adams')) == 1
+
+
+def test_renames_share_one_student_lookup(client, admin_token, app):
+    """Test that the derived-data hooks look up a flush's renamed users' students once"""
+    import re
+    from sqlalchemy import event
+    from app.models.student_directory import StudentDirectory
+    from app.repositories.student_repo import StudentRepository
+    from app.services.suggest_service import StudentSuggestService
+    _create_students(app, [('Alice', 'Adams', 'Female'), ('Bob', 'Brown', 'Male')])
+    
+    with app.app_context():
+        StudentSuggestService().get_index()
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            for user in User.query.filter(User.last_name.in_(['Adams', 'Brown'])):
+                user.last_name = 'Zimmer'
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        
+        lookup = re.compile(r'FROM students\s+WHERE (students\.)?user_id')
+        lookups = [statement for statement in statements if lookup.search(statement)]
+        assert len(lookups) == 1
+        assert len(StudentRepository().search_students('zimmer')) == 2
+        assert StudentDirectory.query.filter_by(last_name='Zimmer').count() == 2
+        assert StudentSuggestService().suggest('zimmer')[0]['count'] == 2
+
+
+def test_search_many_matches(client, admin_token, app):
+    """Test that search joins the full-text matches rather than binding each one"""
+    import sqlite3
+    from app.repositories.student_repo import StudentRepository
+    from app.repositories.user_repo import UserRepository
+    
+    with app.app_context():
+        role_id = Role.query.filter_by(name='student').first().id
+        for i in range(30):
+            # Set the hash directly; hashing 30 passwords would only slow the test down
+            user = User(username=f'smith{i}', email=f'smith{i}@test.com', first_name='Sam',
+                        last_name='Smith', password_hash='x', role_id=role_id)
+            db.session.add(Student(user=user, student_id=f'2490{i:02d}',
+                                   date_of_birth=date(2000, 1, 1)))
+        db.session.commit()
+        
+        # Fewer bound variables than there are matches
+        connection = db.session.connection().connection.driver_connection
+        limit = connection.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+        connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 20)
+        try:
+            assert len(StudentRepository().search_students('smith')) == 30
+            assert len(UserRepository().search_users('sam', role_id=role_id)) == 30
+        finally:
+            connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, limit)
+
+
+def test_suggest_students(client, admin_token, app):
+    """Test typeahead suggestions and incremental index updates"""
+    _create_students(app, [
+        ('Alice', 'Adams', 'Female'),
+        ('Alan', 'Brown', 'Male'),
+        ('Carol', 'Alden', 'Female'),
+    ])
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    data = client.get('/api/students/suggest?q=al', headers=headers).get_json()
+    assert {s['first_name'] for s in data['suggestions']} == {'Alice', 'Alan', 'Carol'}
+    
+    data = client.get('/api/students/suggest?q=alice%20ad', headers=headers).get_json()
+    assert [s['first_name'] for s in data['suggestions']] == ['Alice']
+    
+    data = client.get('/api/students/suggest?q=alan', headers=headers).get_json()
+    alan_id = data['suggestions'][0]['id']
+    client.put(f'/api/students/{alan_id}', headers=headers, json={'first_name': 'Zed'})
+    
+    data = client.get('/api/students/suggest?q=alan', headers=headers).get_json()
+    assert [s['first_name'] for s in data['suggestions']] == ['Zed']  # still matches by email
+    data = client.get('/api/students/suggest?q=zed', headers=headers).get_json()
+    assert [s['id'] for s in data['suggestions']] == [alan_id]
+    
+    # A write the hooks never saw shows up once the index expires
+    from sqlalchemy import text
+    with app.app_context():
+        db.session.execute(text("UPDATE users SET first_name = 'Quinn' WHERE first_name = 'Zed'"))
+        db.session.commit()
+    assert client.get('/api/students/suggest?q=quinn', headers=headers).get_json()['count'] == 0
+    app.config['SUGGEST_INDEX_TTL'] = 0
+    import time
+    deadline = time.monotonic() + 5
+    # The expired index is reloaded in the background while it keeps serving
+    while client.get('/api/students/suggest?q=quinn', headers=headers).get_json()['count'] == 0:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_prefix_index_keeps_writes_made_during_reload():
+    """Test that a reload replays changes made while its rows were read"""
+    from app.utils.prefix_index import PrefixIndex
+    index = PrefixIndex()
+    index.load([(1, 'ada', ['Ada']), (2, 'alan', ['Alan'])])
+    assert index.start_reload()
+    assert not index.start_reload()
+    index.put(3, 'grace', ['Grace'])
+    index.remove(2)
+    index.load([(1, 'ada', ['Ada']), (2, 'alan', ['Alan'])])
+    assert index.search('a') == ['ada']
+    assert index.search('g') == ['grace']
+    assert index.start_reload()
+
+
+def test_suggest_index_follows_other_workers(client, admin_token, app):
+    """Test that commits send index changes to other workers"""
+    from sqlalchemy import text
+    from app.services.suggest_service import CHANGED_EVENT, _SUGGEST_SQL, _apply_notice, _entry
+    from app.utils.event_bus import get_event_bus
+    from app.utils.prefix_index import PrefixIndex
+    _create_students(app, [('Alice', 'Adams', 'Female'), ('Bob', 'Brown', 'Male')])
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    with app.app_context():
+        # Another worker's index, loaded before the changes below
+        other = PrefixIndex()
+        other.load(_entry(row) for row in db.session.execute(text(_SUGGEST_SQL)))
+        notices = []
+        # Record the notices as the other worker would decode them
+        get_event_bus().notify = lambda event_type, data: notices.append(
+            (event_type, json.loads(json.dumps(data)))
+        )
+        
+        bob_id = other.search('bob')[0]['id']
+        client.put(f'/api/students/{bob_id}', headers=headers, json={'first_name': 'Zed'})
+        alice_id = other.search('alice')[0]['id']
+        client.delete(f'/api/students/{alice_id}', headers=headers)
+        
+        changes = [data for event_type, data in notices if event_type == CHANGED_EVENT]
+        assert changes
+        for data in changes:
+            _apply_notice(other, data)
+        assert [s['id'] for s in other.search('zed')] == [bob_id]
+        assert other.search('alice') == []
+
+
+def test_fuzzy_student_search(client, admin_token, app):
+    """Test typo-tolerant and sound-alike name matching"""
+    _create_students(app, [
+        ('Catherine', 'Thompson', 'Female'),
+        ('Jon', 'Smith', 'Male'),
+        ('Alice', 'Adams', 'Female'),
+    ])
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    def fuzzy(term):
+        data = client.get(f'/api/students?search={term}&match=fuzzy', headers=headers).get_json()
+        return [s['user']['first_name'] for s in data['students']]
+    
+    assert fuzzy('kathryn') == ['Catherine']
+    assert fuzzy('tompsen') == ['Catherine']
+    assert fuzzy('john smyth') == ['Jon']
+    assert fuzzy('zzz') == []
+    
+    with app.app_context():
+        from app.repositories.student_repo import StudentRepository
+        assert StudentRepository().search_students('jhon', fuzzy=True)[0].user.first_name == 'Jon'
+        
+        # New names are sent to the other workers' trees
+        from app.repositories.name_index import ADDED_EVENT
+        from app.utils.event_bus import get_event_bus
+        notices = []
+        get_event_bus().notify = lambda event_type, data: notices.append((event_type, data))
+    response = client.post('/api/students', headers=headers, json={
+        'username': 'zeynep', 'email': 'zeynep@test.com', 'password': 'password123',
+        'first_name': 'Zeynep', 'last_name': 'Yilmaz', 'date_of_birth': '2001-01-01'
+    })
+    assert (ADDED_EVENT, {'names': ['yilmaz', 'zeynep']}) in notices
+    
+    # Only names that changed are sent; logins send nothing
+    notices.clear()
+    client.post('/api/auth/login', json={'username': 'zeynep', 'password': 'password123'})
+    client.put(f"/api/students/{response.get_json()['student']['id']}", headers=headers,
+               json={'first_name': 'Zeyno', 'phone': '5550100'})
+    assert [data for event_type, data in notices if event_type == ADDED_EVENT] == [
+        {'names': ['zeyno']}
+    ]
+
+
+def test_list_students_sparse_fields(client, admin_token, app):
+    """Test that fields= limits the keys returned"""
+    _create_students(app, [('Alice', 'Adams', 'Female')])
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    data = client.get('/api/students?fields=student_id,user.first_name', headers=headers).get_json()
+    assert data['students'] == [{'student_id': '249000', 'user': {'first_name': 'Alice'}}]
+    
+    data = client.get('/api/students?fields=gender', headers=headers).get_json()
+    assert data['students'] == [{'gender': 'Female'}]
+    
+    response = client.get('/api/students?fields=user.password_hash', headers=headers)
+    assert response.status_code == 400
+
+
+def test_list_students_matches_model_serialization(client, admin_token, app):
+    """Test that compiled list rows match Student.to_dict(include_user=True)"""
+    _create_students(app, [('Alice', 'Adams', 'Female'), ('Bob', 'Brown', 'Male')])
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    data = client.get('/api/students', headers=headers).get_json()
+    with app.app_context():
+        expected = [
+            student.to_dict(include_user=True)
+            for student in Student.query.join(User).order_by(User.last_name).all()
+        ]
+    assert data['students'] == expected
+    assert data['students'][0]['date_of_birth'] == '2000-01-01'
+
+
+def test_list_students_database_json_matches_python(client, admin_token, app):
+    """Test that database-built JSON pages equal the Python-serialized ones"""
+    _create_students(app, [
+        ('Alice', 'Adams', 'Female'), ('Bob', 'Brown', 'Male'), ('Cara', 'Cole', 'Female')
+    ])
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    urls = [
+        '/api/students?limit=2',
+        '/api/students?limit=2&fields=student_id,user.is_active,user.role',
+        '/api/students?search=nobody',
+    ]
+    
+    for url in urls:
+        app.config['STUDENTS_DB_JSON'] = True
+        from_database = client.get(url, headers=headers).get_json()
+        app.config['STUDENTS_DB_JSON'] = False
+        from_python = client.get(url, headers=headers).get_json()
+        assert from_database == from_python
+    
+    assert from_database['students'] == []
+
+
+def test_list_students_msgpack(client, admin_token, app):
+    """Test that Accept: application/msgpack returns the same document packed"""
+    from app.utils.msgpack_codec import unpackb
+    _create_students(app, [('Alice', 'Adams', 'Female')])
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    msgpack_headers = {**headers, 'Accept': 'application/msgpack'}
+    
+    as_json = client.get('/api/students', headers=headers)
+    response = client.get('/api/students', headers=msgpack_headers)
+    assert response.mimetype == 'application/msgpack'
+    assert 'Accept' in response.headers['Vary']
+    assert len(response.data) < len(as_json.data)
+    
+    data = unpackb(response.data)
+    student = data['students'][0]
+    assert student['date_of_birth'] == date(2000, 1, 1)
+    json_created_at = as_json.get_json()['students'][0]['created_at']
+    assert student['created_at'].isoformat().startswith(json_created_at)
+    
+    response = client.get('/api/students/999999', headers=msgpack_headers)
+    assert response.status_code == 404
+    assert unpackb(response.data)['status'] == 'error'
+
+
+def test_get_students_by_ids(client, admin_token, app):
+    """Test multi-get by ids keeps request order and lists missing ids"""
+    _create_students(app, [('Alice', 'Adams', 'Female'), ('Bob', 'Brown', 'Male')])
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    with app.app_context():
+        alice, bob = [s.id for s in Student.query.order_by(Student.student_id)]
+    
+    data = client.get(f'/api/students?ids={bob},999,{alice},{bob}', headers=headers).get_json()
+    assert [s['id'] for s in data['students']] == [bob, alice]
+    assert data['missing'] == [999]
+    assert data['students'][0]['user']['first_name'] == 'Bob'
+    
+    response = client.post('/api/students/lookup', json={
+        'ids': [alice, bob], 'fields': 'student_id'
+    }, headers=headers)
+    assert response.get_json()['students'] == [{'student_id': '249000'}, {'student_id': '249001'}]
+    
+    response = client.get('/api/students?ids=1,abc', headers=headers)
+    assert response.status_code == 400
+
+
+def test_student_change_feed(client, admin_token, app):
+    """Test that the change feed reports creates, updates and deletes after a cursor"""
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    def feed(query=''):
+        return client.get(f'/api/students/changes{query}', headers=headers).get_json()
+    
+    cursor = feed()['next_cursor']
+    _create_students(app, [
+        ('Alice', 'Adams', 'Female'), ('Bob', 'Brown', 'Male'), ('Cara', 'Cole', 'Female')
+    ])
+    with app.app_context():
+        alice, bob, cara = [s.id for s in Student.query.order_by(Student.student_id)]
+        bob_user_id = db.session.get(Student, bob).user_id
+    
+    data = feed(f'?since={cursor}')
+    assert [(c['operation'], c['id']) for c in data['changes']] == [
+        ('create', alice), ('create', bob), ('create', cara)
+    ]
+    cursor = data['next_cursor']
+    
+    client.put(f'/api/students/{alice}', json={'phone': '5550100'}, headers=headers)
+    client.delete(f'/api/students/{cara}', headers=headers)
+    assert client.delete(f'/api/admin/users/{bob_user_id}', headers=headers).status_code == 200
+    
+    data = feed(f'?since={cursor}&limit=2')
+    assert [(c['operation'], c['id']) for c in data['changes']] == [
+        ('update', alice), ('delete', cara)
+    ]
+    assert data['changes'][0]['student']['phone'] == '5550100'
+    assert data['changes'][1]['student'] is None
+    assert data['has_more'] is True
+    
+    data = feed(f'?since={data["next_cursor"]}')
+    assert [(c['operation'], c['id']) for c in data['changes']] == [('delete', bob)]
+    assert data['has_more'] is False
+    
+    data = feed(f'?since={data["next_cursor"]}')
+    assert data['changes'] == []
+
+
+def test_change_feed_follows_commit_order(client, admin_token, app):
+    """Test that a write committed later never gets an earlier seq than one already visible"""
+    import threading
+    from app.models.outbox import OutboxEvent
+    from app.repositories.outbox_repo import OutboxRepository
+    _create_students(app, [('Alice', 'Adams', 'Female'), ('Bob', 'Brown', 'Male')])
+    with app.app_context():
+        alice_id, bob_id = [s.id for s in Student.query.order_by(Student.student_id)]
+        start = OutboxRepository().head('student')
+    
+    flushed, release = threading.Event(), threading.Event()
+    
+    def slow_writer():
+        with app.app_context():
+            db.session.get(Student, alice_id).phone = '5550001'
+            db.session.flush()
+            flushed.set()
+            release.wait(5)
+            db.session.commit()
+    
+    thread = threading.Thread(target=slow_writer)
+    thread.start()
+    assert flushed.wait(5)
+    # The second writer has to wait until the first one commits
+    threading.Timer(0.2, release.set).start()
+    with app.app_context():
+        db.session.get(Student, bob_id).phone = '5550002'
+        db.session.commit()
+    thread.join(5)
+    
+    with app.app_context():
+        events = OutboxEvent.query.filter(
+            OutboxEvent.entity == 'student', OutboxEvent.seq > start
+        ).order_by(OutboxEvent.seq).all()
+        assert [e.entity_id for e in events] == [alice_id, bob_id]
+
+
+def test_outbox_records_writes(client, admin_token, app):
+    """Test that student, user and role writes land in the outbox in their own transaction"""
+    from app.models.outbox import OutboxEvent
+    from app.repositories.outbox_repo import OutboxRepository
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    with app.app_context():
+        start = OutboxRepository().head()
+    
+    _create_students(app, [('Alice', 'Adams', 'Female')])
+    with app.app_context():
+        alice = Student.query.first()
+        alice_id, user_id = alice.id, alice.user_id
+    client.put(f'/api/students/{alice_id}', json={'last_name': 'Allen', 'phone': '5550100'},
+               headers=headers)
+    
+    with app.app_context():
+        # A failed write leaves nothing behind
+        alice = db.session.get(Student, alice_id)
+        alice.gender = 'Other'
+        db.session.flush()
+        db.session.rollback()
+        
+        # Logging in writes no event and takes no outbox lock
+        db.session.get(User, user_id).last_login = datetime(2024, 1, 1)
+        db.session.flush()
+        assert not db.session.info.get('outbox_locked')
+        db.session.commit()
+        
+        events = OutboxEvent.query.filter(OutboxEvent.seq > start).order_by(OutboxEvent.seq).all()
+        assert [(e.entity, e.entity_id, e.operation, e.changes) for e in events] == [
+            ('user', user_id, 'create', None),
+            ('student', alice_id, 'create', None),
+            ('student', alice_id, 'update', ['phone']),
+            ('student', alice_id, 'update', ['user.last_name']),
+            ('user', user_id, 'update', ['last_name']),
+        ]
+
+
+def test_outbox_dispatcher_feeds_consumers(client, admin_token, app):
+    """Test that consumers receive batches after their own position and retry on failure"""
+    from app.services.outbox_dispatcher import get_outbox_dispatcher
+    with app.app_context():
+        app.config['OUTBOX_BATCH_SIZE'] = 3
+        dispatcher = get_outbox_dispatcher()
+        students, everything, failures = [], [], []
+        
+        def flaky(batch):
+            if not failures:
+                failures.append(batch)
+                raise RuntimeError('consumer unavailable')
+            students.extend(batch)
+        
+        dispatcher.subscribe('students', flaky, entities=['student'])
+        dispatcher.subscribe('everything', everything.extend)
+    
+    # Dispatch runs on commit
+    _create_students(app, [('Alice', 'Adams', 'Female'), ('Bob', 'Brown', 'Male')])
+    assert [(e['entity'], e['operation']) for e in everything] == [
+        ('user', 'create'), ('student', 'create'), ('user', 'create'), ('student', 'create')
+    ]
+    assert [e['seq'] for e in everything] == sorted(e['seq'] for e in everything)
+    assert len(failures) == 1
+    assert students == []
+    
+    with app.app_context():
+        # Four events in batches of three
+        assert get_outbox_dispatcher().dispatch() == 2
+        assert [e['entity'] for e in students] == ['student', 'student']
+        assert get_outbox_dispatcher().position('students') == everything[-1]['seq']
+        get_outbox_dispatcher().unsubscribe('students')
+        get_outbox_dispatcher().unsubscribe('everything')
+
+
+def test_create_app_registers_outbox_dispatch():
+    """Test that create_app alone wires up dispatch on commit, in a fresh interpreter"""
+    code = (
+        "from sqlalchemy import event\n"
+        "from sqlalchemy.orm import Session\n"
+        "from app import create_app\n"
+        "create_app()\n"
+        "import sys\n"
+        "hook = sys.modules['app.services.outbox_dispatcher']._dispatch_after_commit\n"
+        "assert event.contains(Session, 'after_commit', hook)\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, '-c', code], cwd=root, check=True, timeout=60)
+
+
+def test_student_directory_tracks_writes(client, admin_token, app):
+    """Test that the student_directory read model follows student, user and role writes"""
+    from app.models.student_directory import StudentDirectory
+    from app.repositories.student_repo import StudentRepository
+    _create_students(app, [('Alice', 'Adams', 'Female'), ('Bob', 'Brown', 'Male')])
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    with app.app_context():
+        alice = Student.query.filter_by(student_id='249000').first()
+        alice_id, alice_user_id = alice.id, alice.user_id
+        bob_user_id = Student.query.filter_by(student_id='249001').first().user_id
+    
+    client.put(f'/api/admin/users/{alice_user_id}', json={'last_name': 'Zimmer'}, headers=headers)
+    client.delete(f'/api/admin/users/{bob_user_id}', headers=headers)
+    with app.app_context():
+        role = Role.query.filter_by(name='student').first()
+        role.description = 'Learner'
+        db.session.commit()
+        
+        rows = StudentDirectory.query.all()
+        assert [(r.id, r.last_name, r.role_description) for r in rows] == [
+            (alice_id, 'Zimmer', 'Learner')
+        ]
+        assert rows[0].search_text == '249000 alice zimmer alice0@test.com'
+        assert rows[0].gender_key == 'female'
+        
+        db.session.execute(db.delete(StudentDirectory))
+        assert StudentRepository().rebuild_directory() == 1
+        db.session.commit()
+    
+    data = client.get('/api/students?search=zimm&gender=FEMALE', headers=headers).get_json()
+    assert [s['user']['last_name'] for s in data['students']] == ['Zimmer']
+
+
+def test_student_report_from_records(client, admin_token, app, tmp_path):
+    """Test report generation over the record read path"""
+    import openpyxl
+    
+    app.config['REPORTS_FOLDER'] = str(tmp_path)
+    _create_students(app, [
+        ('Alice', 'Adams', 'Female'),
+        ('Bob', 'Baker', 'Male'),
+    ])
+    
+    response = client.get('/api/reports/students?format=excel&gender=Female',
+        headers={'Authorization': f'Bearer {admin_token}'}
+    )
+    
+    assert response.status_code == 200
+    workbook_path = next((tmp_path / 'excel').iterdir())
+    rows = list(openpyxl.load_workbook(workbook_path).active.values)
+    assert rows[1][:4] == ('249000', 'Alice', 'Adams', 'alice0@test.com')
+    assert len(rows) == 2
+
+
+def test_student_details_cache(client, admin_token, app):
+    """Test that cached student details are evicted by updates"""
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    _create_students(app, [('Alice', 'Adams', 'Female')])
+    with app.app_context():
+        student_id = Student.query.filter_by(student_id='249000').first().id
+    url = f'/api/students/{student_id}'
+    
+    assert client.get(url, headers=headers).get_json()['student']['phone'] is None
+    with app.app_context():
+        from app.repositories.entity_cache import get_entity_cache
+        students = get_entity_cache().students
+        hits = students.hits
+        data = client.get(f'{url}?fields=phone', headers=headers).get_json()
+        assert data['student'] == {'phone': None}
+        assert students.hits == hits + 1
+    
+    client.put(url, json={'phone': '555-0100', 'last_name': 'Baker'}, headers=headers)
+    student = client.get(url, headers=headers).get_json()['student']
+    assert student['phone'] == '555-0100'
+    assert student['user']['last_name'] == 'Baker'
+    assert client.get('/api/auth/me', headers=headers).status_code == 200
+
+
+def test_query_cache_follows_writes(client, admin_token, app):
+    """Test that repeated list and search queries are cached until a student write"""
+    from app.repositories.query_cache import get_query_cache
+    from app.repositories.student_repo import StudentRepository
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    _create_students(app, [('Alice', 'Adams', 'Female'), ('Bob', 'Brown', 'Male')])
+    
+    with app.app_context():
+        results = get_query_cache().results
+        url = '/api/students?gender=female&search=Adams'
+        assert client.get(url, headers=headers).get_json()['count'] == 1
+        hits = results.hits
+        # Same query up to case
+        assert client.get('/api/students?gender=Female&search=adams',
+                          headers=headers).get_json()['count'] == 1
+        assert results.hits == hits + 1
+        
+        repo = StudentRepository()
+        assert [s.user.first_name for s in repo.search_students('brown')] == ['Bob']
+        hits = results.hits
+        bob = repo.search_students('BROWN')[0]
+        assert results.hits == hits + 1
+        assert bob.user.last_name == 'Brown'
+        
+        alice_id = Student.query.filter_by(student_id='249000').first().id
+        client.put(f'/api/students/{alice_id}', json={'gender': 'Male'}, headers=headers)
+        assert client.get(url, headers=headers).get_json()['count'] == 0
+        
+        client.put(f'/api/students/{bob.id}', json={'last_name': 'Black'}, headers=headers)
+        assert repo.search_students('brown') == []
+        
+        # Logins and user writes outside the student payload keep the entries
+        page, _ = repo.list_students_page('black')
+        hits = results.hits
+        client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'})
+        User.query.filter_by(username='admin').first().first_name = 'Root'
+        db.session.commit()
+        assert repo.list_students_page('black')[0] == page
+        assert results.hits == hits + 1
+        
+        # Writes that touch only the role still change the listed rows
+        from app.models.role import Role
+        Role.query.filter_by(name='student').first().description = 'Enrolled student'
+        db.session.commit()
+        page, _ = repo.list_students_page('black')
+        assert page[0]['user']['role']['description'] == 'Enrolled student'
+        if repo.supports_json_pages():
+            rows, _, _ = repo.list_students_page_json('black')
+            assert json.loads(rows)[0]['user']['role']['description'] == 'Enrolled student'
+
+
+def test_bulk_create_students(client, admin_token, app):
+    """Test that bulk creation is all-or-nothing unless partial, with a result per row"""
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    
+    def row(name, **fields):
+        return {'username': name, 'email': f'{name}@test.com', 'password': 'password123',
+                'first_name': name.title(), 'last_name': 'Bulk', 'date_of_birth': '2001-02-03',
+                **fields}
+    
+    response = client.post('/api/students/bulk', headers=headers, json={
+        'students': [row('alice', gender='Female'), row('bob')]
+    })
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data['created'] == 2
+    first, second = data['results']
+    assert int(second['student_id']) == int(first['student_id']) + 1
+    listed = client.get('/api/students?search=Bulk', headers=headers).get_json()
+    assert listed['count'] == 2
+    
+    # A conflict with the database, a repeat within the batch and a bad date
+    rows = [row('carol'), row('alice'), row('carol', email='other@test.com'),
+            row('dave', date_of_birth='03/02/2001')]
+    response = client.post('/api/students/bulk', headers=headers, json=rows)
+    assert response.status_code == 400
+    assert [(r['status'], r.get('message')) for r in response.get_json()['results']] == [
+        ('skipped', None),
+        ('error', 'Username already exists'),
+        ('error', 'Duplicate username in request'),
+        ('error', 'Invalid date_of_birth format. Use YYYY-MM-DD'),
+    ]
+    with app.app_context():
+        assert Student.query.count() == 2
+    
+    response = client.post('/api/students/bulk?partial=1', headers=headers, json=rows)
+    assert response.status_code == 207
+    assert response.get_json()['created'] == 1
+    assert response.get_json()['results'][0]['username'] == 'carol'
+    
+    assert client.post('/api/students/bulk', headers=headers, json=[]).status_code == 400
+
+
+def test_import_students_roster(client, admin_token, app, tmp_path):
+    """Test that CSV and XLSX rosters create and update students chunk by chunk"""
+    import io
+    import openpyxl
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    app.config['IMPORT_CHUNK_SIZE'] = 2
+    
+    roster = (
+        'Email,Username,Password,First Name,Last Name,Date of Birth,Gender,Notes\n'
+        'alice@test.com,alice,password123,Alice,Adams,2001-02-03,female,transfer\n'
+        'bob@test.com,bob,password123,Bob,Brown,2002-03-04,Male,\n'
+        ',,,,,,,\n'
+        'carol@test.com,carol,short,Carol,Clark,2003-04-05,Female,\n'
+        'admin@test.com,,,,,,,\n'
+        'alice@test.com,alice2,password123,Alice,Again,2001-02-03,,\n'
+    )
+    response = client.post('/api/students/import', headers=headers, data={
+        'file': (io.BytesIO(roster.encode()), 'roster.csv')
+    })
+    assert response.status_code == 200
+    data = response.get_json()
+    assert {k: data[k] for k in ('processed', 'created', 'updated', 'unchanged', 'failed')} == {
+        'processed': 5, 'created': 2, 'updated': 1, 'unchanged': 0, 'failed': 2
+    }
+    assert data['errors'] == [
+        {'line': 5, 'message': 'Password must be at least 8 characters long'},
+        {'line': 6, 'message': 'Email belongs to a non-student account'},
+    ]
+    assert list(tmp_path.iterdir()) == []
+    
+    with app.app_context():
+        alice = User.query.filter_by(email='alice@test.com').first()
+        assert (alice.username, alice.last_name, alice.student.gender) == (
+            'alice', 'Again', 'Female'
+        )
+        alice_student_id = alice.student.student_id
+    
+    # XLSX rows match on student_id, and empty cells leave values alone
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(['student_id', 'email', 'phone', 'date_of_birth'])
+    sheet.append([alice_student_id, 'alice@school.edu', 5550100999, date(2001, 2, 4)])
+    sheet.append([None, 'bob@test.com', None, None])
+    upload = io.BytesIO()
+    workbook.save(upload)
+    upload.seek(0)
+    
+    response = client.post('/api/students/import', headers=headers, data={
+        'file': (upload, 'roster.xlsx')
+    })
+    data = response.get_json()
+    assert (data['updated'], data['unchanged'], data['failed']) == (1, 1, 0)
+    listed = client.get('/api/students?search=Alice', headers=headers).get_json()['students']
+    assert listed[0]['user']['email'] == 'alice@school.edu'
+    assert listed[0]['phone'] == '5550100999'
+    assert listed[0]['date_of_birth'] == '2001-02-04'
+    
+    response = client.post('/api/students/import', headers=headers, data={
+        'file': (io.BytesIO(b'name\nAlice\n'), 'roster.csv')
+    })
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Could not read the file: Missing columns: email'
+    response = client.post('/api/students/import', headers=headers, data={
+        'file': (io.BytesIO(b''), 'roster.txt')
+    })
+    assert response.status_code == 400
+
+
+def test_import_reports_conflicts_per_row(client, admin_token, app, tmp_path, monkeypatch):
+    """Test that email and username conflicts fail their own rows, not the whole chunk"""
+    import io
+    from app.routes.student_routes import import_service
+    headers = {'Authorization': f'Bearer {admin_token}'}
+    app.config['UPLOAD_FOLDER'] = str(tmp_path)
+    _create_students(app, [('Alice', 'Adams', 'Female')])
+    
+    # Another request registers dave after the chunk checked usernames
+    find_taken = import_service.user_repo.find_taken
+    
+    def find_taken_then_register(usernames, emails):
+        taken = find_taken(usernames, emails)
+        if 'dave' in usernames and not User.query.filter_by(username='dave').first():
+            user = User(username='dave', email='dave@elsewhere.com', role_id=1)
+            user.password = 'password123'
+            db.session.add(user)
+            db.session.commit()
+        return taken
+    
+    monkeypatch.setattr(import_service.user_repo, 'find_taken', find_taken_then_register)
+    roster = (
+        'student_id,email,username,password,first_name,last_name,date_of_birth\n'
+        '249000,shared@test.com,,,,,\n'
+        ',shared@test.com,carol,password123,Carol,Clark,2003-04-05\n'
+        ',dave@test.com,dave,password123,Dave,Davis,2004-05-06\n'
+        ',erin@test.com,erin,password123,Erin,Evans,2005-06-07\n'
+    )
+    response = client.post('/api/students/import', headers=headers, data={
+        'file': (io.BytesIO(roster.encode()), 'roster.csv')
+    })
+    data = response.get_json()
+    assert (data['created'], data['updated'], data['failed']) == (1, 1, 2)
+    assert data['errors'] == [
+        {'line': 3, 'message': 'Email is used by an earlier row in the file'},
+        # Retried on its own, the row finds the username taken
+        {'line': 4, 'message': 'Username already exists'},
+    ]
+    with app.app_context():
+        assert Student.query.filter_by(student_id='249000').first().user.email == 'shared@test.com'
+        assert User.query.filter_by(username='erin').first().student is not None